@@ -1,55 +1,201 @@
 # flask_backend/app.py
-from flask import Flask, request, jsonify
+from threading import Thread
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from scalability.cache import CacheService
+from config import Config
 from scalability.rate_limiter import RateLimiter
 from scalability.circuit_breaker import CircuitBreaker
+from scalability.metrics import CONTENT_TYPE, REGISTRY, configure_metrics, timed_json_provider
+from translation.api import STREAM_HEADERS, StreamFormat, batch_cost, body_decoder, failure
+from translation.jobs import JobWorker, MAX_PRIORITY, check_webhook, create_job_queue, public_job
+from translation.service import create_translation_service, run_job
+from translation.validation import ValidationError, parse_batch, parse_stream, parse_translate
 
 app = Flask(__name__)
 CORS(app)
+app.json = timed_json_provider(type(app.json))(app)
+configure_metrics(Config)
 
 # Initialize services with error handling
-cache_service = CacheService()
-rate_limiter = RateLimiter()
-circuit_breaker = CircuitBreaker()
+rate_limiter = RateLimiter(
+    api_key_header=Config.RATE_LIMIT_API_KEY_HEADER,
+    api_key_limits=Config.RATE_LIMIT_API_KEY_LIMITS,
+    local_max_keys=Config.RATE_LIMIT_LOCAL_MAX_KEYS
+)
+circuit_breaker = CircuitBreaker.get('translation')
+translation_service = create_translation_service(Config)
+cache_service = translation_service.cache_service
+job_queue = create_job_queue(Config)
+
+# Start with the hottest translations already in the L1 cache; best effort,
+# the service starts either way
+try:
+    cache_service.warm(Config.CACHE_WARM_TOP_KEYS, expires=Config.CACHE_TRANSLATION_TTL)
+except Exception as e:
+    app.logger.error(f"Cache warm-up failed: {str(e)}")
+
+if Config.JOB_QUEUE_BACKEND == 'memory':
+    # Nothing else can reach an in-process queue, so drain it here
+    Thread(
+        target=JobWorker(job_queue, lambda payload: run_job(translation_service, payload),
+                         max_attempts=Config.JOB_MAX_ATTEMPTS,
+                         webhook_allowed_hosts=Config.JOB_WEBHOOK_ALLOWED_HOSTS).run,
+        name='translation-jobs',
+        daemon=True
+    ).start()
+
+def failed(error, context='Translation'):
+    payload, status = failure(error, context)
+    return jsonify(payload), status
+
+def request_cost():
+    """Rate limiter weight of a batch request"""
+    return batch_cost(request.get_json(silent=True), Config.RATE_LIMIT_BATCH_ITEM_COST)
 
 @app.route('/api/translate', methods=['POST'])
 @rate_limiter.limit(100, 60)  # 100 requests per minute
 @circuit_breaker.protect()
 def translate():
     try:
-        data = request.get_json()
-        text = data.get('text')
-        source_lang = data.get('sourceLang', 'auto')
-        target_lang = data.get('targetLang', 'en')
-
-        # Create cache key
-        cache_key = f"translation:{text}:{source_lang}:{target_lang}"
-
-        def translate_text():
-            # Your translation logic here
-            return {
-                "text": text,
-                "translated": f"Translated: {text}",
-                "source_lang": source_lang,
-                "target_lang": target_lang
-            }
-
-        # Use cache with fallback
-        result = cache_service.cache_with_fallback(
-            cache_key,
-            translate_text,
-            expires=3600  # Cache for 1 hour
+        text, source_lang, target_lang, segmentation = parse_translate(
+            request.get_json(silent=True), Config.TRANSLATION_SEGMENTATION
         )
-
+        result = translation_service.translate(text, source_lang, target_lang, segmentation)
         return jsonify(result)
 
     except Exception as e:
-        app.logger.error(f"Translation error: {str(e)}")
+        return failed(e)
+
+@app.route('/api/translate/batch', methods=['POST'])
+@rate_limiter.limit(100, 60, cost=request_cost)
+@circuit_breaker.protect()
+def translate_batch_endpoint():
+    try:
+        queries = parse_batch(request.get_json(silent=True), Config.BATCH_MAX_ITEMS)
+        return jsonify({"results": translation_service.translate_many(queries)})
+
+    except Exception as e:
+        return failed(e, 'Batch translation')
+
+@app.route('/api/translate/stream', methods=['POST'])
+@rate_limiter.limit(100, 60)
+@circuit_breaker.protect()
+def translate_stream():
+    """
+    Stream a translation of the raw request body as it is read
+
+    The body is plain UTF-8 text; languages and segmentation come from the
+    query string. Each translated chunk is flushed as one NDJSON line (or
+    one Server-Sent Event when the client accepts text/event-stream),
+    followed by a final line with the segment statistics.
+    """
+    try:
+        source_lang, target_lang, segmentation = parse_stream(request.args)
+    except ValidationError as e:
+        return failed(e)
+
+    stream_format = StreamFormat(request.accept_mimetypes)
+
+    def read_body():
+        decoder = body_decoder()
+        while True:
+            block = request.stream.read(Config.STREAM_READ_SIZE)
+            if not block:
+                break
+            yield decoder.decode(block)
+        yield decoder.decode(b'', final=True)
+
+    def generate():
+        stats = {}
+        try:
+            for piece in translation_service.stream(
+                    read_body(), source_lang, target_lang, segmentation,
+                    window=Config.STREAM_WINDOW_SEGMENTS,
+                    max_buffer=Config.STREAM_MAX_BUFFER,
+                    stats=stats):
+                yield stream_format.piece(piece)
+            yield stream_format.done(stats)
+        except Exception as e:
+            yield stream_format.error(e)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=stream_format.mimetype,
+        headers=STREAM_HEADERS
+    )
+
+@app.route('/api/translate/jobs', methods=['POST'])
+@rate_limiter.limit(100, 60)
+def create_translation_job():
+    """
+    Queue a translation to run on a worker, returning its id right away
+
+    Accepts the /api/translate fields plus an optional 'priority'
+    (0-9, higher runs first) and 'webhook' URL that receives the finished
+    job as a JSON POST.
+    """
+    data = request.get_json(silent=True)
+
+    try:
+        text, source_lang, target_lang, segmentation = parse_translate(
+            data, Config.TRANSLATION_SEGMENTATION
+        )
+    except ValidationError as e:
+        return failed(e)
+
+    priority = data.get('priority', 0)
+    webhook = data.get('webhook')
+
+    if not isinstance(priority, int) or not 0 <= priority <= MAX_PRIORITY:
+        return jsonify({"error": f"'priority' must be an integer between 0 and {MAX_PRIORITY}"}), 400
+
+    if webhook is not None:
+        try:
+            if not isinstance(webhook, str):
+                raise ValueError("'webhook' must be an http(s) URL")
+            check_webhook(webhook, Config.JOB_WEBHOOK_ALLOWED_HOSTS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    payload = {
+        "text": text,
+        "sourceLang": source_lang,
+        "targetLang": target_lang,
+        "segmentation": segmentation
+    }
+
+    try:
+        job = job_queue.enqueue(payload, priority=priority, webhook=webhook)
+    except Exception as e:
+        app.logger.error(f"Failed to queue translation job: {str(e)}")
         return jsonify({
-            "error": "Translation failed",
+            "error": "Failed to queue translation job",
             "details": str(e)
-        }), 500
+        }), 503
+
+    return jsonify(public_job(job)), 202, {'Location': f"/api/translate/jobs/{job['id']}"}
+
+@app.route('/api/translate/jobs/<job_id>', methods=['GET'])
+def get_translation_job(job_id):
+    try:
+        job = job_queue.get(job_id)
+    except Exception as e:
+        app.logger.error(f"Failed to read translation job: {str(e)}")
+        return jsonify({
+            "error": "Failed to read translation job",
+            "details": str(e)
+        }), 503
+
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(public_job(job))
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint, totals of every worker process"""
+    if not Config.METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(REGISTRY.exposition(), content_type=CONTENT_TYPE)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,129 @@
+# flask_backend/asgi.py
+"""
+Async (ASGI) serving mode for the /api/translate endpoints
+
+    uvicorn asgi:app --port 5000
+    hypercorn asgi:app --bind 0.0.0.0:5000
+
+Serves the same requests and responses as app.py, on Quart and
+redis.asyncio: rate limiting, the circuit breaker and cache lookups are
+awaited, so one process handles many concurrent connections without a
+thread per request. Validation, response building (translation/api.py),
+translation and cache logic are shared with the sync app; both modes can
+run side by side on the same Redis.
+
+Needs the quart and quart-cors packages and an ASGI server, see
+requirements-async.txt at the repository root.
+"""
+from quart import Quart, Response, request, jsonify, stream_with_context
+from quart_cors import cors
+from config import Config
+from scalability.aio.rate_limiter import AsyncRateLimiter
+from scalability.aio.circuit_breaker import AsyncCircuitBreaker
+from scalability.aio.metrics import exposition
+from scalability.metrics import CONTENT_TYPE, configure_metrics, timed_json_provider
+from translation.api import STREAM_HEADERS, StreamFormat, batch_cost, body_decoder, failure
+from translation.service import create_async_translation_service
+from translation.validation import ValidationError, parse_batch, parse_stream, parse_translate
+
+app = cors(Quart(__name__))
+app.json = timed_json_provider(type(app.json))(app)
+configure_metrics(Config)
+
+rate_limiter = AsyncRateLimiter(
+    api_key_header=Config.RATE_LIMIT_API_KEY_HEADER,
+    api_key_limits=Config.RATE_LIMIT_API_KEY_LIMITS,
+    local_max_keys=Config.RATE_LIMIT_LOCAL_MAX_KEYS
+)
+circuit_breaker = AsyncCircuitBreaker.get('translation')
+translation_service = create_async_translation_service(Config)
+
+@app.before_serving
+async def warm_cache():
+    # Start with the hottest translations already in the L1 cache; best
+    # effort, the service starts either way
+    try:
+        await translation_service.cache_service.warm(Config.CACHE_WARM_TOP_KEYS, expires=Config.CACHE_TRANSLATION_TTL)
+    except Exception as e:
+        app.logger.error(f"Cache warm-up failed: {str(e)}")
+
+def failed(error, context='Translation'):
+    payload, status = failure(error, context)
+    return jsonify(payload), status
+
+async def request_cost():
+    """Rate limiter weight of a batch request"""
+    return batch_cost(await request.get_json(silent=True), Config.RATE_LIMIT_BATCH_ITEM_COST)
+
+@app.route('/api/translate', methods=['POST'])
+@rate_limiter.limit(100, 60)  # 100 requests per minute
+@circuit_breaker.protect()
+async def translate():
+    try:
+        text, source_lang, target_lang, segmentation = parse_translate(
+            await request.get_json(silent=True), Config.TRANSLATION_SEGMENTATION
+        )
+        result = await translation_service.translate(text, source_lang, target_lang, segmentation)
+        return jsonify(result)
+
+    except Exception as e:
+        return failed(e)
+
+@app.route('/api/translate/batch', methods=['POST'])
+@rate_limiter.limit(100, 60, cost=request_cost)
+@circuit_breaker.protect()
+async def translate_batch_endpoint():
+    try:
+        queries = parse_batch(await request.get_json(silent=True), Config.BATCH_MAX_ITEMS)
+        return jsonify({"results": await translation_service.translate_many(queries)})
+
+    except Exception as e:
+        return failed(e, 'Batch translation')
+
+@app.route('/api/translate/stream', methods=['POST'])
+@rate_limiter.limit(100, 60)
+@circuit_breaker.protect()
+async def translate_stream():
+    """Stream a translation of the raw request body as it is read, see app.py"""
+    try:
+        source_lang, target_lang, segmentation = parse_stream(request.args)
+    except ValidationError as e:
+        return failed(e)
+
+    stream_format = StreamFormat(request.accept_mimetypes)
+
+    async def read_body():
+        decoder = body_decoder()
+        async for block in request.body:
+            yield decoder.decode(block)
+        yield decoder.decode(b'', final=True)
+
+    @stream_with_context
+    async def generate():
+        stats = {}
+        try:
+            async for piece in translation_service.stream(
+                    read_body(), source_lang, target_lang, segmentation,
+                    window=Config.STREAM_WINDOW_SEGMENTS,
+                    max_buffer=Config.STREAM_MAX_BUFFER,
+                    stats=stats):
+                yield stream_format.piece(piece)
+            yield stream_format.done(stats)
+        except Exception as e:
+            yield stream_format.error(e)
+
+    return Response(
+        generate(),
+        mimetype=stream_format.mimetype,
+        headers=STREAM_HEADERS
+    )
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus scrape endpoint, see app.py"""
+    if not Config.METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(await exposition(), content_type=CONTENT_TYPE)
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5000)
@@ -0,0 +1,75 @@
+"""
+Compare N single /api/translate calls with one /api/translate/batch call
+
+Run from flask_backend/:
+    python -m benchmarks.batch_vs_single --items 500
+
+Each run uses fresh texts so both sides pay for cache misses, then repeats
+the same texts to measure the all-hits case. Throughput is in items/s for
+both modes; latencies are per request, so one sample per batch. Results
+are stored as JSON in benchmarks/results/ for benchmarks.compare.
+"""
+import argparse
+import time
+import uuid
+
+from benchmarks.common import add_arguments, print_results, save_results, summarize, use_redis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=500)
+    add_arguments(parser, 'batch_vs_single')
+    args = parser.parse_args()
+
+    use_redis(args)
+
+    from config import Config
+    Config.BATCH_MAX_ITEMS = max(Config.BATCH_MAX_ITEMS, args.items)
+
+    from app import app
+
+    client = app.test_client()
+    run_id = uuid.uuid4().hex[:8]
+    items = [
+        {'text': f'{run_id} sentence number {i}', 'sourceLang': 'fr', 'targetLang': 'en'}
+        for i in range(args.items)
+    ]
+
+    def post(path, body, environ, latencies):
+        started = time.perf_counter()
+        response = client.post(path, json=body, environ_base=environ)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    def singles(latencies):
+        for i, item in enumerate(items):
+            # Spread singles over clients so the limiter is paid for but never trips
+            environ = {'REMOTE_ADDR': f'10.{run_id_octet}.{i // 250}.{i % 250}'}
+            post('/api/translate', item, environ, latencies)
+
+    def batch(latencies):
+        environ = {'REMOTE_ADDR': f'10.{run_id_octet}.255.255'}
+        post('/api/translate/batch', {'items': items}, environ, latencies)
+
+    run_id_octet = 0
+    results = []
+    for name, fn in (('single', singles), ('batch', batch)):
+        for cache in ('miss', 'hit'):
+            latencies = []
+            start = time.perf_counter()
+            fn(latencies)
+            elapsed = time.perf_counter() - start
+            results.append(summarize(f"{name} {cache}", latencies, elapsed,
+                                     throughput=args.items / elapsed, mode=name, cache=cache))
+        run_id = uuid.uuid4().hex[:8]
+        run_id_octet += 1
+        for i, item in enumerate(items):
+            item['text'] = f'{run_id} sentence number {i}'
+
+    print_results(results, unit='items/s')
+    save_results('batch_vs_single', args, results)
+
+
+if __name__ == '__main__':
+    main()
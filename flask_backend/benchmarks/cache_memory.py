@@ -0,0 +1,175 @@
+"""
+Memory footprint of the translation cache key scheme and value codecs
+
+Run from flask_backend/:
+    python -m benchmarks.cache_memory --entries 5000 [--real-redis]
+
+The corpus mimics production traffic: mostly short UI strings, some full
+sentences and a few long documents, in eight languages and five scripts
+with large Zipf-distributed vocabularies (see Language). Sizes are the key
+plus value bytes sent over the wire; with --real-redis, MEMORY USAGE is
+also summed on localhost:6379 (db 15 is flushed before and after the run;
+fakeredis has no MEMORY command). Results are stored as JSON in
+benchmarks/results/ for benchmarks.compare.
+"""
+import argparse
+import json
+import random
+
+from benchmarks.common import add_arguments, save_results
+from scalability.cache_keys import translation_key
+from scalability.codec import ValueCodec, msgpack, zstandard
+
+
+# Letters of each language, most frequent first, for the synthetic
+# vocabularies below; 'zh' words are runs of CJK ideographs without spaces
+ALPHABETS = {
+    'en': 'etaoinshrdlcumwfgypbvkjxqz',
+    'fr': 'esaitnrulodcpmévqfbghjàxèyêzçôùâûîœëïü',
+    'de': 'enisratdhulcgmobwfkzpvüäößjyxq',
+    'es': 'eaosrnidlctumpbgvyqóhfzjéáñxíúü',
+    'ru': 'оеаинтсрвлкмдпуяыьгзбчйхжшюцщэфъё',
+    'el': 'αοιετσνηυρπκμλωδγχθφβξζψ',
+    'ar': 'اليمونرتبعدسهفكقحجشطصىخثزضظغذ',
+    'zh': ''.join(chr(code) for code in range(0x4E00, 0x4E00 + 3000)),
+}
+VOCABULARY_SIZE = 20000
+
+
+def zipf_weights(count):
+    """Cumulative weights of a Zipf (s=1) distribution over count ranks"""
+    total, weights = 0.0, []
+    for rank in range(1, count + 1):
+        total += 1 / rank
+        weights.append(total)
+    return weights
+
+
+class Language:
+    """
+    A synthetic language: VOCABULARY_SIZE random words over a real alphabet,
+    used with Zipf frequencies like natural text. A few dozen repeated words
+    compress far better than anything users send.
+    """
+
+    def __init__(self, code, rng):
+        letters = ALPHABETS[code]
+        letter_weights = zipf_weights(len(letters))
+        spaced = code != 'zh'
+        words = set()
+        while len(words) < VOCABULARY_SIZE:
+            length = max(1, round(rng.gauss(5.5, 2.5))) if spaced else rng.choice((1, 2, 2, 3, 4))
+            words.add(''.join(rng.choices(letters, cum_weights=letter_weights, k=length)))
+        self.words = sorted(words, key=lambda _: rng.random())
+        self.weights = zipf_weights(len(self.words))
+        self.separator = ' ' if spaced else ''
+        self.stop = '.' if spaced else '\u3002'
+
+    def text(self, rng, length):
+        """length words, in sentences of 5-25 words"""
+        sentences = []
+        while length > 0:
+            count = min(length, rng.randint(5, 25))
+            length -= count
+            sentence = self.separator.join(rng.choices(self.words, cum_weights=self.weights, k=count))
+            sentences.append(sentence[:1].upper() + sentence[1:] + (self.stop if count > 6 else ''))
+        return self.separator.join(sentences)
+
+
+def make_corpus(entries: int, seed: int = 42):
+    rng = random.Random(seed)
+    languages = {code: Language(code, rng) for code in ALPHABETS}
+    codes = list(languages)
+    corpus = []
+    for _ in range(entries):
+        roll = rng.random()
+        if roll < 0.70:
+            length = rng.randint(1, 6)        # buttons, labels, menu items
+        elif roll < 0.95:
+            length = rng.randint(10, 40)      # sentences
+        else:
+            length = rng.randint(1000, 8000)  # documents, roughly 6-50 KB
+        source_lang = rng.choice(codes)
+        target_lang = rng.choice([code for code in codes if code != source_lang])
+        corpus.append((languages[source_lang].text(rng, length), source_lang, target_lang))
+    return corpus
+
+
+def legacy_entry(text, source_lang, target_lang):
+    key = f"translation:{text}:{source_lang}:{target_lang}"
+    value = json.dumps({
+        "text": text,
+        "translated": f"Translated: {text}",
+        "source_lang": source_lang,
+        "target_lang": target_lang
+    })
+    return key.encode('utf-8'), value.encode('utf-8')
+
+
+def codec_entry(codec):
+    def build(text, source_lang, target_lang):
+        key = translation_key(text, source_lang, target_lang)
+        return key.encode('utf-8'), codec.encode({"translated": f"Translated: {text}"})
+    return build
+
+
+def schemes():
+    yield 'legacy key + json', legacy_entry
+    yield 'hashed key + json', codec_entry(ValueCodec('json', 'none'))
+    yield 'hashed key + json/zlib', codec_entry(ValueCodec('json', 'zlib'))
+    if zstandard is not None:
+        yield 'hashed key + json/zstd', codec_entry(ValueCodec('json', 'zstd'))
+    if msgpack is not None:
+        yield 'hashed key + msgpack/zlib', codec_entry(ValueCodec('msgpack', 'zlib'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=5000)
+    add_arguments(parser, 'cache_memory')
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.entries)
+    client = None
+    if args.real_redis:
+        import redis
+        from config import Config
+        client = redis.Redis(host=Config.REDIS_HOST, port=Config.REDIS_PORT, db=15)
+        client.flushdb()
+
+    baseline = None
+    results = []
+    print(f"{'scheme':<28} {'key MB':>8} {'value MB':>9} {'total MB':>9} {'ratio':>6}"
+          + (f" {'redis MB':>9}" if client else ''))
+    for name, build in schemes():
+        entries = [build(*item) for item in corpus]
+        key_bytes = sum(len(key) for key, _ in entries)
+        value_bytes = sum(len(value) for _, value in entries)
+        total = key_bytes + value_bytes
+        baseline = baseline or total
+        line = (f"{name:<28} {key_bytes / 1e6:>8.2f} {value_bytes / 1e6:>9.2f} "
+                f"{total / 1e6:>9.2f} {total / baseline:>6.2f}")
+        row = {'name': name, 'entries': len(entries), 'key_bytes': key_bytes,
+               'value_bytes': value_bytes, 'total_bytes': total}
+
+        if client is not None:
+            pipeline = client.pipeline(transaction=False)
+            for key, value in entries:
+                pipeline.set(key, value)
+            pipeline.execute()
+            pipeline = client.pipeline(transaction=False)
+            for key, _ in entries:
+                pipeline.memory_usage(key)
+            used = sum(size or 0 for size in pipeline.execute())
+            client.flushdb()
+            line += f" {used / 1e6:>9.2f}"
+            row['redis_bytes'] = used
+
+        print(line)
+        results.append(row)
+
+    save_results('cache_memory', args, results, redis=args.real_redis)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Threaded load test for CircuitBreaker.protect()
+
+Run from flask_backend/:
+    python -m benchmarks.circuit_breaker_load --requests 400 --latency-ms 5
+
+The protected view sleeps to simulate downstream I/O. With the breaker only
+locking around state transitions, throughput should grow roughly linearly
+with the number of worker threads. The breaker keeps its state in an
+in-process fakeredis server unless --real-redis is given. Results are
+stored as JSON in benchmarks/results/ for benchmarks.compare.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask
+
+from benchmarks.common import add_arguments, save_results, summarize, use_redis
+from scalability.circuit_breaker import CircuitBreaker
+
+
+def run(breaker: CircuitBreaker, app: Flask, threads: int, requests: int, latency: float) -> dict:
+    @breaker.protect()
+    def view():
+        time.sleep(latency)
+        return 'ok'
+
+    def call(_):
+        with app.test_request_context():
+            started = time.perf_counter()
+            view()
+            return time.perf_counter() - started
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(call, range(requests)))
+    return summarize(f"threads={threads}", latencies, time.perf_counter() - start, threads=threads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--latency-ms', type=float, default=5.0)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    add_arguments(parser, 'circuit_breaker_load')
+    args = parser.parse_args()
+
+    use_redis(args)
+
+    app = Flask(__name__)
+    with app.app_context():
+        breaker = CircuitBreaker(name='load-test')
+
+    baseline = None
+    results = []
+    print(f"{'threads':>8} {'req/s':>10} {'speedup':>8}")
+    for threads in args.threads:
+        result = run(breaker, app, threads, args.requests, args.latency_ms / 1000)
+        results.append(result)
+        throughput = result['throughput']
+        baseline = baseline or throughput
+        print(f"{threads:>8} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+    save_results('circuit_breaker_load', args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Helpers shared by the benchmark scripts"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from scalability.redis_pool import RedisPool, set_shared_pool
+from scalability.aio.redis_pool import AsyncRedisPool, set_shared_async_pool
+
+
+def use_fake_redis():
+    """
+    Back the shared Redis pool with one in-process fakeredis server. Must be
+    called before the app or services are created. Needs fakeredis and lupa,
+    see requirements-dev.txt.
+    """
+    import fakeredis
+    import fakeredis.aioredis
+
+    server = fakeredis.FakeServer()
+    # fakeredis serializes on one server lock, and periodic health checks on
+    # the pub/sub connection contend with it without testing anything real
+    set_shared_pool(RedisPool(
+        connection_class=fakeredis.FakeRedisConnection,
+        health_check_interval=0,
+        server=server
+    ))
+    set_shared_async_pool(AsyncRedisPool(
+        connection_class=fakeredis.aioredis.FakeConnection,
+        health_check_interval=0,
+        server=server
+    ))
+    return server
+
+
+def add_arguments(parser, benchmark, redis=True):
+    """The options every benchmark takes: --real-redis (if it uses Redis), --output and --no-save"""
+    if redis:
+        parser.add_argument('--real-redis', action='store_true',
+                            help='use localhost:6379 db 15 instead of an in-process fakeredis server')
+    parser.add_argument('--output', help=f'results file (default: benchmarks/results/{benchmark}-<commit>.json)')
+    parser.add_argument('--no-save', action='store_true', help='only print the results')
+
+
+def use_redis(args):
+    """
+    Back the app with localhost:6379 db 15, flushed first, if --real-redis
+    was given, otherwise with fakeredis. Must be called before the app or
+    services are created.
+    """
+    from config import Config
+    if args.real_redis:
+        import redis
+        Config.REDIS_DB = 15
+        redis.Redis(host=Config.REDIS_HOST, port=Config.REDIS_PORT, db=15).flushdb()
+    else:
+        use_fake_redis()
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+WORDS = (
+    "the translation service returns a humanized context aware result for every "
+    "sentence users submit from the browser extension mobile application and web "
+    "dashboard including accessibility features speech recognition and account "
+    "settings while keeping latency low under heavy document traffic"
+).split()
+
+# Text size classes, in words
+TEXT_SIZES = {
+    'short': (1, 6),          # buttons, labels, menu items
+    'sentence': (10, 40),
+    'paragraph': (80, 200),
+    'document': (1000, 8000)  # roughly 6-50 KB
+}
+
+
+def parse_mix(spec):
+    """'short=0.7,sentence=0.3' -> {'short': 0.7, 'sentence': 0.3}"""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in TEXT_SIZES:
+            raise ValueError(f"Unknown text size '{name}', expected one of {', '.join(TEXT_SIZES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def random_text(rng, mix):
+    """A text whose length is drawn from a TEXT_SIZES mix"""
+    size = rng.choices(list(mix), weights=list(mix.values()))[0]
+    low, high = TEXT_SIZES[size]
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(name, latencies, seconds, errors=0, **extra):
+    """Result row with throughput and latency percentiles (in ms) of one run"""
+    latencies = sorted(latencies)
+    return {
+        'name': name,
+        'count': len(latencies),
+        'errors': errors,
+        'seconds': round(seconds, 6),
+        'throughput': len(latencies) / seconds if seconds else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        **extra
+    }
+
+
+def print_results(results, unit='ops/s'):
+    print(f"{'name':<40} {'count':>8} {'errors':>7} {unit:>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in results:
+        print(f"{row['name']:<40} {row['count']:>8} {row['errors']:>7} {row['throughput']:>11.1f} "
+              f"{row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(RESULTS_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(fake_redis):
+    """
+    What a result depends on besides the code: commit, interpreter, machine,
+    Redis (None for benchmarks that do not use it)
+    """
+    import redis
+    commit = _git('rev-parse', 'HEAD')
+    status = _git('status', '--porcelain', '--untracked-files=no')
+    env = {
+        'commit': commit,
+        'dirty': bool(status),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'redis_py': redis.__version__,
+        'redis': 'localhost'
+    }
+    if fake_redis is None:
+        env['redis'] = None
+    elif fake_redis:
+        from importlib.metadata import version
+        env['redis'] = f"fakeredis {version('fakeredis')}"
+    return env
+
+
+def write_results(benchmark, args, results, fake_redis, output=None):
+    """
+    Store a run as JSON, by default in benchmarks/results/<benchmark>-<commit>.json,
+    for benchmarks.compare
+    """
+    env = environment(fake_redis)
+    if output is None:
+        label = (env['commit'] or 'unknown')[:10] + ('-dirty' if env['dirty'] else '')
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{benchmark}-{label}.json")
+
+    document = {
+        'benchmark': benchmark,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'command': ' '.join([os.path.basename(sys.executable), '-m', f'benchmarks.{benchmark}', *sys.argv[1:]]),
+        'environment': env,
+        'parameters': {key: value for key, value in vars(args).items() if key != 'output'},
+        'results': results
+    }
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+    return output
+
+
+def save_results(benchmark, args, results, redis=True):
+    """
+    write_results() with the add_arguments() options, unless --no-save was given
+
+    Args:
+        redis: False if this run did not use Redis at all
+    """
+    if args.no_save:
+        return
+    fake_redis = not args.real_redis if redis and 'real_redis' in args else None
+    print(f"\nSaved {write_results(benchmark, args, results, fake_redis=fake_redis, output=args.output)}")
@@ -0,0 +1,96 @@
+"""
+Compare two stored benchmark runs, e.g. before and after a change
+
+Run from flask_backend/:
+    python -m benchmarks.compare benchmarks/results/load-<old>.json benchmarks/results/load-<new>.json
+
+Rows are matched by name. A row regresses when its throughput drops, or
+its p99 latency grows, by more than --threshold percent; for
+benchmarks.cache_memory, when its size in bytes grows by more than that.
+The exit status is 1 if any row regressed, so the comparison can gate CI.
+Differences in parameters or environment are printed first, since they
+make the numbers incomparable.
+"""
+import argparse
+import json
+import sys
+
+
+def change(old, new):
+    return (new - old) / old * 100 if old else 0.0
+
+
+def differences(baseline, candidate, section):
+    old, new = baseline.get(section, {}), candidate.get(section, {})
+    ignored = {'commit', 'dirty'}
+    return [(key, old.get(key), new.get(key)) for key in sorted(set(old) | set(new))
+            if key not in ignored and old.get(key) != new.get(key)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='percent change in throughput or p99 counted as a regression')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline['benchmark'] != candidate['benchmark']:
+        parser.error(f"cannot compare a {baseline['benchmark']} run with a {candidate['benchmark']} run")
+
+    for label, run in (('baseline', baseline), ('candidate', candidate)):
+        env = run['environment']
+        print(f"{label:<10} {(env['commit'] or 'unknown')[:10]}{' (dirty)' if env['dirty'] else ''}  {run['created']}")
+    for section in ('parameters', 'environment'):
+        for key, old, new in differences(baseline, candidate, section):
+            print(f"warning: {section} differ, {key}: {old!r} -> {new!r}")
+    print()
+
+    old_rows = {row['name']: row for row in baseline['results']}
+    sizes = baseline['benchmark'] == 'cache_memory'
+    regressions = 0
+    if sizes:
+        print(f"{'name':<40} {'total MB':>9} {'change':>8} {'redis MB':>9} {'change':>8}")
+    else:
+        print(f"{'name':<40} {'throughput':>11} {'change':>8} {'p50 ms':>9} {'change':>8} "
+              f"{'p99 ms':>9} {'change':>8}")
+    for row in candidate['results']:
+        old = old_rows.get(row['name'])
+        if old is None:
+            print(f"{row['name']:<40} {'new':>11}")
+            continue
+
+        if sizes:
+            total = change(old['total_bytes'], row['total_bytes'])
+            used = change(old.get('redis_bytes', 0), row.get('redis_bytes', 0))
+            regressed = total > args.threshold or used > args.threshold
+            print(f"{row['name']:<40} {row['total_bytes'] / 1e6:>9.2f} {total:>+7.1f}% "
+                  f"{row.get('redis_bytes', 0) / 1e6:>9.2f} {used:>+7.1f}%"
+                  f"{'  REGRESSION' if regressed else ''}")
+        else:
+            throughput = change(old['throughput'], row['throughput'])
+            p50 = change(old['p50_ms'], row['p50_ms'])
+            p99 = change(old['p99_ms'], row['p99_ms'])
+            regressed = throughput < -args.threshold or p99 > args.threshold or row['errors'] > old['errors']
+            print(f"{row['name']:<40} {row['throughput']:>11.1f} {throughput:>+7.1f}% "
+                  f"{row['p50_ms']:>9.3f} {p50:>+7.1f}% {row['p99_ms']:>9.3f} {p99:>+7.1f}%"
+                  f"{'  REGRESSION' if regressed else ''}")
+        regressions += regressed
+
+    new_names = {row['name'] for row in candidate['results']}
+    for row in baseline['results']:
+        if row['name'] not in new_names:
+            print(f"{row['name']:<40} {'missing':>11}")
+
+    if regressions:
+        print(f"\n{regressions} regression(s) beyond {args.threshold:g}%")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Micro-benchmarks of each scalability component on the translation path
+
+Run from flask_backend/:
+    python -m benchmarks.components [--iterations 20000] [--filter cache.]
+
+Every case is timed call by call after a warm-up, against an in-process
+fakeredis server unless --real-redis is given (localhost:6379, db 15,
+flushed first). Results are printed and stored as JSON in
+benchmarks/results/ for benchmarks.compare.
+"""
+import argparse
+import itertools
+import random
+import time
+
+from benchmarks.common import add_arguments, parse_mix, print_results, random_text, save_results, summarize, use_redis
+
+
+def measure(name, function, iterations):
+    for _ in range(min(iterations, 200)):
+        function()
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(name, latencies, time.perf_counter() - started)
+
+
+def cases(args):
+    """(name, callable, iterations divisor) for every component"""
+    from config import Config
+    from app import app
+    from scalability.cache import CacheService
+    from scalability.cache_keys import translation_key
+    from scalability.circuit_breaker import CircuitBreaker
+    from scalability.codec import ValueCodec
+    from scalability.local_cache import LocalCache
+    from scalability.metrics import Histogram
+    from scalability.rate_limiter import RateLimiter
+    from scalability.redis_pool import get_shared_pool
+
+    rng = random.Random(args.seed)
+    counter = itertools.count()
+    short = random_text(rng, parse_mix('short'))
+    sentence = random_text(rng, parse_mix('sentence'))
+    document = random_text(rng, parse_mix('document'))
+    codec = ValueCodec(Config.CACHE_SERIALIZER, Config.CACHE_COMPRESSOR, Config.CACHE_COMPRESS_THRESHOLD)
+
+    yield 'cache_keys.translation_key short', lambda: translation_key(short, 'en', 'fr'), 1
+    yield 'cache_keys.translation_key document', lambda: translation_key(document, 'en', 'fr'), 10
+
+    for label, text in (('sentence', sentence), ('document', document)):
+        value = {'translated': text}
+        encoded = codec.encode(value)
+        yield f'codec.encode {label}', lambda value=value: codec.encode(value), 1 if label == 'sentence' else 20
+        yield f'codec.decode {label}', lambda encoded=encoded: codec.decode(encoded), 1 if label == 'sentence' else 20
+
+    local = LocalCache(max_entries=Config.CACHE_LOCAL_MAX_ENTRIES, max_bytes=Config.CACHE_LOCAL_MAX_BYTES)
+    local.set('hit', {'translated': sentence}, 3600, len(sentence))
+    yield 'local_cache.get hit', lambda: local.get('hit'), 1
+    yield 'local_cache.set', lambda: local.set(f'key:{next(counter) % 1000}', {'translated': short}, 3600, 64), 1
+
+    pool = get_shared_pool()
+    yield 'redis_pool.client', lambda: pool.client(decode_responses=True), 1
+
+    # Generous limits: the check runs in full but never rejects
+    limiter = RateLimiter()
+    emission, tolerance = 60 / 10 ** 9, 60
+    yield 'rate_limiter.check redis', lambda: limiter._check('rate_limit:benchmark', emission, tolerance, 1), 4
+    yield 'rate_limiter.check local', lambda: limiter._local.check('rate_limit:benchmark', emission, tolerance, 1), 1
+
+    breaker = CircuitBreaker(name='benchmark')
+    yield 'circuit_breaker.call closed', lambda: breaker.call(lambda: None), 1
+
+    histogram = Histogram('components_benchmark_seconds', 'Benchmark histogram').labels()
+    yield 'metrics.histogram observe', lambda: histogram.observe(0.003), 1
+
+    with_local = CacheService(local_cache=LocalCache(), codec=codec)
+    redis_only = CacheService(codec=codec)
+    value = {'translated': sentence}
+    with_local.cache_with_fallback('benchmark:hit', lambda: value)
+    yield 'cache.cache_with_fallback L1 hit', lambda: with_local.cache_with_fallback('benchmark:hit', dict), 1
+    yield 'cache.cache_with_fallback Redis hit', lambda: redis_only.cache_with_fallback('benchmark:hit', dict), 4
+    yield 'cache.cache_with_fallback miss', \
+        lambda: redis_only.cache_with_fallback(f'benchmark:miss:{next(counter)}', lambda: value), 8
+
+    keys = [f'benchmark:many:{index}' for index in range(100)]
+    redis_only.set_many({key: value for key in keys})
+    yield 'cache.get_many 100 keys', lambda: redis_only.get_many(keys), 40
+    yield 'cache.set_many 100 keys', lambda: redis_only.set_many({key: value for key in keys}), 40
+
+    # The whole view without the WSGI layer: limiter, breaker, L1 hit, JSON encode
+    view = app.view_functions['translate']
+    body = {'text': sentence, 'targetLang': 'fr'}
+    headers = {'X-API-Key': 'benchmark'}
+
+    def translate_view():
+        with app.test_request_context('/api/translate', method='POST', json=body, headers=headers):
+            view()
+
+    yield 'app.translate view L1 hit', translate_view, 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000,
+                        help='calls per case (expensive cases run a fraction of this)')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+    parser.add_argument('--seed', type=int, default=42)
+    add_arguments(parser, 'components')
+    args = parser.parse_args()
+
+    use_redis(args)
+
+    from config import Config
+    Config.RATE_LIMIT_API_KEY_LIMITS = {'benchmark': (10 ** 9, 60)}
+    # Metrics stay on, as in production, but are not pushed mid-run
+    Config.METRICS_FLUSH_INTERVAL = 3600
+
+    from app import app
+    results = []
+    with app.app_context():
+        for name, function, divisor in cases(args):
+            if args.filter in name:
+                results.append(measure(name, function, max(1, args.iterations // divisor)))
+
+    print_results(results)
+    save_results('components', args, results)
+
+
+if __name__ == '__main__':
+    main()
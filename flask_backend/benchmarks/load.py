@@ -0,0 +1,150 @@
+"""
+End-to-end load test of /api/translate through the rate limiter, circuit breaker and cache
+
+Run from flask_backend/:
+    python -m benchmarks.load --concurrency 1 8 32 --requests 2000 \\
+        --hit-ratio 0.8 --mix short=0.7,sentence=0.25,document=0.05
+
+Requests go through the app in-process (the Flask or Quart test client),
+so the numbers cover the views and everything behind them but no HTTP
+server; see benchmarks.sync_vs_async for that. --hit-ratio of the
+requests repeat one of --hot-keys texts, which are translated once before
+timing starts; the rest are new texts that go to the simulated backend.
+Text lengths are drawn from --mix. The same --seed gives the same
+requests, so runs of different commits are comparable; results are stored
+as JSON in benchmarks/results/ for benchmarks.compare.
+"""
+import argparse
+import asyncio
+import random
+import time
+from threading import Thread
+
+from benchmarks.common import add_arguments, parse_mix, print_results, random_text, save_results, summarize, use_redis
+
+API_KEY = 'benchmark'
+HEADERS = {'X-API-Key': API_KEY}
+
+
+def workload(rng, hot, count, hit_ratio, mix, level):
+    """count request bodies; misses are made unique per concurrency level"""
+    bodies = []
+    for index in range(count):
+        if rng.random() < hit_ratio:
+            text = rng.choice(hot)
+        else:
+            text = f"{random_text(rng, mix)} ({level}-{index})"
+        bodies.append({'text': text, 'targetLang': 'fr'})
+    return bodies
+
+
+def run_sync(app, bodies, concurrency):
+    """Latencies and errors of bodies sent from concurrency threads"""
+    latencies = []
+    errors = [0]
+
+    def client(share):
+        test_client = app.test_client()
+        for body in share:
+            started = time.perf_counter()
+            response = test_client.post('/api/translate', json=body, headers=HEADERS)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors[0] += 1
+
+    threads = [Thread(target=client, args=(bodies[index::concurrency],)) for index in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+async def run_async(app, bodies, concurrency):
+    """Latencies and errors of bodies sent from concurrency tasks"""
+    latencies = []
+    errors = 0
+    test_client = app.test_client()
+
+    async def client(share):
+        nonlocal errors
+        for body in share:
+            started = time.perf_counter()
+            response = await test_client.post('/api/translate', json=body, headers=HEADERS)
+            await response.get_data()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(bodies[index::concurrency]) for index in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def load_app(mode):
+    if mode == 'sync':
+        from app import app
+        return app, run_sync
+
+    from asgi import app
+    # Async Redis clients stay bound to the loop they were first used on,
+    # so every run shares one loop, as under an ASGI server
+    loop = asyncio.new_event_loop()
+    return app, lambda app, bodies, concurrency: loop.run_until_complete(run_async(app, bodies, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apps', nargs='+', choices=['sync', 'async'], default=['sync'],
+                        help='app.py (threads) and/or asgi.py (tasks, needs quart)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=2000, help='requests per concurrency level')
+    parser.add_argument('--hit-ratio', type=float, default=0.8)
+    parser.add_argument('--hot-keys', type=int, default=100)
+    parser.add_argument('--mix', default='short=0.7,sentence=0.25,document=0.05',
+                        help='text size weights, from short, sentence, paragraph and document')
+    parser.add_argument('--backend-ms', type=float, default=5,
+                        help='simulated backend latency per batch call')
+    parser.add_argument('--no-local-cache', action='store_true', help='disable the L1 cache')
+    parser.add_argument('--seed', type=int, default=42)
+    add_arguments(parser, 'load')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    use_redis(args)
+
+    from config import Config
+    # The limiter still runs on every request, it just never trips
+    Config.RATE_LIMIT_API_KEY_LIMITS = {API_KEY: (10 ** 9, 60)}
+    Config.TRANSLATION_BACKEND = 'fake'
+    Config.TRANSLATION_BACKEND_OPTIONS = {'call_overhead_ms': args.backend_ms}
+    if args.no_local_cache:
+        Config.CACHE_LOCAL_MAX_ENTRIES = 0
+
+    rng = random.Random(args.seed)
+    hot = [random_text(rng, mix) for _ in range(args.hot_keys)]
+    levels = [(level, workload(rng, hot, args.requests, args.hit_ratio, mix, level))
+              for level in args.concurrency]
+
+    hot_texts = set(hot)
+    results = []
+    for mode in args.apps:
+        app, run = load_app(mode)
+        # Translate the hot texts once so they are hits from the first timed request
+        run(app, [{'text': text, 'targetLang': 'fr'} for text in hot], 1)
+
+        for level, bodies in levels:
+            # Each app sees new misses, or the second one would only get hits
+            bodies = [dict(body, text=f"{body['text']} [{mode}]") if body['text'] not in hot_texts else body
+                      for body in bodies]
+            latencies, errors, seconds = run(app, bodies, level)
+            results.append(summarize(f"{mode} c={level}", latencies, seconds, errors,
+                                     app=mode, concurrency=level))
+
+    print_results(results, unit='req/s')
+    save_results('load', args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Cost of the metrics instrumentation on the request path
+
+Run from flask_backend/:
+    python -m benchmarks.metrics_overhead --requests 5000
+
+Times single metric updates, CacheService.cache_with_fallback() on Redis
+hits, and whole /api/translate requests (limiter, breaker, L1 hit, JSON
+encode) through the Flask test client, with metrics enabled and disabled.
+Rounds alternate between the two, each going first in turn, and the
+median round is reported. Results are stored as JSON in
+benchmarks/results/ with one row per operation and setting, whose
+percentiles are over the rounds' mean time per call.
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.common import add_arguments, save_results, summarize, use_redis
+
+
+def per_call(function, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - started) / calls
+
+
+def compare(registry, function, calls, rounds):
+    """Seconds per call of every round, with metrics enabled (True) and disabled (False)"""
+    timings = {True: [], False: []}
+    for index in range(rounds):
+        # Whichever runs second in a round tends to be faster, so take turns
+        for enabled in ((True, False) if index % 2 else (False, True)):
+            registry.enabled = enabled
+            timings[enabled].append(per_call(function, calls))
+    registry.enabled = True
+    return timings
+
+
+def report(name, timings, calls, results):
+    """Print the median cost of metrics on one operation and add its result rows"""
+    enabled, disabled = statistics.median(timings[True]), statistics.median(timings[False])
+    overhead = enabled - disabled
+    print(f"{name:<34} {enabled * 1e6:>10.2f} {disabled * 1e6:>10.2f} "
+          f"{overhead * 1e6:>10.2f} {overhead / disabled * 100:>8.1f}%")
+    for setting, label in ((True, 'on'), (False, 'off')):
+        seconds = sum(timings[setting]) * calls
+        results.append(summarize(f"{name} metrics {label}", timings[setting], seconds,
+                                 count=calls * len(timings[setting]),
+                                 throughput=calls * len(timings[setting]) / seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000, help='calls per round')
+    parser.add_argument('--rounds', type=int, default=10)
+    add_arguments(parser, 'metrics_overhead')
+    args = parser.parse_args()
+
+    use_redis(args)
+
+    from config import Config
+    Config.RATE_LIMIT_API_KEY_LIMITS = {'benchmark': (10 ** 9, 60)}
+
+    from app import app
+    from scalability.cache import CacheService
+    from scalability.metrics import REGISTRY, Counter, Histogram
+
+    counter = Counter('benchmark_events', 'Benchmark counter').labels()
+    histogram = Histogram('benchmark_seconds', 'Benchmark histogram').labels()
+
+    cache = CacheService()
+    cache.cache_with_fallback('benchmark:hit', lambda: {'translated': 'hit'})
+
+    client = app.test_client()
+    headers = {'X-API-Key': 'benchmark'}
+    payload = {'text': 'metrics overhead benchmark', 'targetLang': 'fr'}
+
+    def request():
+        response = client.post('/api/translate', json=payload, headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    request()
+
+    cases = (
+        ('counter inc', counter.inc, args.requests * 20),
+        ('histogram observe', lambda: histogram.observe(0.003), args.requests * 20),
+        ('cache_with_fallback (Redis hit)',
+         lambda: cache.cache_with_fallback('benchmark:hit', dict), args.requests),
+        ('POST /api/translate (L1 hit)', request, args.requests),
+    )
+    results = []
+    print(f"{'operation':<34} {'on us':>10} {'off us':>10} {'cost us':>10} {'cost':>9}")
+    for name, function, calls in cases:
+        report(name, compare(REGISTRY, function, calls, args.rounds), calls, results)
+
+    started = time.perf_counter()
+    REGISTRY.exposition()
+    elapsed = time.perf_counter() - started
+    results.append(summarize('/metrics scrape', [elapsed], elapsed))
+    print(f"\n/metrics scrape: {elapsed * 1000:.2f} ms")
+    save_results('metrics_overhead', args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Throughput of the micro-batching dispatcher against a simulated MT backend
+
+Run from flask_backend/:
+    python -m benchmarks.micro_batching --requests 400 --threads 32
+
+Each client thread translates one short text at a time, as single
+/api/translate requests do. "direct" calls the backend once per text;
+"batched" goes through MicroBatcher, which coalesces concurrent texts.
+Results are stored as JSON in benchmarks/results/ for benchmarks.compare.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import add_arguments, save_results, summarize
+from translation.backend import FakeBackend
+from translation.dispatcher import MicroBatcher
+
+
+def run(label, translate, requests, threads, calls):
+    def call(i):
+        started = time.perf_counter()
+        translate(f'text {i}')
+        return time.perf_counter() - started
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(call, range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed:>8.2f} {requests / elapsed:>10.1f} {calls():>8}")
+    return summarize(label, latencies, elapsed, backend_calls=calls())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--overhead-ms', type=float, default=50)
+    parser.add_argument('--item-ms', type=float, default=0.5)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--wait-ms', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=4,
+                        help='concurrent backend calls, for both modes')
+    add_arguments(parser, 'micro_batching', redis=False)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'seconds':>8} {'req/s':>10} {'calls':>8}")
+
+    # Direct calls are capped at the same backend concurrency as the dispatcher
+    backend = FakeBackend(args.overhead_ms, args.item_ms)
+    with ThreadPoolExecutor(max_workers=args.workers) as backend_pool:
+        def direct(text):
+            return backend_pool.submit(backend.translate_batch, [text], 'fr', 'en').result()
+        results = [run('direct', direct, args.requests, args.threads, lambda: backend.calls)]
+
+    backend = FakeBackend(args.overhead_ms, args.item_ms)
+    batcher = MicroBatcher(backend, max_batch_size=args.batch_size,
+                           max_wait_ms=args.wait_ms, workers=args.workers)
+    results.append(run('batched', lambda text: batcher.submit(text, 'fr', 'en').result(),
+                       args.requests, args.threads, lambda: backend.calls))
+    batcher.close()
+    save_results('micro_batching', args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Throughput and latency of the sync (WSGI) and async (ASGI) apps under many connections
+
+Run from flask_backend/:
+    python -m benchmarks.sync_vs_async --connections 1000 --duration 15
+
+Each mode is served by one process: app.py on Werkzeug's threaded server
+(a thread per connection, closed after each response) and asgi.py on
+uvicorn (keep-alive). The load generator runs --connections concurrent
+clients sending /api/translate requests back to back; --hit-ratio of them
+repeat a small set of hot texts, the rest are new texts that go to a
+simulated backend. Both servers use an in-process fakeredis server unless
+--real-redis is given. Results are stored as JSON in benchmarks/results/
+for benchmarks.compare.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+from benchmarks.common import add_arguments, print_results, save_results, summarize, use_redis
+
+HOST = '127.0.0.1'
+API_KEY = 'benchmark'
+HOT_TEXTS = [f'hot sentence number {i} for the translation cache' for i in range(100)]
+
+
+def serve(mode, port, args):
+    import resource
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    use_redis(args)
+
+    from config import Config
+    # The limiter still runs on every request, it just never trips
+    Config.RATE_LIMIT_API_KEY_LIMITS = {API_KEY: (10 ** 9, 60)}
+    Config.TRANSLATION_BACKEND = 'fake'
+    Config.TRANSLATION_BACKEND_OPTIONS = {'call_overhead_ms': args.backend_ms}
+
+    if mode == 'sync':
+        import logging
+        from werkzeug.serving import ThreadedWSGIServer, make_server
+        from app import app
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        ThreadedWSGIServer.request_queue_size = 4096
+        make_server(HOST, port, app, threaded=True).serve_forever()
+    else:
+        import uvicorn
+        from asgi import app
+        uvicorn.run(app, host=HOST, port=port, log_level='warning', access_log=False, backlog=4096)
+
+
+def start_server(mode, args):
+    with socket.socket() as probe:
+        probe.bind((HOST, 0))
+        port = probe.getsockname()[1]
+
+    command = [sys.executable, '-m', 'benchmarks.sync_vs_async', '--serve', mode,
+               '--port', str(port), '--backend-ms', str(args.backend_ms)]
+    if args.real_redis:
+        command.append('--real-redis')
+    server = subprocess.Popen(command)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return server, port
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+async def post(reader, writer, port, payload):
+    """Send one request, returning its status and whether the connection stays open"""
+    body = json.dumps(payload).encode()
+    writer.write(
+        f'POST /api/translate HTTP/1.1\r\nHost: {HOST}:{port}\r\n'
+        f'Content-Type: application/json\r\nX-API-Key: {API_KEY}\r\n'
+        f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+    )
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    keep_alive = True
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'connection' and value.strip().lower() == 'close':
+            keep_alive = False
+    await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def connect(port):
+    for attempt in range(50):
+        try:
+            return await asyncio.open_connection(HOST, port)
+        except OSError:
+            await asyncio.sleep(0.1 * (attempt + 1))
+    return None
+
+
+async def connection(port, args, barrier_wait, results):
+    conn = await connect(port)
+    # Failed connections still count towards the barrier so the others start
+    end = await barrier_wait()
+    if conn is None:
+        results['errors'] += 1
+        return
+
+    rng = random.Random()
+    try:
+        while time.monotonic() < end:
+            if rng.random() < args.hit_ratio:
+                text = rng.choice(HOT_TEXTS)
+            else:
+                text = f'{uuid.uuid4().hex} fresh sentence for the backend'
+
+            started = time.perf_counter()
+            if conn is None:
+                # The server closed the previous one; reconnecting is part of the cost
+                conn = await connect(port)
+                if conn is None:
+                    raise OSError("Could not reconnect")
+            status, keep_alive = await post(*conn, port, {'text': text, 'targetLang': 'fr'})
+            results['latencies'].append(time.perf_counter() - started)
+            if status != 200:
+                results['errors'] += 1
+            if not keep_alive:
+                conn[1].close()
+                conn = None
+    except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+        results['errors'] += 1
+    finally:
+        if conn is not None:
+            conn[1].close()
+
+
+def client(port, connections, args, barrier, queue):
+    async def main():
+        results = {'latencies': [], 'errors': 0}
+        connected = 0
+        released = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        window = {}
+
+        async def barrier_wait():
+            nonlocal connected
+            connected += 1
+            if connected == connections:
+                # Every connection of this process is open; wait for the others
+                await loop.run_in_executor(None, barrier.wait)
+                window['end'] = time.monotonic() + args.duration
+                released.set()
+            await released.wait()
+            return window['end']
+
+        await asyncio.gather(*(connection(port, args, barrier_wait, results) for _ in range(connections)))
+        queue.put(results)
+
+    asyncio.run(main())
+
+
+def run(mode, args):
+    server, port = start_server(mode, args)
+    try:
+        processes = args.client_processes
+        barrier = multiprocessing.Barrier(processes)
+        queue = multiprocessing.Queue()
+        shares = [args.connections // processes + (i < args.connections % processes) for i in range(processes)]
+        workers = [
+            multiprocessing.Process(target=client, args=(port, share, args, barrier, queue))
+            for share in shares
+        ]
+        for worker in workers:
+            worker.start()
+        outcomes = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = [latency for outcome in outcomes for latency in outcome['latencies']]
+    errors = sum(outcome['errors'] for outcome in outcomes)
+    return summarize(f"{mode} c={args.connections}", latencies, args.duration, errors,
+                     app=mode, connections=args.connections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=15, help='seconds of load per mode')
+    parser.add_argument('--hit-ratio', type=float, default=0.8)
+    parser.add_argument('--backend-ms', type=float, default=20,
+                        help='simulated backend latency per batch call')
+    parser.add_argument('--client-processes', type=int, default=1)
+    parser.add_argument('--modes', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    add_arguments(parser, 'sync_vs_async')
+    parser.add_argument('--serve', choices=['sync', 'async'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args)
+        return
+
+    results = [run(mode, args) for mode in args.modes]
+    print_results(results, unit='req/s')
+    save_results('sync_vs_async', args, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,72 @@
 class Config:
     REDIS_HOST = 'localhost'
     REDIS_PORT = 6379
+    REDIS_DB = 0
+    REDIS_PASSWORD = None
+    # Shared connection pool used by the cache, rate limiter and circuit breaker
+    REDIS_MAX_CONNECTIONS = 50
+    REDIS_SOCKET_TIMEOUT = 2  # seconds
+    REDIS_HEALTH_CHECK_INTERVAL = 30  # seconds an idle connection may sit before a PING
+    REDIS_RECONNECT_BACKOFF_MAX = 30  # seconds between reconnect attempts, at most
     RATE_LIMIT_DEFAULT = 100  # requests per window
     RATE_LIMIT_WINDOW = 900   # 15 minutes in seconds
+    # Requests with a known API key in this header are limited per key instead
+    # of per address; unknown keys stay on the address limit
+    RATE_LIMIT_API_KEY_HEADER = 'X-API-Key'
+    RATE_LIMIT_API_KEY_LIMITS = {}  # api key -> (max_requests, window in seconds)
+    RATE_LIMIT_LOCAL_MAX_KEYS = 10000  # clients tracked while Redis is down
     CIRCUIT_BREAKER_THRESHOLD = 5
-    CIRCUIT_BREAKER_TIMEOUT = 60
\ No newline at end of file
+    CIRCUIT_BREAKER_TIMEOUT = 60
+    CACHE_TRANSLATION_TTL = 3600  # seconds a translation stays cached
+    # In-process L1 cache in front of Redis (0 entries disables it)
+    CACHE_LOCAL_MAX_ENTRIES = 10000
+    CACHE_LOCAL_MAX_BYTES = 32 * 1024 * 1024
+    # Stampede protection for cache misses
+    CACHE_LOCK_TTL_MS = 10000
+    CACHE_LOCK_WAIT_TIMEOUT = 5.0
+    # Probabilistic early refresh of hot keys before they expire (0 disables it;
+    # 1.0 is the usual XFetch setting). When on, every Redis lookup also reads
+    # the key's TTL and a '<key>:delta' compute time stored next to it
+    CACHE_EARLY_REFRESH_BETA = 0
+    # Popularity of a sample of lookups is kept in Redis so each worker can
+    # load the hottest translations into its L1 cache on startup (0 disables)
+    CACHE_HOT_KEYS_SAMPLE_RATE = 0.05
+    CACHE_WARM_TOP_KEYS = 1000
+    # Batch endpoint: each item counts as this many requests (0 = one per batch)
+    BATCH_MAX_ITEMS = 1000
+    RATE_LIMIT_BATCH_ITEM_COST = 0.1
+    # Cache value codec: 'json' or 'msgpack', compressed with 'zlib', 'zstd' or 'none'
+    # ('msgpack' and 'zstd' need the optional msgpack / zstandard packages)
+    CACHE_SERIALIZER = 'json'
+    CACHE_COMPRESSOR = 'zlib'
+    CACHE_COMPRESS_THRESHOLD = 1024  # bytes
+    # Default /api/translate segmentation: None (whole text), 'sentence' or 'paragraph'
+    TRANSLATION_SEGMENTATION = None
+    # /api/translate/stream: bytes read per chunk, characters held back while
+    # looking for a segment break, translatable segments per cache/backend round
+    STREAM_READ_SIZE = 16 * 1024
+    STREAM_MAX_BUFFER = 64 * 1024
+    STREAM_WINDOW_SEGMENTS = 16
+    # Translation engine: 'echo' (placeholder) or 'fake' (simulated latency)
+    TRANSLATION_BACKEND = 'echo'
+    TRANSLATION_BACKEND_OPTIONS = {}  # e.g. {'call_overhead_ms': 50} for 'fake'
+    # Micro-batching in front of the backend: flush a language pair after
+    # DISPATCH_MAX_WAIT_MS or DISPATCH_MAX_BATCH_SIZE items, whichever comes first
+    DISPATCH_MAX_BATCH_SIZE = 32
+    DISPATCH_MAX_WAIT_MS = 10
+    DISPATCH_MAX_QUEUE_SIZE = 10000
+    DISPATCH_WORKERS = 4  # concurrent backend calls
+    DISPATCH_SUBMIT_TIMEOUT = 5  # seconds to wait for queue space before a 503
+    DISPATCH_RESULT_TIMEOUT = 30  # seconds
+    # Asynchronous jobs: 'redis' (drained by worker.py) or 'memory' (drained in-process)
+    JOB_QUEUE_BACKEND = 'redis'
+    JOB_VISIBILITY_TIMEOUT = 300  # seconds before a claimed job is handed to another worker
+    JOB_RESULT_TTL = 3600  # seconds a finished job can be polled
+    JOB_MAX_ATTEMPTS = 3
+    JOB_WORKER_PROCESSES = 4
+    # Hosts job webhooks may target ('.example.com' includes subdomains);
+    # empty allows any host that resolves to public addresses only
+    JOB_WEBHOOK_ALLOWED_HOSTS = []
+    # Prometheus metrics on /metrics, summed across worker processes in Redis
+    METRICS_ENABLED = True
+    METRICS_FLUSH_INTERVAL = 5  # seconds between pushes of each process's counts
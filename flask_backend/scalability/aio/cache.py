@@ -0,0 +1,120 @@
+import asyncio
+import inspect
+import logging
+import redis
+import redis.asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from ..cache import CacheService, Flow, INVALIDATION_CHANNEL, _CLIENT, _Call, _Sleep
+from ..redis_pool import CONNECTION_ERRORS
+from .redis_pool import AsyncRedisPool, get_shared_async_pool
+
+logger = logging.getLogger(__name__)
+
+class AsyncCacheService(CacheService):
+    """
+    CacheService for coroutines, on redis.asyncio
+
+    Runs CacheService's flows with every Redis command and callback
+    awaited, so keys, values, locks and invalidation messages are the same
+    and both serving modes share one cache. The public methods are
+    CacheService's and return coroutines here. Callbacks are coroutine
+    functions; concurrent misses for a key in this process await one
+    computation.
+    """
+
+    def __init__(self, redis_pool: Optional[AsyncRedisPool] = None, **kwargs: Any):
+        super().__init__(redis_pool=redis_pool or get_shared_async_pool(), **kwargs)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pubsub_task: Optional[asyncio.Task] = None
+        self._subscribing = False
+
+    async def redis_client(self) -> Optional[redis.asyncio.Redis]:
+        """Pooled client, or None while Redis is down and caching is bypassed"""
+        client = await self.redis_pool.client(decode_responses=False)
+        if client is not None and self.local_cache is not None and \
+                (self._pubsub_task is None or self._pubsub_task.done()) and not self._subscribing:
+            await self._subscribe_invalidations(client)
+        return client
+
+    async def _run(self, flow: Flow) -> Any:
+        """Drive a flow to completion, awaiting its steps"""
+        reply: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            try:
+                step = flow.throw(error) if error is not None else flow.send(reply)
+            except StopIteration as stop:
+                return stop.value
+
+            reply, error = None, None
+            try:
+                reply = await self._perform(step)
+            except BaseException as e:
+                # Let the flow handle it, or run its cleanup on the way out
+                error = e
+
+    async def _perform(self, step: Any) -> Any:
+        if step is _CLIENT:
+            return await self.redis_client()
+        if isinstance(step, _Call):
+            result = step.function(*step.args, **step.kwargs)
+            # Callbacks are coroutine functions; so are client commands
+            return await result if inspect.isawaitable(result) else result
+        if isinstance(step, _Sleep):
+            return await asyncio.sleep(step.seconds)
+        return await self._coalesce(step.key, lambda: self._run(step.flow()))
+
+    async def _coalesce(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Let concurrent tasks in this process share one computation of key"""
+        flight = self._inflight.get(key)
+        if flight is not None:
+            await asyncio.wait([flight], timeout=self.lock_wait_timeout)
+            if not flight.done() or flight.cancelled():
+                # The leader is stuck or was cancelled - compute it ourselves
+                return await compute()
+            return flight.result()
+
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight[key] = flight
+        try:
+            result = await compute()
+            flight.set_result(result)
+            return result
+        except Exception as e:
+            flight.set_exception(e)
+            # Waiters re-raise it; do not warn when there are none
+            flight.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            if not flight.done():
+                flight.cancel()
+
+    async def _subscribe_invalidations(self, client: redis.asyncio.Redis) -> None:
+        """Drop local copies of keys rewritten by other workers"""
+        self._subscribing = True
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(**{INVALIDATION_CHANNEL: self._handle_invalidation})
+            except redis.RedisError as e:
+                # Retried on the next use of the client
+                logger.error(f"Failed to subscribe to cache invalidations: {str(e)}")
+                await pubsub.close()
+                return
+
+            async def handle_error(error: BaseException, pubsub: Any) -> None:
+                # Invalidations may have been missed while disconnected
+                logger.error(f"Cache invalidation listener error: {str(error)}")
+                if self.local_cache is not None:
+                    self.local_cache.clear()
+                if isinstance(error, CONNECTION_ERRORS):
+                    self.redis_pool.mark_down(error)
+                await asyncio.sleep(1.0)
+
+            self._pubsub_task = asyncio.get_running_loop().create_task(
+                pubsub.run(exception_handler=handle_error),
+                name='cache-invalidations'
+            )
+        finally:
+            self._subscribing = False
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import redis
+from functools import wraps
+from threading import Lock
+from typing import Any, Awaitable, Callable, Dict, Optional
+from ..circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from ..redis_pool import CONNECTION_ERRORS
+from .redis_pool import AsyncRedisPool, get_shared_async_pool
+
+logger = logging.getLogger(__name__)
+
+class AsyncCircuitBreaker(CircuitBreaker):
+    """
+    CircuitBreaker for coroutines
+
+    The state machine is the one CircuitBreaker uses; its lock is only held
+    for bookkeeping, never across an await. Redis sync runs as a task on
+    the event loop instead of a thread, started on first use.
+    """
+
+    _registry: Dict[str, 'AsyncCircuitBreaker'] = {}
+    _registry_lock = Lock()
+
+    def __init__(self, redis_pool: Optional[AsyncRedisPool] = None, **kwargs: Any):
+        self._sync_task: Optional[asyncio.Task] = None
+        self._async_wakeup: Optional[asyncio.Event] = None
+        super().__init__(redis_pool=redis_pool or get_shared_async_pool(), **kwargs)
+
+    def protect(self):
+        def decorator(f):
+            @wraps(f)
+            async def wrapped(*args, **kwargs):
+                self._start_sync_task()
+                allowed, probe, retry_after = self._before_call()
+                if not allowed:
+                    return self._rejection(retry_after), 503
+
+                try:
+                    result = await f(*args, **kwargs)
+                except Exception:
+                    self._after_call(False, probe)
+                    raise
+
+                self._after_call(self._response_outcome(result), probe)
+                return result
+
+            return wrapped
+        return decorator
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        """
+        Await func(*args, **kwargs) through the breaker
+
+        Raises:
+            CircuitOpenError: If the circuit is open or out of half-open probes
+        """
+        self._start_sync_task()
+        allowed, probe, retry_after = self._before_call()
+        if not allowed:
+            raise CircuitOpenError(self.name, retry_after)
+
+        try:
+            result = await func(*args, **kwargs)
+        except Exception:
+            self._after_call(False, probe)
+            raise
+
+        self._after_call(True, probe)
+        return result
+
+    def _start_sync_thread(self):
+        # Needs a running event loop, see _start_sync_task()
+        pass
+
+    def _start_sync_task(self):
+        # A new task is needed too if the loop it ran on has gone away
+        if self._sync_task is None or self._sync_task.done():
+            self._async_wakeup = asyncio.Event()
+            self._sync_task = asyncio.get_running_loop().create_task(
+                self._async_sync_loop(), name=f'circuit-breaker-sync-{self.name}'
+            )
+
+    def _mark_dirty(self):
+        self._dirty = True
+        if self._async_wakeup is not None:
+            self._async_wakeup.set()
+
+    async def _async_sync_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._async_wakeup.wait(), self.sync_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._async_wakeup.clear()
+
+            client = await self.redis_pool.client(decode_responses=True)
+            if client is None:
+                continue
+
+            try:
+                if self._dirty:
+                    pipeline = client.pipeline()
+                    self._queue_state_update(pipeline)
+                    await pipeline.execute()
+                elif self.state == CircuitState.CLOSED:
+                    self._adopt_remote_state(await client.get(self.redis_key))
+            except redis.RedisError as e:
+                logger.error(f"Redis error: {str(e)}")
+                if isinstance(e, CONNECTION_ERRORS):
+                    self.redis_pool.mark_down(e)
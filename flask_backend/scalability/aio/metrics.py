@@ -0,0 +1,28 @@
+import logging
+import redis
+from typing import Optional
+from ..metrics import REGISTRY, TOTALS_KEY, MetricsRegistry
+from ..redis_pool import CONNECTION_ERRORS
+from .redis_pool import AsyncRedisPool, get_shared_async_pool
+
+logger = logging.getLogger(__name__)
+
+async def exposition(registry: MetricsRegistry = REGISTRY, redis_pool: Optional[AsyncRedisPool] = None) -> str:
+    """MetricsRegistry.exposition() for the event loop, on redis.asyncio"""
+    pool = redis_pool or get_shared_async_pool()
+    client = await pool.client(decode_responses=True) if registry.enabled else None
+    if client is None:
+        return registry.render()
+
+    pipeline = client.pipeline()
+    taken = registry.queue_flush(pipeline)
+    pipeline.hgetall(TOTALS_KEY)
+    try:
+        totals = (await pipeline.execute())[-1]
+    except redis.RedisError as e:
+        registry.give_back(taken)
+        logger.error(f"Failed to read metrics: {str(e)}")
+        if isinstance(e, CONNECTION_ERRORS):
+            pool.mark_down(e)
+        return registry.render()
+    return registry.render(totals)
@@ -0,0 +1,64 @@
+import time
+import inspect
+import redis
+from functools import wraps
+from typing import Any, Callable, Optional, Tuple, Union
+from quart import request
+from ..rate_limiter import RateLimiter, _script_args
+from .redis_pool import AsyncRedisPool, get_shared_async_pool
+
+class AsyncRateLimiter(RateLimiter):
+    """
+    RateLimiter for Quart views, checking limits with redis.asyncio
+
+    Keys, limits and the GCRA script are the ones RateLimiter uses, so both
+    serving modes share one budget per client.
+    """
+
+    def __init__(self, redis_pool: Optional[AsyncRedisPool] = None, **kwargs: Any):
+        super().__init__(redis_pool=redis_pool or get_shared_async_pool(), **kwargs)
+
+    def limit(self,
+              max_requests: int = 100,
+              window: int = 60,
+              cost: Union[int, Callable[[], Any]] = 1) -> Callable:
+        """
+        Limit requests per client
+
+        Args:
+            max_requests: Requests allowed per window
+            window: Window length in seconds
+            cost: How many requests one call counts as, or a callable (or
+                  coroutine function) evaluated inside the request
+        """
+        def decorator(f: Callable) -> Callable:
+            @wraps(f)
+            async def wrapped(*args: Any, **kwargs: Any) -> Any:
+                weight = cost() if callable(cost) else cost
+                if inspect.isawaitable(weight):
+                    weight = await weight
+                started = time.perf_counter()
+                key, emission, tolerance, weight = self._plan(request, max_requests, window, weight)
+
+                allowed, retry_after = await self._check(key, emission, tolerance, weight)
+                self._record(allowed, started)
+                if not allowed:
+                    return self._rejection(retry_after)
+
+                return await f(*args, **kwargs)
+
+            return wrapped
+        return decorator
+
+    async def _check(self, key: str, emission: float, tolerance: float, weight: int) -> Tuple[bool, float]:
+        client = await self.redis_pool.client(decode_responses=True)
+        if not client:
+            return self._local.check(key, emission, tolerance, weight)
+
+        try:
+            return self._verdict(await self._script_for(client)(
+                keys=[key], args=_script_args(emission, tolerance, weight), client=client
+            ))
+        except redis.RedisError as e:
+            self._redis_error(e)
+            return self._local.check(key, emission, tolerance, weight)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import redis.asyncio
+from redis.asyncio.connection import async_timeout
+from threading import Lock
+from typing import Any, Optional, Type
+from ..redis_pool import RedisPool, CONNECTION_ERRORS, _PROBE, pool_from_config
+
+logger = logging.getLogger(__name__)
+
+class BlockingConnectionPool(redis.asyncio.BlockingConnectionPool):
+    """
+    redis.asyncio.BlockingConnectionPool that connects outside its lock
+
+    The stock pool connects while holding its condition and, when the
+    connect fails, releases the connection under that same (non-reentrant)
+    condition, which hangs the task for good as soon as Redis is down.
+    """
+
+    async def get_connection(self, command_name, *keys, **options):
+        try:
+            async with async_timeout(self.timeout):
+                async with self._condition:
+                    await self._condition.wait_for(self.can_get_connection)
+                    try:
+                        connection = self._available_connections.pop()
+                    except IndexError:
+                        connection = self.make_connection()
+                    self._in_use_connections.add(connection)
+        except asyncio.TimeoutError as err:
+            raise redis.ConnectionError("No connection available.") from err
+
+        try:
+            await self.ensure_connection(connection)
+        except BaseException:
+            await self.release(connection)
+            raise
+        return connection
+
+class AsyncRedisPool(RedisPool):
+    """
+    RedisPool for redis.asyncio clients
+
+    Same lazy reconnect and backoff as RedisPool, with client() awaited
+    from the event loop. Clients are bound to the loop they are first
+    used on.
+    """
+
+    pool_class = BlockingConnectionPool
+    client_class = redis.asyncio.Redis
+
+    def __init__(self,
+                 connection_class: Type[redis.asyncio.Connection] = redis.asyncio.Connection,
+                 **kwargs: Any):
+        super().__init__(connection_class=connection_class, **kwargs)
+        self._probe_lock = asyncio.Lock()
+
+    async def client(self, decode_responses: bool = True) -> Optional[redis.asyncio.Redis]:
+        """Return a pooled client, or None while Redis is considered down"""
+        client = self._known_client(decode_responses)
+        if client is not _PROBE:
+            return client
+
+        async with self._probe_lock:
+            client = self._known_client(decode_responses)
+            if client is not _PROBE:
+                return client
+
+            client = self._get_client(decode_responses)
+            try:
+                await client.ping()
+            except CONNECTION_ERRORS as e:
+                self._record_failure(e)
+                return None
+
+            self._record_success()
+            return client
+
+    async def close(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        self._healthy = None
+        for client in clients:
+            await client.connection_pool.disconnect()
+
+_shared_pool: Optional[AsyncRedisPool] = None
+_shared_pool_lock = Lock()
+
+def get_shared_async_pool() -> AsyncRedisPool:
+    """The process-wide async pool used by default, configured from Config"""
+    global _shared_pool
+    if _shared_pool is not None:
+        return _shared_pool
+
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = pool_from_config(AsyncRedisPool)
+        return _shared_pool
+
+def set_shared_async_pool(pool: Optional[AsyncRedisPool]) -> None:
+    """Replace the process-wide async pool, e.g. with one backed by fakeredis"""
+    global _shared_pool
+    with _shared_pool_lock:
+        _shared_pool = pool
@@ -1,80 +1,665 @@
 import redis
-import json
-from typing import Optional, Callable, Any, Dict, Union
-from functools import wraps
-from flask import current_app
+import math
+import time
+import uuid
+import random
+import logging
+from threading import Lock, Event
+from typing import Optional, Callable, Any, Dict, Generator, List
+from .local_cache import LocalCache
+from .hot_keys import HotKeyTracker
+from .codec import ValueCodec
+from .redis_pool import RedisPool, CONNECTION_ERRORS, get_shared_pool
+from .metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    'cache_requests',
+    'Cache lookups, by tier and result',
+    ['tier', 'result']
+)
+CACHE_GET_SECONDS = Histogram(
+    'cache_get_seconds',
+    'Time spent reading cached values from Redis',
+    ['op']
+)
+CACHE_CALLBACK_SECONDS = Histogram(
+    'cache_callback_seconds',
+    'Time spent computing values on cache misses'
+)
+CACHE_SET_SECONDS = Histogram(
+    'cache_set_seconds',
+    'Time spent writing computed values to Redis',
+    ['op']
+)
+_LOCAL_HIT = CACHE_REQUESTS.labels('local', 'hit')
+_LOCAL_MISS = CACHE_REQUESTS.labels('local', 'miss')
+_REDIS_HIT = CACHE_REQUESTS.labels('redis', 'hit')
+_REDIS_MISS = CACHE_REQUESTS.labels('redis', 'miss')
+_GET_SECONDS = CACHE_GET_SECONDS.labels('get')
+_MGET_SECONDS = CACHE_GET_SECONDS.labels('mget')
+_SET_SECONDS = CACHE_SET_SECONDS.labels('set')
+_MSET_SECONDS = CACHE_SET_SECONDS.labels('mset')
+
+INVALIDATION_CHANNEL = 'cache:invalidate'
+
+_MISSING = object()
+
+# Compare-and-delete so a worker never releases a lock it no longer owns
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# The caching logic below is written once, as generator "flows" that yield
+# the I/O they need as steps and receive each step's result (or have its
+# exception thrown in). CacheService performs steps with blocking calls and
+# AsyncCacheService awaits them, so both serving modes make the same
+# decisions against the same keys.
+_CLIENT = object()  # -> the pooled client, or None while Redis is down
+
+class _Call:
+    """Step: call function(*args, **kwargs), awaiting the result in async mode"""
+    __slots__ = ('function', 'args', 'kwargs')
+
+    def __init__(self, function: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+
+class _Sleep:
+    """Step: pause without holding up other requests"""
+    __slots__ = ('seconds',)
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+class _Coalesce:
+    """Step: run flow() once for all concurrent callers of key in this process"""
+    __slots__ = ('key', 'flow')
+
+    def __init__(self, key: str, flow: Callable[[], 'Flow']):
+        self.key = key
+        self.flow = flow
+
+Flow = Generator[Any, Any, Any]
+
+class _Flight:
+    """A computation in progress that concurrent callers can wait on"""
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
 
 class CacheService:
-    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0):
-        self.redis_client: Optional[redis.Redis] = None
-        
-        try:
-            redis_client = redis.Redis(
-                host=host,
-                port=port,
-                db=db,
-                decode_responses=True,
-                socket_connect_timeout=2
-            )
-            # Test connection
-            redis_client.ping()
-            self.redis_client = redis_client
-        except redis.ConnectionError:
-            current_app.logger.warning("Redis not available - caching disabled")
-
-    def cache_with_fallback(self, 
-                          key: str, 
-                          callback: Callable[[], Any], 
+    def __init__(self,
+                 redis_pool: Optional[RedisPool] = None,
+                 local_cache: Optional[LocalCache] = None,
+                 codec: Optional[ValueCodec] = None,
+                 lock_ttl_ms: int = 10000,
+                 lock_wait_timeout: float = 5.0,
+                 lock_poll_interval: float = 0.05,
+                 early_refresh_beta: float = 0.0,
+                 hot_keys: Optional[HotKeyTracker] = None):
+        self.redis_pool = redis_pool or get_shared_pool()
+        # Optional L1 tier in front of Redis
+        self.local_cache = local_cache
+        # Optional popularity tracking, for warm()
+        self.hot_keys = hot_keys
+        # Values are stored as codec-encoded bytes; old JSON entries still decode
+        self.codec = codec or ValueCodec()
+        # Stampede protection: in-process flights plus a short Redis lock
+        self.lock_ttl_ms = lock_ttl_ms
+        self.lock_wait_timeout = lock_wait_timeout
+        self.lock_poll_interval = lock_poll_interval
+        # XFetch factor for probabilistic early refresh (0 disables it)
+        self.early_refresh_beta = early_refresh_beta
+        self._inflight: Dict[str, _Flight] = {}
+        self._inflight_lock = Lock()
+        self._release_lock: Optional[Any] = None
+        self.instance_id = uuid.uuid4().hex
+        self._pubsub_thread = None
+        self._subscribe_lock = Lock()
+        self._stats_lock = Lock()
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    @property
+    def redis_client(self) -> Optional[redis.Redis]:
+        """Pooled client, or None while Redis is down and caching is bypassed"""
+        client = self.redis_pool.client(decode_responses=False)
+        if client is not None and self.local_cache is not None and self._pubsub_thread is None:
+            self._subscribe_invalidations(client)
+        return client
+
+    def _redis_error(self, message: str, error: redis.RedisError) -> None:
+        self._log_error(f"{message}: {str(error)}")
+        if isinstance(error, CONNECTION_ERRORS):
+            self.redis_pool.mark_down(error)
+
+    def _log_error(self, message: str) -> None:
+        logger.error(message)
+
+    def _run(self, flow: Flow) -> Any:
+        """Drive a flow to completion, performing its steps with blocking calls"""
+        reply: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            try:
+                step = flow.throw(error) if error is not None else flow.send(reply)
+            except StopIteration as stop:
+                return stop.value
+
+            reply, error = None, None
+            try:
+                reply = self._perform(step)
+            except BaseException as e:
+                # Let the flow handle it, or run its cleanup on the way out
+                error = e
+
+    def _perform(self, step: Any) -> Any:
+        if step is _CLIENT:
+            return self.redis_client
+        if isinstance(step, _Call):
+            return step.function(*step.args, **step.kwargs)
+        if isinstance(step, _Sleep):
+            return time.sleep(step.seconds)
+        return self._coalesce(step.key, lambda: self._run(step.flow()))
+
+    def cache_with_fallback(self,
+                          key: str,
+                          callback: Callable[[], Any],
                           expires: int = 3600) -> Any:
         """
         Cache function results with proper error handling
-        
+
         Args:
             key: Cache key
             callback: Function to call if cache miss
             expires: Cache expiration in seconds
-            
+
         Returns:
             Cached or fresh data from callback
         """
-        if not self.redis_client:
-            return callback()
+        return self._run(self._cache_flow(key, callback, expires))
+
+    def _cache_flow(self, key: str, callback: Callable[[], Any], expires: int) -> Flow:
+        if self.hot_keys is not None:
+            self.hot_keys.record(key)
+
+        if self.local_cache is not None:
+            local_data = self.local_cache.get(key, _MISSING)
+            self._count_local(hit=local_data is not _MISSING)
+            if local_data is not _MISSING:
+                return local_data
+
+        client = yield _CLIENT
+        if not client:
+            return (yield _Coalesce(key, lambda: self._callback_flow(callback)))
 
         try:
             # Try to get cached data
-            cached_data = self.redis_client.get(key)
-            
+            started = time.perf_counter()
+            cached_data, ttl_ms, delta = yield from self._lookup(client, key)
+            _GET_SECONDS.observe(time.perf_counter() - started)
+
             if cached_data is not None:
-                try:
-                    # Since we use decode_responses=True, cached_data will be str
-                    return json.loads(str(cached_data))
-                except json.JSONDecodeError:
-                    current_app.logger.error(f"Failed to decode cached data for key: {key}")
+                self._count_redis(hit=True)
+                data = self._decode(key, cached_data)
+                if data is _MISSING:
                     # If cached data is corrupted, get fresh data
-                    return self._get_fresh_data(key, callback, expires)
-            
+                    return (yield from self._get_fresh_data(key, callback, expires))
+
+                if self._should_refresh_early(ttl_ms, delta):
+                    refreshed = yield from self._refresh_early(key, callback, expires)
+                    if refreshed is not _MISSING:
+                        return refreshed
+
+                self._remember(key, data, ttl_ms, expires, len(cached_data))
+                return data
+
             # Cache miss - get fresh data
-            return self._get_fresh_data(key, callback, expires)
-            
+            self._count_redis(hit=False)
+            return (yield from self._get_fresh_data(key, callback, expires))
+
+        except redis.RedisError as e:
+            self._redis_error("Cache error", e)
+            return (yield _Call(callback))
+
+    @staticmethod
+    def _callback_flow(callback: Callable[[], Any]) -> Flow:
+        return (yield _Call(callback))
+
+    def _lookup(self, client: Any, key: str) -> Flow:
+        """Fetch the value, plus its remaining TTL and compute time when needed"""
+        if self.local_cache is None and not self.early_refresh_beta:
+            return (yield _Call(client.get, key)), None, None
+
+        # Fetch everything in one round trip so the local copy never
+        # outlives the Redis entry and early refresh can be decided
+        pipeline = client.pipeline(transaction=False)
+        pipeline.get(key)
+        pipeline.pttl(key)
+        if self.early_refresh_beta:
+            pipeline.get(f"{key}:delta")
+        replies = yield _Call(pipeline.execute)
+
+        if self.early_refresh_beta:
+            return tuple(replies)
+        cached_data, ttl_ms = replies
+        return cached_data, ttl_ms, None
+
+    def _decode(self, key: str, cached_data: bytes) -> Any:
+        """Decoded value, or _MISSING when the stored bytes are corrupt"""
+        try:
+            return self.codec.decode(cached_data)
+        except ValueError:
+            self._log_error(f"Failed to decode cached data for key: {key}")
+            return _MISSING
+
+    def _remember(self, key: str, data: Any, ttl_ms: Optional[int], expires: int, size: int) -> None:
+        """Keep a value read from Redis in the L1 cache, for no longer than Redis will"""
+        if self.local_cache is not None:
+            ttl = ttl_ms / 1000 if ttl_ms is not None and ttl_ms > 0 else expires
+            self.local_cache.set(key, data, ttl, size)
+
+    def _should_refresh_early(self, ttl_ms: Optional[int], delta: Optional[bytes]) -> bool:
+        """XFetch: refresh with a probability that grows as expiry approaches"""
+        if not self.early_refresh_beta or ttl_ms is None or ttl_ms <= 0 or delta is None:
+            return False
+
+        try:
+            compute_time = float(delta)
+        except ValueError:
+            return False
+
+        # 1.0 - random() lies in (0, 1], so the logarithm is always defined
+        jitter = -math.log(1.0 - random.random())
+        return compute_time * self.early_refresh_beta * jitter >= ttl_ms / 1000
+
+    def _refresh_early(self, key: str, callback: Callable[[], Any], expires: int) -> Flow:
+        """Recompute a hot key if no other worker is already doing so"""
+        token = yield from self._acquire_lock(key)
+        if token is None:
+            return _MISSING
+
+        try:
+            return (yield from self._compute_and_store(key, callback, expires))
+        finally:
+            yield from self._release(key, token)
+
+    def _get_fresh_data(self,
+                       key: str,
+                       callback: Callable[[], Any],
+                       expires: int) -> Flow:
+        """Get fresh data and cache it, computing it once for concurrent misses"""
+        return (yield _Coalesce(key, lambda: self._compute_once(key, callback, expires)))
+
+    def _coalesce(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Let concurrent callers in this process share one computation of key"""
+        with self._inflight_lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = _Flight()
+                self._inflight[key] = flight
+
+        if not leader:
+            if not flight.event.wait(self.lock_wait_timeout):
+                # The leader is stuck - do not let it take us down too
+                return compute()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def _compute_once(self, key: str, callback: Callable[[], Any], expires: int) -> Flow:
+        """Compute key on a single worker, with the others waiting for its result"""
+        deadline = time.monotonic() + self.lock_wait_timeout
+
+        while True:
+            token = yield from self._acquire_lock(key)
+            if token is not None:
+                try:
+                    return (yield from self._compute_and_store(key, callback, expires))
+                finally:
+                    yield from self._release(key, token)
+
+            client = yield _CLIENT
+            if client is None or time.monotonic() >= deadline:
+                break
+
+            yield _Sleep(self.lock_poll_interval)
+            try:
+                cached_data = yield _Call(client.get, key)
+            except redis.RedisError as e:
+                self._redis_error("Cache error", e)
+                break
+
+            if cached_data is not None:
+                data = self._decode(key, cached_data)
+                if data is _MISSING:
+                    break
+                return data
+
+        # Lock holder is too slow or Redis is unavailable - compute it ourselves
+        return (yield from self._compute_and_store(key, callback, expires))
+
+    def _acquire_lock(self, key: str) -> Flow:
+        """Take the short-lived Redis lock for key, returning its token"""
+        token = uuid.uuid4().hex
+        client = yield _CLIENT
+        if client is None:
+            return token
+
+        try:
+            if (yield _Call(client.set, f"{key}:lock", token, nx=True, px=self.lock_ttl_ms)):
+                return token
+            return None
+        except redis.RedisError as e:
+            self._redis_error("Cache lock error", e)
+            # Without Redis nobody else can coordinate either
+            return token
+
+    def _release(self, key: str, token: str) -> Flow:
+        client = yield _CLIENT
+        if client is None:
+            return
+
+        if self._release_lock is None:
+            self._release_lock = client.register_script(_RELEASE_LOCK_SCRIPT)
+
+        try:
+            yield _Call(self._release_lock, keys=[f"{key}:lock"], args=[token], client=client)
         except redis.RedisError as e:
-            current_app.logger.error(f"Cache error: {str(e)}")
-            return callback()
-            
-    def _get_fresh_data(self, 
-                       key: str, 
-                       callback: Callable[[], Any], 
-                       expires: int) -> Any:
-        """Get fresh data and cache it"""
-        fresh_data = callback()
-        
-        if self.redis_client is None:
+            self._redis_error("Cache lock error", e)
+
+    def _compute_and_store(self,
+                           key: str,
+                           callback: Callable[[], Any],
+                           expires: int) -> Flow:
+        """Run the callback and cache its result"""
+        started = time.perf_counter()
+        fresh_data = yield _Call(callback)
+        compute_time = time.perf_counter() - started
+        CACHE_CALLBACK_SECONDS.observe(compute_time)
+
+        client = yield _CLIENT
+        if client is None:
             return fresh_data
-        
+
+        try:
+            # Only cache if data is serializable
+            encoded_value = self.codec.encode(fresh_data)
+            pipeline = client.pipeline(transaction=False)
+            pipeline.setex(key, expires, encoded_value)
+            if self.early_refresh_beta:
+                pipeline.setex(f"{key}:delta", expires, f"{compute_time:.6f}")
+            if self.local_cache is not None:
+                pipeline.publish(INVALIDATION_CHANNEL, self._invalidation_message(key))
+            started = time.perf_counter()
+            yield _Call(pipeline.execute)
+            _SET_SECONDS.observe(time.perf_counter() - started)
+            if self.local_cache is not None:
+                self.local_cache.set(key, fresh_data, expires, len(encoded_value))
+        except (TypeError, ValueError) as e:
+            self._log_error(f"Failed to cache data: {str(e)}")
+        except redis.RedisError as e:
+            # The value is already computed - do not make the caller pay twice
+            self._redis_error("Cache error", e)
+
+        return fresh_data
+
+    def get_many(self, keys: List[str], expires: int = 3600) -> Dict[str, Any]:
+        """
+        Look up several keys with a single MGET
+
+        Args:
+            keys: Cache keys
+            expires: Local cache TTL used when Redis does not report one
+
+        Returns:
+            Mapping of the keys that were found to their decoded values
+        """
+        return self._run(self._get_many_flow(keys, expires))
+
+    def _get_many_flow(self, keys: List[str], expires: int) -> Flow:
+        if self.hot_keys is not None:
+            for key in keys:
+                self.hot_keys.record(key)
+
+        found, remaining = self._local_many(keys)
+
+        client = (yield _CLIENT) if remaining else None
+        if not client:
+            return found
+
         try:
-            # Only cache if data is JSON serializable
-            cached_str = json.dumps(fresh_data)
-            self.redis_client.setex(key, expires, cached_str)
-        except (TypeError, json.JSONDecodeError) as e:
-            current_app.logger.error(f"Failed to cache data: {str(e)}")
-            
-        return fresh_data
\ No newline at end of file
+            started = time.perf_counter()
+            if self.local_cache is not None:
+                cached_values, *ttls = yield from self._fetch_many(client, remaining)
+            else:
+                cached_values = yield _Call(client.mget, remaining)
+                ttls = [None] * len(remaining)
+            _MGET_SECONDS.observe(time.perf_counter() - started)
+        except redis.RedisError as e:
+            self._redis_error("Cache error", e)
+            return found
+
+        self._collect_many(found, remaining, cached_values, ttls, expires)
+        return found
+
+    def _local_many(self, keys: List[str]):
+        """Split keys into values held in the L1 cache and keys to fetch from Redis"""
+        if self.local_cache is None:
+            return {}, keys
+
+        found: Dict[str, Any] = {}
+        remaining = []
+        for key in keys:
+            local_data = self.local_cache.get(key, _MISSING)
+            self._count_local(hit=local_data is not _MISSING)
+            if local_data is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = local_data
+        return found, remaining
+
+    @staticmethod
+    def _fetch_many(client: Any, keys: List[str]) -> Flow:
+        """MGET reply followed by each key's PTTL, in one round trip"""
+        pipeline = client.pipeline(transaction=False)
+        pipeline.mget(keys)
+        for key in keys:
+            pipeline.pttl(key)
+        return (yield _Call(pipeline.execute))
+
+    def _collect_many(self,
+                      found: Dict[str, Any],
+                      keys: List[str],
+                      cached_values: List[Optional[bytes]],
+                      ttls: List[Optional[int]],
+                      expires: int,
+                      count: bool = True) -> None:
+        """
+        Decode MGET replies into found, filling the L1 cache on the way
+
+        Args:
+            count: Count the replies as Redis hits and misses (not for warm-up)
+        """
+        for key, cached_data, ttl_ms in zip(keys, cached_values, ttls):
+            if count:
+                self._count_redis(hit=cached_data is not None)
+            if cached_data is None:
+                continue
+
+            data = self._decode(key, cached_data)
+            if data is _MISSING:
+                continue
+
+            found[key] = data
+            self._remember(key, data, ttl_ms, expires, len(cached_data))
+
+    def warm(self, count: int, expires: int = 3600) -> int:
+        """
+        Load the count most popular keys from Redis into the L1 cache
+
+        Meant for startup, so a new worker does not send its first burst of
+        hot traffic to Redis. Returns how many keys were loaded.
+        """
+        return self._run(self._warm_flow(count, expires))
+
+    def _warm_flow(self, count: int, expires: int) -> Flow:
+        if self.local_cache is None or self.hot_keys is None or count <= 0:
+            return 0
+
+        client = yield _CLIENT
+        if not client:
+            return 0
+
+        try:
+            keys = [key.decode('utf-8') for key in
+                    (yield _Call(client.zrevrange, self.hot_keys.redis_key, 0, count - 1))]
+            if not keys:
+                return 0
+            cached_values, *ttls = yield from self._fetch_many(client, keys)
+        except redis.RedisError as e:
+            self._redis_error("Cache warm-up error", e)
+            return 0
+
+        warmed: Dict[str, Any] = {}
+        self._collect_many(warmed, keys, cached_values, ttls, expires, count=False)
+        return len(warmed)
+
+    def set_many(self, values: Dict[str, Any], expires: int = 3600) -> None:
+        """Cache several values with one pipelined round trip of SETEX calls"""
+        return self._run(self._set_many_flow(values, expires))
+
+    def _set_many_flow(self, values: Dict[str, Any], expires: int) -> Flow:
+        client = (yield _CLIENT) if values else None
+        if not client:
+            return
+
+        encoded: Dict[str, bytes] = {}
+        for key, value in values.items():
+            try:
+                encoded[key] = self.codec.encode(value)
+            except (TypeError, ValueError) as e:
+                self._log_error(f"Failed to cache data: {str(e)}")
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key, encoded_value in encoded.items():
+                pipeline.setex(key, expires, encoded_value)
+                if self.local_cache is not None:
+                    pipeline.publish(INVALIDATION_CHANNEL, self._invalidation_message(key))
+            started = time.perf_counter()
+            yield _Call(pipeline.execute)
+            _MSET_SECONDS.observe(time.perf_counter() - started)
+        except redis.RedisError as e:
+            self._redis_error("Cache error", e)
+            return
+
+        if self.local_cache is not None:
+            for key, encoded_value in encoded.items():
+                self.local_cache.set(key, values[key], expires, len(encoded_value))
+
+    def invalidate(self, key: str) -> None:
+        """Remove a key from both tiers and tell other workers to drop it"""
+        return self._run(self._invalidate_flow(key))
+
+    def _invalidate_flow(self, key: str) -> Flow:
+        if self.local_cache is not None:
+            self.local_cache.delete(key)
+
+        client = yield _CLIENT
+        if client is None:
+            return
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            pipeline.delete(key)
+            pipeline.publish(INVALIDATION_CHANNEL, self._invalidation_message(key))
+            yield _Call(pipeline.execute)
+        except redis.RedisError as e:
+            self._redis_error("Cache error", e)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit and miss counters for each cache tier"""
+        with self._stats_lock:
+            redis_stats = {'hits': self.redis_hits, 'misses': self.redis_misses}
+
+        return {
+            'local': self.local_cache.stats() if self.local_cache is not None else {},
+            'redis': redis_stats
+        }
+
+    @staticmethod
+    def _count_local(hit: bool) -> None:
+        # LocalCache keeps its own totals for stats(); this feeds /metrics
+        (_LOCAL_HIT if hit else _LOCAL_MISS).inc()
+
+    def _count_redis(self, hit: bool) -> None:
+        (_REDIS_HIT if hit else _REDIS_MISS).inc()
+        with self._stats_lock:
+            if hit:
+                self.redis_hits += 1
+            else:
+                self.redis_misses += 1
+
+    def _invalidation_message(self, key: str) -> str:
+        return f"{self.instance_id}:{key}"
+
+    def _handle_invalidation(self, message: Dict[str, Any]) -> None:
+        """Drop the local copy of a key another worker rewrote or deleted"""
+        data = message['data']
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        sender, _, key = data.partition(':')
+        if sender != self.instance_id and self.local_cache is not None:
+            self.local_cache.delete(key)
+
+    def _subscribe_invalidations(self, client: redis.Redis) -> None:
+        """Drop local copies of keys rewritten by other workers"""
+        with self._subscribe_lock:
+            if self._pubsub_thread is not None:
+                return
+
+            def handle_error(error: Exception, pubsub: Any, thread: Any) -> None:
+                # Invalidations may have been missed while disconnected
+                logger.error(f"Cache invalidation listener error: {str(error)}")
+                if self.local_cache is not None:
+                    self.local_cache.clear()
+                if isinstance(error, CONNECTION_ERRORS):
+                    self.redis_pool.mark_down(error)
+                time.sleep(1.0)
+
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(**{INVALIDATION_CHANNEL: self._handle_invalidation})
+            except redis.RedisError as e:
+                # Retried on the next use of the client
+                logger.error(f"Failed to subscribe to cache invalidations: {str(e)}")
+                pubsub.close()
+                return
+
+            self._pubsub_thread = pubsub.run_in_thread(
+                sleep_time=1.0,
+                daemon=True,
+                exception_handler=handle_error
+            )
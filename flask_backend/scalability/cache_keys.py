@@ -0,0 +1,22 @@
+import re
+import hashlib
+import unicodedata
+
+KEY_VERSION = 'v1'
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: Unicode NFC with whitespace runs collapsed"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+def translation_key(text: str, source_lang: str, target_lang: str) -> str:
+    """
+    Build a compact, fixed-size cache key for a translation
+
+    The text is normalized and hashed with BLAKE2b so that the key length
+    does not depend on the size of the document being translated, e.g.
+    ``tr:v1:fr:en:5c1f...``.
+    """
+    digest = hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16).hexdigest()
+    return f"tr:{KEY_VERSION}:{source_lang}:{target_lang}:{digest}"
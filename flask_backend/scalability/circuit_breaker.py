@@ -1,133 +1,372 @@
 import time
+import logging
 import redis
 from enum import Enum
+from collections import deque
 from functools import wraps
-from flask import jsonify, current_app
-from threading import Lock
+from typing import Optional, Callable, Any, Dict, Deque, List
+from flask import jsonify
+from threading import Lock, Event, Thread
+from .redis_pool import RedisPool, CONNECTION_ERRORS, get_shared_pool
+from .metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_BREAKER_CHECK_SECONDS = Histogram(
+    'circuit_breaker_check_seconds',
+    'Time spent deciding whether a call may go through a circuit breaker',
+    ['breaker']
+)
+CIRCUIT_BREAKER_CALLS = Counter(
+    'circuit_breaker_calls',
+    'Calls admitted or rejected by a circuit breaker',
+    ['breaker', 'outcome']
+)
+CIRCUIT_BREAKER_TRANSITIONS = Counter(
+    'circuit_breaker_transitions',
+    'Circuit breaker state changes, by the state entered',
+    ['breaker', 'state']
+)
 
 class CircuitState(Enum):
     CLOSED = "closed"
     OPEN = "open"
     HALF_OPEN = "half_open"
 
+class CircuitOpenError(Exception):
+    """Raised by CircuitBreaker.call() when the circuit rejects a call"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Circuit '{name}' is open")
+        self.name = name
+        self.retry_after = retry_after
+
 class CircuitBreaker:
-    def __init__(self, failure_threshold=5, reset_timeout=60, half_open_timeout=30):
+    """
+    Thread-safe circuit breaker that trips on a rolling-window failure rate.
+
+    State lives in the process and is only locked around transitions and
+    outcome bookkeeping, never while the protected call runs. Transitions
+    are pushed to Redis by a background thread, which also adopts an OPEN
+    state published by other workers for the same named breaker.
+    """
+
+    _registry: Dict[str, 'CircuitBreaker'] = {}
+    _registry_lock = Lock()
+
+    def __init__(self,
+                 minimum_calls: int = 5,
+                 reset_timeout: int = 60,
+                 half_open_timeout: int = 30,
+                 name: str = 'default',
+                 failure_rate_threshold: float = 0.5,
+                 window: int = 60,
+                 window_buckets: int = 10,
+                 half_open_max_calls: int = 1,
+                 sync_interval: float = 1.0,
+                 redis_pool: Optional[RedisPool] = None):
+        self.name = name
         self.state = CircuitState.CLOSED
-        self.failures = 0
-        self.failure_threshold = failure_threshold
+        # Calls the window must hold before its failure rate can trip the circuit
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
         self.reset_timeout = reset_timeout
         self.half_open_timeout = half_open_timeout
-        self.last_failure_time = None
-        self.half_open_time = None
+        self.half_open_max_calls = half_open_max_calls
+        self.window = window
+        self.window_buckets = window_buckets
+        self._bucket_width = window / window_buckets
+        # Each bucket is [bucket_index, successes, failures]
+        self._buckets: Deque[List[int]] = deque()
+        self._half_open_in_flight = 0
+        self.last_failure_time: Optional[float] = None
+        self.half_open_time: Optional[float] = None
         self.lock = Lock()
-        
-        try:
-            self.redis_client = redis.Redis(
-                host='localhost',
-                port=6379,
-                db=0,
-                decode_responses=True,
-                socket_connect_timeout=2
-            )
-            self.redis_client.ping()
-        except redis.ConnectionError:
-            current_app.logger.warning("Redis not available - using local circuit breaker state")
-            self.redis_client = None
-
-    def get_circuit_state(self):
-        if not self.redis_client:
-            return self.state
 
-        try:
-            state = self.redis_client.get('circuit_state')
-            return CircuitState(state) if state else CircuitState.CLOSED
-        except redis.RedisError:
-            return self.state
+        self._check_seconds = CIRCUIT_BREAKER_CHECK_SECONDS.labels(name)
+        self._admitted = CIRCUIT_BREAKER_CALLS.labels(name, 'allowed')
+        self._rejected = CIRCUIT_BREAKER_CALLS.labels(name, 'rejected')
+        self._transitions = {
+            state: CIRCUIT_BREAKER_TRANSITIONS.labels(name, state.value) for state in CircuitState
+        }
+
+        self.redis_key = f'circuit_state:{name}'
+        self.sync_interval = sync_interval
+        self._dirty = False
+        self._sync_wakeup = Event()
+        self._sync_thread: Optional[Thread] = None
+        self.redis_pool = redis_pool or get_shared_pool()
+        self._start_sync_thread()
+
+    @classmethod
+    def get(cls, name: str, **kwargs: Any) -> 'CircuitBreaker':
+        """Return the breaker registered for a downstream dependency, creating it on first use"""
+        breaker = cls._registry.get(name)
+        if breaker is not None:
+            return breaker
+
+        with cls._registry_lock:
+            breaker = cls._registry.get(name)
+            if breaker is None:
+                breaker = cls(name=name, **kwargs)
+                cls._registry[name] = breaker
+            return breaker
+
+    def get_circuit_state(self) -> CircuitState:
+        return self.state
 
     def protect(self):
         def decorator(f):
             @wraps(f)
             def wrapped(*args, **kwargs):
-                with self.lock:
-                    current_state = self.get_circuit_state()
-                    current_time = time.time()
-
-                    if current_state == CircuitState.OPEN:
-                        if self.last_failure_time is not None and \
-                           (current_time - self.last_failure_time) >= self.reset_timeout:
-                            self._transition_to_half_open()
-                        else:
-                            retry_after = self.reset_timeout
-                            if self.last_failure_time is not None:
-                                retry_after = max(0, self.reset_timeout - 
-                                               int(current_time - self.last_failure_time))
-                            return jsonify({
-                                'error': 'Service temporarily unavailable',
-                                'retry_after': retry_after
-                            }), 503
-
-                    if current_state == CircuitState.HALF_OPEN:
-                        if self.half_open_time is not None and \
-                           (current_time - self.half_open_time) >= self.half_open_timeout:
-                            self._transition_to_closed()
-                        elif self.failures > 0:
-                            self._transition_to_open()
-                            return jsonify({
-                                'error': 'Service temporarily unavailable',
-                                'retry_after': self.reset_timeout
-                            }), 503
-
-                    try:
-                        result = f(*args, **kwargs)
-                        self.reset()
-                        return result
-                    except Exception as e:
-                        self.record_failure()
-                        raise
+                allowed, probe, retry_after = self._before_call()
+                if not allowed:
+                    return jsonify(self._rejection(retry_after)), 503
+
+                try:
+                    result = f(*args, **kwargs)
+                except Exception:
+                    self._after_call(False, probe)
+                    raise
+
+                self._after_call(self._response_outcome(result), probe)
+                return result
 
             return wrapped
         return decorator
 
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run func through the breaker outside of a Flask view
+
+        Raises:
+            CircuitOpenError: If the circuit is open or out of half-open probes
+        """
+        allowed, probe, retry_after = self._before_call()
+        if not allowed:
+            raise CircuitOpenError(self.name, retry_after)
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self._after_call(False, probe)
+            raise
+
+        self._after_call(True, probe)
+        return result
+
+    def _before_call(self):
+        """Decide whether a call may proceed: (allowed, is_probe, retry_after)"""
+        started = time.perf_counter()
+        decision = self._decide()
+        self._check_seconds.observe(time.perf_counter() - started)
+        (self._admitted if decision[0] else self._rejected).inc()
+        return decision
+
+    def _decide(self):
+        # Fast path: an unlocked read of the state is enough while closed
+        if self.state == CircuitState.CLOSED:
+            return True, False, 0
+
+        with self.lock:
+            current_time = time.time()
+
+            if self.state == CircuitState.OPEN:
+                elapsed = current_time - (self.last_failure_time or current_time)
+                if elapsed < self.reset_timeout:
+                    return False, False, max(0, self.reset_timeout - int(elapsed))
+                self._transition_to_half_open()
+
+            if self.state == CircuitState.HALF_OPEN:
+                # Probes that never reported back must not wedge the circuit
+                if self.half_open_time is not None and \
+                   (current_time - self.half_open_time) >= self.half_open_timeout:
+                    self.half_open_time = current_time
+                    self._half_open_in_flight = 0
+
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    return False, False, self.reset_timeout
+                self._half_open_in_flight += 1
+                return True, True, 0
+
+            return True, False, 0
+
+    @staticmethod
+    def _rejection(retry_after: int) -> Dict[str, Any]:
+        return {
+            'error': 'Service temporarily unavailable',
+            'retry_after': retry_after
+        }
+
+    def _after_call(self, success: Optional[bool], probe: bool) -> None:
+        """Account for a finished call; success None means it neither worked nor failed"""
+        with self.lock:
+            if success is None:
+                # Shed load: free the probe slot, but let a later call decide
+                if probe:
+                    self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                return
+
+            self._record_outcome(success)
+
+            if probe:
+                # Only probes decide a half-open circuit: a call admitted while
+                # closed that finishes late says nothing about the recovery
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if self.state == CircuitState.HALF_OPEN:
+                    if success:
+                        self._transition_to_closed()
+                    else:
+                        self._transition_to_open()
+                return
+
+            if not success and self.state == CircuitState.CLOSED and self._should_trip():
+                self._transition_to_open()
+
+    @staticmethod
+    def _response_outcome(result: Any) -> Optional[bool]:
+        """
+        Outcome of a view's response: 5xx responses are failures, like raised
+        exceptions, except 503. The views answer 503 when they shed load (a
+        full queue or an open downstream breaker), which says nothing about
+        whether the protected service works.
+        """
+        status = getattr(result, 'status_code', None)
+        if status is None and isinstance(result, tuple) and len(result) >= 2 \
+                and isinstance(result[1], int):
+            status = result[1]
+        if status == 503:
+            return None
+        return status is None or status < 500
+
+    def _record_outcome(self, success: bool) -> None:
+        index = int(time.time() // self._bucket_width)
+        buckets = self._buckets
+
+        if not buckets or buckets[-1][0] != index:
+            buckets.append([index, 0, 0])
+        while buckets and buckets[0][0] <= index - self.window_buckets:
+            buckets.popleft()
+
+        buckets[-1][1 if success else 2] += 1
+
+    def failure_rate(self) -> float:
+        """Failure rate over the rolling window (0.0 when no calls were made)"""
+        oldest = int(time.time() // self._bucket_width) - self.window_buckets
+        successes = failures = 0
+        for index, ok, failed in self._buckets:
+            if index > oldest:
+                successes += ok
+                failures += failed
+        total = successes + failures
+        return failures / total if total else 0.0
+
+    def _should_trip(self) -> bool:
+        oldest = int(time.time() // self._bucket_width) - self.window_buckets
+        total = sum(ok + failed for index, ok, failed in self._buckets if index > oldest)
+        if total < self.minimum_calls:
+            return False
+        return self.failure_rate() >= self.failure_rate_threshold
+
     def record_failure(self):
-        self.failures += 1
-        if self.failures >= self.failure_threshold:
-            self._transition_to_open()
+        self._after_call(False, False)
+
+    def record_success(self):
+        self._after_call(True, False)
 
     def reset(self):
-        self.failures = 0
-        self._transition_to_closed()
+        with self.lock:
+            self._buckets.clear()
+            self._transition_to_closed()
 
     def _transition_to_open(self):
         self.state = CircuitState.OPEN
         self.last_failure_time = time.time()
-        self._update_redis_state()
+        self._half_open_in_flight = 0
+        self._transitions[CircuitState.OPEN].inc()
+        self._mark_dirty()
 
     def _transition_to_half_open(self):
         self.state = CircuitState.HALF_OPEN
         self.half_open_time = time.time()
-        self.failures = 0
-        self._update_redis_state()
+        self._half_open_in_flight = 0
+        self._transitions[CircuitState.HALF_OPEN].inc()
+        self._mark_dirty()
 
     def _transition_to_closed(self):
         self.state = CircuitState.CLOSED
-        self.failures = 0
         self.last_failure_time = None
         self.half_open_time = None
-        self._update_redis_state()
+        self._half_open_in_flight = 0
+        self._buckets.clear()
+        self._transitions[CircuitState.CLOSED].inc()
+        self._mark_dirty()
 
-    def _update_redis_state(self):
-        if not self.redis_client:
+    @property
+    def redis_client(self) -> Optional[redis.Redis]:
+        """Pooled client, or None while Redis is down and only local state is used"""
+        return self.redis_pool.client(decode_responses=True)
+
+    def _mark_dirty(self):
+        self._dirty = True
+        self._sync_wakeup.set()
+
+    def _start_sync_thread(self):
+        self._sync_thread = Thread(
+            target=self._sync_loop,
+            name=f'circuit-breaker-sync-{self.name}',
+            daemon=True
+        )
+        self._sync_thread.start()
+
+    def _sync_loop(self):
+        while True:
+            self._sync_wakeup.wait(self.sync_interval)
+            self._sync_wakeup.clear()
+            client = self.redis_client
+            if client is None:
+                continue
+
+            try:
+                if self._dirty:
+                    self._update_redis_state(client)
+                else:
+                    self._pull_redis_state(client)
+            except redis.RedisError as e:
+                logger.error(f"Redis error: {str(e)}")
+                if isinstance(e, CONNECTION_ERRORS):
+                    self.redis_pool.mark_down(e)
+
+    def _pull_redis_state(self, client: redis.Redis):
+        """Adopt an OPEN state published by another worker"""
+        if self.state != CircuitState.CLOSED:
             return
-            
-        try:
-            pipeline = self.redis_client.pipeline()
-            pipeline.set('circuit_state', self.state.value)
-            
-            if self.state == CircuitState.OPEN:
-                pipeline.expire('circuit_state', self.reset_timeout)
-            elif self.state == CircuitState.HALF_OPEN:
-                pipeline.expire('circuit_state', self.half_open_timeout)
-                
-            pipeline.execute()
-        except redis.RedisError as e:
-            current_app.logger.error(f"Redis error: {str(e)}")
\ No newline at end of file
+        self._adopt_remote_state(client.get(self.redis_key))
+
+    def _adopt_remote_state(self, remote: Optional[str]) -> None:
+        if remote != CircuitState.OPEN.value:
+            return
+
+        with self.lock:
+            if self.state == CircuitState.CLOSED:
+                self.state = CircuitState.OPEN
+                self.last_failure_time = time.time()
+                self._transitions[CircuitState.OPEN].inc()
+
+    def _update_redis_state(self, client: redis.Redis):
+        pipeline = client.pipeline()
+        self._queue_state_update(pipeline)
+        pipeline.execute()
+
+    def _queue_state_update(self, pipeline: Any) -> None:
+        """Add the commands publishing the current state to a pipeline"""
+        with self.lock:
+            state = self.state
+            self._dirty = False
+
+        pipeline.set(self.redis_key, state.value)
+
+        if state == CircuitState.OPEN:
+            pipeline.expire(self.redis_key, self.reset_timeout)
+        elif state == CircuitState.HALF_OPEN:
+            pipeline.expire(self.redis_key, self.half_open_timeout)
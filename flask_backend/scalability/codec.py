@@ -0,0 +1,115 @@
+import json
+import zlib
+from typing import Any, Union
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Encoded values start with this byte followed by a format byte. Legacy
+# entries are plain JSON text, which can never start with 0xFE in UTF-8.
+MAGIC = 0xFE
+
+SERIALIZERS = {'json': 0x10, 'msgpack': 0x20}
+COMPRESSORS = {'none': 0x00, 'zlib': 0x01, 'zstd': 0x02}
+
+class ValueCodec:
+    """
+    Serializes cache values, compressing them above a size threshold
+
+    Args:
+        serializer: 'json' (compact separators) or 'msgpack'
+        compressor: 'zlib', 'zstd' or 'none'
+        compress_threshold: Payloads smaller than this many bytes are stored
+                            uncompressed
+    """
+
+    def __init__(self,
+                 serializer: str = 'json',
+                 compressor: str = 'zlib',
+                 compress_threshold: int = 1024,
+                 level: int = 3):
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown serializer: {serializer}")
+        if compressor not in COMPRESSORS:
+            raise ValueError(f"Unknown compressor: {compressor}")
+        if serializer == 'msgpack' and msgpack is None:
+            raise RuntimeError("msgpack serializer requested but msgpack is not installed")
+        if compressor == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd compressor requested but zstandard is not installed")
+
+        self.serializer = serializer
+        self.compressor = compressor
+        self.compress_threshold = compress_threshold
+        self.level = level
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if compressor == 'zstd' else None
+
+    def encode(self, value: Any) -> bytes:
+        """Raises TypeError if value cannot be serialized"""
+        if self.serializer == 'msgpack':
+            payload = msgpack.packb(value, use_bin_type=True)
+        else:
+            payload = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+        compressor = 'none'
+        if self.compressor != 'none' and len(payload) >= self.compress_threshold:
+            compressed = self._compress(payload)
+            # Incompressible payloads are kept as-is
+            if len(compressed) < len(payload):
+                payload = compressed
+                compressor = self.compressor
+
+        header = bytes((MAGIC, SERIALIZERS[self.serializer] | COMPRESSORS[compressor]))
+        return header + payload
+
+    def decode(self, raw: Union[bytes, str]) -> Any:
+        """Raises ValueError if raw is not a value this or an older codec wrote"""
+        if isinstance(raw, str):
+            return json.loads(raw)
+
+        if not raw or raw[0] != MAGIC:
+            # Entry written before the codec existed
+            return json.loads(raw.decode('utf-8'))
+
+        if len(raw) < 2:
+            raise ValueError("Truncated cache value")
+
+        fmt = raw[1]
+        payload = self._decompress(fmt & 0x0F, raw[2:])
+
+        if fmt & 0xF0 == SERIALIZERS['msgpack']:
+            if msgpack is None:
+                raise ValueError("Cache value is msgpack-encoded but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False)
+        if fmt & 0xF0 == SERIALIZERS['json']:
+            return json.loads(payload.decode('utf-8'))
+        raise ValueError(f"Unknown cache value format: {fmt:#x}")
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compressor == 'zstd':
+            return self._zstd_compressor.compress(payload)
+        return zlib.compress(payload, self.level)
+
+    @staticmethod
+    def _decompress(compressor: int, payload: bytes) -> bytes:
+        if compressor == COMPRESSORS['none']:
+            return payload
+        if compressor == COMPRESSORS['zlib']:
+            try:
+                return zlib.decompress(payload)
+            except zlib.error as e:
+                raise ValueError(f"Corrupted cache value: {e}") from e
+        if compressor == COMPRESSORS['zstd']:
+            if zstandard is None:
+                raise ValueError("Cache value is zstd-compressed but zstandard is not installed")
+            try:
+                return zstandard.ZstdDecompressor().decompress(payload)
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Corrupted cache value: {e}") from e
+        raise ValueError(f"Unknown cache value compression: {compressor:#x}")
@@ -0,0 +1,102 @@
+import time
+import random
+import logging
+import redis
+from threading import Lock, Thread
+from typing import Dict, List, Optional
+from .redis_pool import RedisPool, CONNECTION_ERRORS, get_shared_pool
+
+logger = logging.getLogger(__name__)
+
+HOT_KEYS_KEY = 'tr:hot'
+
+class HotKeyTracker:
+    """
+    Approximate popularity of cache keys, pooled across processes in Redis
+
+    A sample of lookups is counted in process memory and added to one
+    sorted set by a background thread, so the request path never waits on
+    Redis for it. Scores halve every half_life seconds (whichever process
+    gets there first does it) so yesterday's hot keys fade, and the set is
+    trimmed to the max_tracked highest scores.
+    """
+
+    def __init__(self,
+                 redis_pool: Optional[RedisPool] = None,
+                 sample_rate: float = 0.05,
+                 flush_interval: float = 10.0,
+                 max_pending: int = 10000,
+                 max_tracked: int = 100000,
+                 half_life: int = 3600,
+                 redis_key: str = HOT_KEYS_KEY):
+        self.redis_pool = redis_pool or get_shared_pool()
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_tracked = max_tracked
+        self.half_life = half_life
+        self.redis_key = redis_key
+        self._pending: Dict[str, int] = {}
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def record(self, key: str) -> None:
+        """Count a lookup of key, if it falls in the sample"""
+        if random.random() >= self.sample_rate:
+            return
+
+        with self._lock:
+            count = self._pending.get(key)
+            if count is not None:
+                self._pending[key] = count + 1
+            elif len(self._pending) < self.max_pending:
+                self._pending[key] = 1
+
+            # Also restarts the thread in a forked child
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._flush_loop, name='hot-keys-flush', daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self) -> None:
+        """Add the counts sampled since the last flush to Redis"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        client = self.redis_pool.client(decode_responses=True)
+        if client is None:
+            return
+
+        try:
+            pipeline = client.pipeline(transaction=False)
+            for key, count in pending.items():
+                pipeline.zincrby(self.redis_key, count, key)
+            pipeline.zremrangebyrank(self.redis_key, 0, -self.max_tracked - 1)
+            pipeline.execute()
+
+            if client.set(f"{self.redis_key}:decay", 1, nx=True, ex=self.half_life):
+                client.zunionstore(self.redis_key, {self.redis_key: 0.5})
+        except redis.RedisError as e:
+            logger.error(f"Failed to record hot keys: {str(e)}")
+            if isinstance(e, CONNECTION_ERRORS):
+                self.redis_pool.mark_down(e)
+
+    def top(self, count: int) -> List[str]:
+        """The count most popular keys, most popular first"""
+        client = self.redis_pool.client(decode_responses=True)
+        if client is None or count <= 0:
+            return []
+
+        try:
+            return client.zrevrange(self.redis_key, 0, count - 1)
+        except redis.RedisError as e:
+            logger.error(f"Failed to read hot keys: {str(e)}")
+            if isinstance(e, CONNECTION_ERRORS):
+                self.redis_pool.mark_down(e)
+            return []
@@ -0,0 +1,423 @@
+import os
+import time
+import logging
+import redis
+from bisect import bisect_left
+from threading import Lock, Event, Thread
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .redis_pool import RedisPool, CONNECTION_ERRORS, get_shared_pool
+
+logger = logging.getLogger(__name__)
+
+# Every process adds what it counted since its last push to this hash, so
+# it holds the totals of all workers and survives their restarts
+TOTALS_KEY = 'metrics:totals'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; from an L1 hit up to a slow backend call
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# A sample key, e.g. 'cache_get_seconds_bucket{op="get",le="0.005"}', and
+# the amount to add to it
+Sample = Tuple[str, Any]
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _sample_key(name: str, labels: str) -> str:
+    return f"{name}{{{labels}}}" if labels else name
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+class _CounterChild:
+    __slots__ = ('_registry', '_lock', 'labels', 'value', 'flushed')
+
+    def __init__(self, registry: 'MetricsRegistry', labels: str):
+        self._registry = registry
+        self._lock = Lock()
+        self.labels = labels
+        self.value = 0
+        self.flushed = 0
+
+    def inc(self, amount: int = 1) -> None:
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def take(self) -> Any:
+        """Amount counted since the last take, marking it as pushed"""
+        with self._lock:
+            delta = self.value - self.flushed
+            self.flushed = self.value
+        return delta
+
+    def give_back(self, delta: Any) -> None:
+        """Undo a take() whose push failed"""
+        with self._lock:
+            self.flushed -= delta
+
+    def reset(self) -> None:
+        self._lock = Lock()
+        self.value = self.flushed = 0
+
+class _HistogramChild:
+    __slots__ = ('_registry', '_lock', '_bounds', 'labels', 'counts', 'sum', 'flushed')
+
+    def __init__(self, registry: 'MetricsRegistry', labels: str, bounds: Tuple[float, ...]):
+        self._registry = registry
+        self._lock = Lock()
+        self._bounds = bounds
+        self.labels = labels
+        # Non-cumulative; the last slot is the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.flushed = ([0] * len(self.counts), 0.0)
+
+    def observe(self, value: float) -> None:
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def take(self) -> Any:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+            flushed_counts, flushed_total = self.flushed
+            self.flushed = (counts, total)
+        return [now - before for now, before in zip(counts, flushed_counts)], total - flushed_total
+
+    def give_back(self, delta: Any) -> None:
+        counts, total = delta
+        with self._lock:
+            flushed_counts, flushed_total = self.flushed
+            self.flushed = ([flushed - count for flushed, count in zip(flushed_counts, counts)],
+                            flushed_total - total)
+
+    def reset(self) -> None:
+        self._lock = Lock()
+        self.counts = [0] * len(self.counts)
+        self.sum = 0.0
+        self.flushed = ([0] * len(self.counts), 0.0)
+
+class _Metric:
+    kind = ''
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Sequence[str] = (),
+                 registry: Optional['MetricsRegistry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry or REGISTRY
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = Lock()
+        self._registry.register(self)
+
+    def labels(self, *values: Any) -> Any:
+        """
+        The series for these label values
+
+        Look series up once (e.g. in __init__ or at import time) and keep
+        them; the lookup is what costs, not the update.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is not None:
+            return child
+
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values))
+                child = self._new_child(labels)
+                self._children[values] = child
+            return child
+
+    def children(self) -> List[Any]:
+        with self._lock:
+            return list(self._children.values())
+
+    def _new_child(self, labels: str) -> Any:
+        raise NotImplementedError
+
+    def sample_names(self) -> Tuple[str, ...]:
+        raise NotImplementedError
+
+    def samples(self, child: Any, delta: Any) -> List[Sample]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonic count, exposed as <name>_total"""
+
+    kind = 'counter'
+
+    def _new_child(self, labels: str) -> _CounterChild:
+        return _CounterChild(self._registry, labels)
+
+    def inc(self, amount: int = 1) -> None:
+        self.labels().inc(amount)
+
+    def sample_names(self) -> Tuple[str, ...]:
+        return (f"{self.name}_total",)
+
+    def samples(self, child: _CounterChild, delta: Any) -> List[Sample]:
+        return [(_sample_key(f"{self.name}_total", child.labels), delta)]
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies in seconds) in fixed buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS,
+                 registry: Optional['MetricsRegistry'] = None):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self, labels: str) -> _HistogramChild:
+        return _HistogramChild(self._registry, labels, self.bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def sample_names(self) -> Tuple[str, ...]:
+        return (f"{self.name}_bucket", f"{self.name}_sum", f"{self.name}_count")
+
+    def samples(self, child: _HistogramChild, delta: Any) -> List[Sample]:
+        counts, total = delta
+        prefix = f"{child.labels}," if child.labels else ''
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket{{{prefix}le="{_format_bound(bound)}"}}', cumulative))
+        samples.append((_sample_key(f"{self.name}_sum", child.labels), total))
+        samples.append((_sample_key(f"{self.name}_count", child.labels), cumulative))
+        return samples
+
+class MetricsRegistry:
+    """
+    Counters and histograms of one process, summed across processes in Redis
+
+    Updates only touch process memory under a per-series lock. A
+    background thread pushes what was counted since the last push to
+    Redis in one MULTI/EXEC, so totals keep adding up however many
+    workers there are and however often they restart. Scrapes render the
+    Redis totals, or this process's own counts while Redis is down.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._metrics: List[_Metric] = []
+        self._lock = Lock()
+        self._redis_pool: Optional[RedisPool] = None
+        self._interval = 5.0
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics.append(metric)
+
+    def start(self, redis_pool: RedisPool, interval: float = 5.0) -> None:
+        """Push counts to Redis every interval seconds from a background thread"""
+        with self._lock:
+            self._redis_pool = redis_pool
+            self._interval = interval
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread after a last push"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        self.flush()
+
+    def _after_fork(self) -> None:
+        # The parent pushes its own counts; a pushing thread does not survive fork()
+        self._lock = Lock()
+        for metric in self._metrics:
+            metric._lock = Lock()
+            for child in metric._children.values():
+                child.reset()
+        self._stop = Event()
+        restart, self._thread = self._thread is not None, None
+        if restart:
+            self.start(self._redis_pool, self._interval)
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self._interval):
+            self.flush()
+
+    def flush(self) -> None:
+        """Push what was counted since the last push"""
+        client = self._client()
+        if client is None:
+            return
+
+        pipeline = client.pipeline()
+        taken = self.queue_flush(pipeline)
+        if not taken:
+            return
+        try:
+            pipeline.execute()
+        except redis.RedisError as e:
+            self.give_back(taken)
+            self._redis_error(e)
+
+    def queue_flush(self, pipeline: Any) -> List[Tuple[Any, Any]]:
+        """Add increments for everything counted since the last push; returns what to give_back() on failure"""
+        taken = []
+        for metric in list(self._metrics):
+            for child in metric.children():
+                delta = child.take()
+                samples = metric.samples(child, delta)
+                if not any(value for _, value in samples):
+                    continue
+                taken.append((child, delta))
+                # Empty buckets too, so every bucket of a series is exposed
+                for key, value in samples:
+                    if isinstance(value, float):
+                        pipeline.hincrbyfloat(TOTALS_KEY, key, value)
+                    else:
+                        pipeline.hincrby(TOTALS_KEY, key, value)
+        return taken
+
+    @staticmethod
+    def give_back(taken: List[Tuple[Any, Any]]) -> None:
+        for child, delta in taken:
+            child.give_back(delta)
+
+    def exposition(self) -> str:
+        """Prometheus text format of the totals of every process"""
+        client = self._client()
+        if client is None:
+            return self.render()
+
+        # Push this process's latest counts and read the totals in one round trip
+        pipeline = client.pipeline()
+        taken = self.queue_flush(pipeline)
+        pipeline.hgetall(TOTALS_KEY)
+        try:
+            totals = pipeline.execute()[-1]
+        except redis.RedisError as e:
+            self.give_back(taken)
+            self._redis_error(e)
+            return self.render()
+        return self.render(totals)
+
+    def render(self, totals: Optional[Dict[Any, Any]] = None) -> str:
+        """
+        Prometheus text format of totals read from Redis, or of this
+        process's own counts when totals is None
+        """
+        if totals is None:
+            samples: Dict[str, float] = {}
+            for metric in list(self._metrics):
+                for child in metric.children():
+                    with child._lock:
+                        current = child.value if metric.kind == 'counter' else (list(child.counts), child.sum)
+                    samples.update(metric.samples(child, current))
+            header = "# Redis unavailable: counts of this process only\n"
+        else:
+            samples = {self._text(key): float(value) for key, value in totals.items()}
+            header = ''
+
+        lines = [header] if header else []
+        for metric in list(self._metrics):
+            names = metric.sample_names()
+            keys = [key for key in samples if key.partition('{')[0] in names]
+            if not keys:
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}\n")
+            lines.append(f"# TYPE {metric.name} {metric.kind}\n")
+            for key in sorted(keys, key=lambda key: self._order(key, names)):
+                lines.append(f"{key} {_format_value(samples[key])}\n")
+        return ''.join(lines)
+
+    @staticmethod
+    def _order(key: str, names: Tuple[str, ...]) -> Tuple[str, int, float]:
+        """Group a histogram's samples by series: buckets in order, then _sum and _count"""
+        name, _, labels = key.partition('{')
+        labels = labels.rstrip('}')
+        bound = 0.0
+        if name.endswith('_bucket'):
+            labels, _, le = labels.rpartition('le="')
+            labels = labels.rstrip(',')
+            bound = float(le.rstrip('"'))
+        return labels, names.index(name), bound
+
+    @staticmethod
+    def _text(value: Any) -> str:
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def _client(self) -> Optional[redis.Redis]:
+        if not self.enabled:
+            return None
+        pool = self._redis_pool or get_shared_pool()
+        return pool.client(decode_responses=True)
+
+    def _redis_error(self, error: redis.RedisError) -> None:
+        logger.error(f"Failed to push metrics: {str(error)}")
+        if isinstance(error, CONNECTION_ERRORS):
+            (self._redis_pool or get_shared_pool()).mark_down(error)
+
+REGISTRY = MetricsRegistry()
+
+JSON_ENCODE_SECONDS = Histogram(
+    'json_encode_seconds',
+    'Time spent encoding JSON response bodies'
+)
+
+def configure_metrics(config: Any, redis_pool: Optional[RedisPool] = None) -> None:
+    """Enable or disable metrics from a Config class, pushing to Redis when enabled"""
+    REGISTRY.enabled = config.METRICS_ENABLED
+    if config.METRICS_ENABLED:
+        REGISTRY.start(redis_pool or get_shared_pool(), config.METRICS_FLUSH_INTERVAL)
+
+def timed_json_provider(provider_class: type) -> type:
+    """
+    Subclass of a Flask/Quart JSON provider class that records how long
+    encoding response bodies takes
+
+        app.json = timed_json_provider(type(app.json))(app)
+    """
+    class TimedJSONProvider(provider_class):
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            started = time.perf_counter()
+            try:
+                return super().dumps(obj, **kwargs)
+            finally:
+                JSON_ENCODE_SECONDS.observe(time.perf_counter() - started)
+
+    TimedJSONProvider.__name__ = f"Timed{provider_class.__name__}"
+    return TimedJSONProvider
@@ -1,106 +1,214 @@
+import math
 import time
-from typing import Optional, Callable, Any, List, Tuple, Union
+import hashlib
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Callable, Any, Dict, List, Tuple, Union
 import redis
 from functools import wraps
-from flask import request, current_app
+from flask import request
+from .redis_pool import RedisPool, CONNECTION_ERRORS, get_shared_pool
+from .metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+# GCRA (generic cell rate algorithm): one key per client holding the
+# theoretical arrival time (TAT) in microseconds, checked and updated
+# atomically in a single round trip. Rejected requests do not touch state.
+# Every value is a whole number of microseconds: Redis rejects a fractional
+# PX, and Lua would print a large fractional TAT in exponent form.
+#
+# KEYS[1]  client key
+# ARGV[1]  emission interval in us (window / max_requests)
+# ARGV[2]  burst tolerance in us (window)
+# ARGV[3]  cost of this request
+# Returns {allowed, retry_after_ms, remaining}
+_GCRA_SCRIPT = """
+local emission = tonumber(ARGV[1])
+local tolerance = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission * cost
+local allow_at = new_tat - tolerance
+if now < allow_at then
+    return {0, math.ceil((allow_at - now) / 1000), 0}
+end
+
+redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', math.max(1, math.ceil((new_tat - now) / 1000)))
+return {1, 0, math.floor((tolerance - (new_tat - now)) / emission)}
+"""
+
+def _script_args(emission: float, tolerance: float, weight: int) -> List[int]:
+    """ARGV of _GCRA_SCRIPT for intervals in seconds"""
+    return [max(1, round(emission * 1000000)), round(tolerance * 1000000), weight]
+
+RATE_LIMIT_CHECK_SECONDS = Histogram(
+    'rate_limit_check_seconds',
+    'Time spent deciding whether a request is within its rate limit'
+)
+RATE_LIMIT_REQUESTS = Counter(
+    'rate_limit_requests',
+    'Requests checked by the rate limiter',
+    ['outcome']
+)
+_ALLOWED = RATE_LIMIT_REQUESTS.labels('allowed')
+_REJECTED = RATE_LIMIT_REQUESTS.labels('rejected')
+
+class LocalRateLimiter:
+    """
+    Thread-safe in-memory GCRA used while Redis is unavailable
+
+    Keeps one float per client and evicts the least recently seen clients
+    once more than max_keys are tracked, so idle clients do not pile up.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._tats: 'OrderedDict[str, float]' = OrderedDict()
+        self._lock = Lock()
+
+    def check(self, key: str, emission: float, tolerance: float, cost: int) -> Tuple[bool, float]:
+        """Returns (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+
+        with self._lock:
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + emission * cost
+            allow_at = new_tat - tolerance
+
+            if now < allow_at:
+                return False, allow_at - now
+
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+            while len(self._tats) > self.max_keys:
+                self._tats.popitem(last=False)
+            return True, 0.0
+
+    def __len__(self) -> int:
+        return len(self._tats)
 
 class RateLimiter:
-    def __init__(self, redis_host: str = 'localhost', redis_port: int = 6379, db: int = 0):
-        self.redis_client: Optional[redis.Redis] = None
-        self._local_cache = {}
-        
-        try:
-            redis_client = redis.Redis(
-                host=redis_host,
-                port=redis_port,
-                db=db,
-                decode_responses=True,
-                socket_connect_timeout=2
-            )
-            # Test connection
-            redis_client.ping()
-            self.redis_client = redis_client
-        except redis.ConnectionError:
-            current_app.logger.warning("Redis not available - using in-memory fallback")
-
-    def limit(self, max_requests: int = 100, window: int = 60) -> Callable:
+    def __init__(self,
+                 redis_pool: Optional[RedisPool] = None,
+                 api_key_header: Optional[str] = 'X-API-Key',
+                 api_key_limits: Optional[Dict[str, Tuple[int, int]]] = None,
+                 local_max_keys: int = 10000):
+        """
+        Args:
+            redis_pool: Pool to take clients from (defaults to the shared pool)
+            api_key_header: Requests carrying one of api_key_limits' keys in
+                            this header are limited per API key instead of
+                            per remote address
+            api_key_limits: (max_requests, window) of each known API key
+            local_max_keys: Clients tracked by the in-memory fallback
+        """
+        self.redis_pool = redis_pool or get_shared_pool()
+        self.api_key_header = api_key_header
+        self.api_key_limits = api_key_limits or {}
+        self._local = LocalRateLimiter(max_keys=local_max_keys)
+        self._script: Optional[Any] = None
+
+    @property
+    def redis_client(self) -> Optional[redis.Redis]:
+        """Pooled client, or None while Redis is down and the in-memory fallback is used"""
+        return self.redis_pool.client(decode_responses=True)
+
+    def limit(self,
+              max_requests: int = 100,
+              window: int = 60,
+              cost: Union[int, Callable[[], int]] = 1) -> Callable:
+        """
+        Limit requests per client
+
+        Args:
+            max_requests: Requests allowed per window
+            window: Window length in seconds
+            cost: How many requests one call counts as, or a callable
+                  evaluated inside the request (e.g. from a batch size)
+        """
         def decorator(f: Callable) -> Callable:
             @wraps(f)
             def wrapped(*args: Any, **kwargs: Any) -> Any:
-                if not self.redis_client:
-                    return self._local_rate_limit(f, max_requests, window, *args, **kwargs)
-                    
-                try:
-                    key = f'rate_limit:{request.remote_addr}'
-                    current = time.time()
-                    
-                    # Clean old requests and count current ones in a pipeline
-                    pipeline = self.redis_client.pipeline()
-                    pipeline.zremrangebyscore(key, 0, current - window)
-                    pipeline.zadd(key, {str(current): current})
-                    pipeline.zcount(key, '-inf', '+inf')
-                    pipeline.expire(key, window)
-                    
-                    _, _, requests_count, _ = pipeline.execute()
-                    
-                    if requests_count > max_requests:
-                        retry_after = window
-                        
-                        try:
-                            # Get oldest timestamp - handle Redis response type safely
-                            oldest_entries = self.redis_client.zrange(
-                                key, 
-                                0, 
-                                0, 
-                                withscores=True,
-                                score_cast_func=float
-                            )
-                            
-                            if oldest_entries and isinstance(oldest_entries, list):
-                                # Each entry is a tuple of (member, score)
-                                oldest_entry = oldest_entries[0]
-                                if isinstance(oldest_entry, tuple) and len(oldest_entry) == 2:
-                                    oldest_timestamp = oldest_entry[1]  # Use the score (timestamp)
-                                    retry_after = int(window - (current - oldest_timestamp))
-                        except (IndexError, ValueError, TypeError) as e:
-                            current_app.logger.error(f"Error processing rate limit timestamp: {str(e)}")
-                            # Fall back to default window value
-                            retry_after = window
-                            
-                        return {
-                            'error': 'Rate limit exceeded',
-                            'retry_after': max(0, retry_after)
-                        }, 429
-                        
-                    return f(*args, **kwargs)
-                    
-                except redis.RedisError as e:
-                    current_app.logger.error(f"Rate limiting error: {str(e)}")
-                    return f(*args, **kwargs)
-                    
+                weight = cost() if callable(cost) else cost
+                started = time.perf_counter()
+                key, emission, tolerance, weight = self._plan(request, max_requests, window, weight)
+
+                allowed, retry_after = self._check(key, emission, tolerance, weight)
+                self._record(allowed, started)
+                if not allowed:
+                    return self._rejection(retry_after)
+
+                return f(*args, **kwargs)
+
             return wrapped
         return decorator
-        
-    def _local_rate_limit(self, f: Callable, max_requests: int, window: int, *args: Any, **kwargs: Any) -> Any:
-        key = f'rate_limit:{request.remote_addr}'
-        current = time.time()
-        
-        if key not in self._local_cache:
-            self._local_cache[key] = []
-            
-        # Clean expired timestamps
-        self._local_cache[key] = [ts for ts in self._local_cache[key] 
-                                 if current - ts <= window]
-        
-        if len(self._local_cache[key]) >= max_requests:
-            retry_after = window
-            if self._local_cache[key]:
-                retry_after = int(window - (current - self._local_cache[key][0]))
-                
-            return {
-                'error': 'Rate limit exceeded',
-                'retry_after': max(0, retry_after)
-            }, 429
-            
-        self._local_cache[key].append(current)
-        return f(*args, **kwargs)
\ No newline at end of file
+
+    def _plan(self, req: Any, max_requests: int, window: int, weight: Any) -> Tuple[str, float, int, int]:
+        """Key, emission interval, burst tolerance and cost of a request"""
+        key, (client_max, client_window) = self._identify(req, max_requests, window)
+        # A request may never cost more than the whole burst
+        weight = min(max(1, int(weight)), client_max)
+        return key, client_window / client_max, client_window, weight
+
+    def _identify(self, req: Any, max_requests: int, window: int) -> Tuple[str, Tuple[int, int]]:
+        """Rate limit key and (max_requests, window) for a request"""
+        api_key = req.headers.get(self.api_key_header) if self.api_key_header else None
+        limits = self.api_key_limits.get(api_key) if api_key else None
+        if limits is not None:
+            # Never store the API key itself in Redis
+            digest = hashlib.blake2b(api_key.encode('utf-8'), digest_size=12).hexdigest()
+            return f'rate_limit:key:{digest}', limits
+        # Unknown keys cost nothing to make up, so they do not escape the address limit
+        return f'rate_limit:{req.remote_addr}', (max_requests, window)
+
+    @staticmethod
+    def _record(allowed: bool, started: float) -> None:
+        RATE_LIMIT_CHECK_SECONDS.observe(time.perf_counter() - started)
+        (_ALLOWED if allowed else _REJECTED).inc()
+
+    @staticmethod
+    def _rejection(retry_after: float) -> Tuple[Dict[str, Any], int, Dict[str, str]]:
+        retry_after = max(0, math.ceil(retry_after))
+        return {
+            'error': 'Rate limit exceeded',
+            'retry_after': retry_after
+        }, 429, {'Retry-After': str(retry_after)}
+
+    def _check(self, key: str, emission: float, tolerance: float, weight: int) -> Tuple[bool, float]:
+        client = self.redis_client
+        if not client:
+            return self._local.check(key, emission, tolerance, weight)
+
+        try:
+            return self._verdict(self._script_for(client)(
+                keys=[key], args=_script_args(emission, tolerance, weight), client=client
+            ))
+        except redis.RedisError as e:
+            self._redis_error(e)
+            return self._local.check(key, emission, tolerance, weight)
+
+    def _script_for(self, client: Any) -> Any:
+        if self._script is None:
+            self._script = client.register_script(_GCRA_SCRIPT)
+        return self._script
+
+    @staticmethod
+    def _verdict(reply: List[Any]) -> Tuple[bool, float]:
+        """(allowed, retry_after_seconds) from a _GCRA_SCRIPT reply"""
+        allowed, retry_after_ms, _ = reply
+        return bool(allowed), int(retry_after_ms) / 1000
+
+    def _redis_error(self, error: redis.RedisError) -> None:
+        logger.error(f"Rate limiting error: {str(error)}")
+        if isinstance(error, CONNECTION_ERRORS):
+            self.redis_pool.mark_down(error)
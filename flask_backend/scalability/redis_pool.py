@@ -0,0 +1,171 @@
+import time
+import logging
+import redis
+from threading import Lock
+from typing import Any, Dict, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the server is unreachable, as opposed to a bad command
+CONNECTION_ERRORS = (redis.ConnectionError, redis.TimeoutError)
+# RedisPool._known_client(): Redis may be back, ping it before handing out a client
+_PROBE = object()
+
+class RedisPool:
+    """
+    Shared Redis connection pool with lazy reconnect and backoff
+
+    Services ask for a client on every use. While Redis is healthy the same
+    pooled client is returned; after a connection failure the pool reports
+    Redis as unavailable (so callers use their degraded mode) and probes it
+    again with exponential backoff, switching everyone back once a PING
+    succeeds. Nothing connects at import time.
+
+    Once max_connections are in use callers wait for a free connection:
+    running out of connections is load, not an outage, and each holder
+    gives its connection back within socket_timeout. A command that fails
+    on a stale socket (e.g. after a Redis restart) is retried once on a
+    fresh connection.
+    """
+
+    pool_class: Type[redis.ConnectionPool] = redis.BlockingConnectionPool
+    client_class: Type[redis.Redis] = redis.Redis
+
+    def __init__(self,
+                 host: str = 'localhost',
+                 port: int = 6379,
+                 db: int = 0,
+                 password: Optional[str] = None,
+                 max_connections: int = 50,
+                 socket_timeout: float = 2,
+                 health_check_interval: int = 30,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30,
+                 connection_class: Type[redis.Connection] = redis.Connection,
+                 **connection_kwargs: Any):
+        self._pool_kwargs = dict(
+            host=host,
+            port=port,
+            db=db,
+            password=password,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_timeout,
+            socket_keepalive=True,
+            health_check_interval=health_check_interval,
+            connection_class=connection_class,
+            retry_on_error=[redis.ConnectionError],
+            **connection_kwargs
+        )
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # One pool per decode_responses setting, since decoding is per connection
+        self._clients: Dict[bool, redis.Redis] = {}
+        self._lock = Lock()
+        self._healthy: Optional[bool] = None
+        self._failures = 0
+        self._next_probe = 0.0
+
+    def client(self, decode_responses: bool = True) -> Optional[redis.Redis]:
+        """Return a pooled client, or None while Redis is considered down"""
+        client = self._known_client(decode_responses)
+        if client is not _PROBE:
+            return client
+
+        with self._lock:
+            # Another thread may have finished probing while we waited
+            client = self._known_client(decode_responses)
+            if client is not _PROBE:
+                return client
+
+            client = self._get_client(decode_responses)
+            try:
+                client.ping()
+            except CONNECTION_ERRORS as e:
+                self._record_failure(e)
+                return None
+
+            self._record_success()
+            return client
+
+    def _known_client(self, decode_responses: bool) -> Any:
+        """The client while healthy, None until the next probe is due, then _PROBE"""
+        if self._healthy:
+            return self._get_client(decode_responses)
+        if time.monotonic() < self._next_probe:
+            return None
+        return _PROBE
+
+    @property
+    def healthy(self) -> bool:
+        return bool(self._healthy)
+
+    def mark_down(self, error: Optional[Exception] = None) -> None:
+        """Report a connection failure seen by a caller"""
+        with self._lock:
+            if self._healthy is False:
+                return
+            self._record_failure(error)
+
+    def _record_success(self) -> None:
+        if self._healthy is False:
+            logger.warning("Redis connection restored")
+        self._healthy = True
+        self._failures = 0
+
+    def _record_failure(self, error: Optional[Exception]) -> None:
+        if self._healthy is not False:
+            logger.warning(f"Redis not available - using degraded mode: {error}")
+        self._healthy = False
+        self._failures += 1
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** (self._failures - 1))
+        self._next_probe = time.monotonic() + backoff
+
+    def _get_client(self, decode_responses: bool) -> redis.Redis:
+        client = self._clients.get(decode_responses)
+        if client is None:
+            pool = self.pool_class(decode_responses=decode_responses, timeout=None, **self._pool_kwargs)
+            client = self.client_class(connection_pool=pool)
+            self._clients[decode_responses] = client
+        return client
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                client.connection_pool.disconnect()
+            self._clients.clear()
+            self._healthy = None
+
+_shared_pool: Optional[RedisPool] = None
+_shared_pool_lock = Lock()
+
+def get_shared_pool() -> RedisPool:
+    """The process-wide pool used by default, configured from Config"""
+    global _shared_pool
+    if _shared_pool is not None:
+        return _shared_pool
+
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = pool_from_config(RedisPool)
+        return _shared_pool
+
+def pool_from_config(pool_class: Type[RedisPool]) -> RedisPool:
+    """Build a pool of the given class from the Redis settings in Config"""
+    from config import Config
+    return pool_class(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        db=Config.REDIS_DB,
+        password=Config.REDIS_PASSWORD,
+        max_connections=Config.REDIS_MAX_CONNECTIONS,
+        socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+        health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
+        backoff_max=Config.REDIS_RECONNECT_BACKOFF_MAX
+    )
+
+def set_shared_pool(pool: Optional[RedisPool]) -> None:
+    """Replace the process-wide pool, e.g. with one backed by fakeredis"""
+    global _shared_pool
+    with _shared_pool_lock:
+        _shared_pool = pool
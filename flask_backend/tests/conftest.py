@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+import fakeredis
+
+# Modules import each other as top-level packages, as when run from flask_backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scalability.redis_pool import RedisPool, set_shared_pool  # noqa: E402
+
+@pytest.fixture
+def redis_server():
+    """An in-process fakeredis server"""
+    return fakeredis.FakeServer()
+
+@pytest.fixture
+def redis_pool(redis_server):
+    """A RedisPool backed by redis_server, also used as the shared pool"""
+    pool = RedisPool(connection_class=fakeredis.FakeRedisConnection, health_check_interval=0,
+                     server=redis_server)
+    set_shared_pool(pool)
+    yield pool
+    set_shared_pool(None)
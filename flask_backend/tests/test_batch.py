@@ -0,0 +1,17 @@
+def test_batch_results_follow_input_order_with_repeats(redis_pool):
+    # Imported here so the app's services use the fakeredis pool
+    from app import app, translation_service
+
+    # One of the texts is already cached, so hits and misses interleave
+    translation_service.translate_many([('cached', 'en', 'fr')])
+    texts = ['b', 'a', 'cached', 'b', 'c', 'a', 'b']
+    items = [{'text': text, 'sourceLang': 'en', 'targetLang': 'fr'} for text in texts]
+    items.append({'text': 'a', 'sourceLang': 'en', 'targetLang': 'de'})
+
+    response = app.test_client().post('/api/translate/batch', json={'items': items})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [(result['text'], result['target_lang']) for result in results] == \
+        [(item['text'], item['targetLang']) for item in items]
+    assert [result['translated'] for result in results] == [f"Translated: {item['text']}" for item in items]
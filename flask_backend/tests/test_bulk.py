@@ -0,0 +1,67 @@
+import io
+import time
+from scalability.cache import CacheService
+from scalability.cache_keys import translation_key
+from scalability.codec import ValueCodec
+from scalability.hot_keys import HotKeyTracker
+from scalability.local_cache import LocalCache
+from translation.bulk import TMImporter, export_entries, read_jsonl, read_tmx
+
+def test_overwrite_invalidates_local_copies(redis_pool):
+    codec = ValueCodec()
+    cache = CacheService(redis_pool=redis_pool, local_cache=LocalCache(), codec=codec)
+    key = translation_key('Hello', 'en', 'fr')
+    cache.cache_with_fallback(key, lambda: {'translated': 'Salut'})
+    assert cache.local_cache.get(key) == {'translated': 'Salut'}
+
+    importer = TMImporter(redis_pool.client(decode_responses=False), codec, overwrite=True)
+    importer.run([{'text': 'Hello', 'translated': 'Bonjour', 'source_lang': 'en', 'target_lang': 'fr'}])
+
+    deadline = time.monotonic() + 5
+    while cache.local_cache.get(key) is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.cache_with_fallback(key, dict) == {'translated': 'Bonjour'}
+
+def test_warm_up_is_not_counted_as_lookups(redis_pool):
+    codec = ValueCodec()
+    importer = TMImporter(redis_pool.client(decode_responses=False), codec)
+    importer.run([{'text': f'text {index}', 'translated': f'texte {index}', 'source_lang': 'en',
+                   'target_lang': 'fr'} for index in range(3)])
+    tracker = HotKeyTracker(redis_pool=redis_pool)
+    for index in range(3):
+        redis_pool.client(decode_responses=True).zincrby(tracker.redis_key, 1, translation_key(f'text {index}', 'en', 'fr'))
+
+    cache = CacheService(redis_pool=redis_pool, local_cache=LocalCache(), codec=codec, hot_keys=tracker)
+    assert cache.warm(10) == 3
+    assert cache.stats()['redis'] == {'hits': 0, 'misses': 0}
+
+def test_export_round_trip_keeps_entries_without_expiry(redis_pool):
+    client = redis_pool.client(decode_responses=False)
+    codec = ValueCodec()
+    rows = [{'text': 'Hello', 'translated': 'Bonjour', 'source_lang': 'en', 'target_lang': 'fr'},
+            {'text': 'Bye', 'translated': 'Salut', 'source_lang': 'en', 'target_lang': 'fr'}]
+    TMImporter(client, codec, ttl=0).run(rows[:1])
+    TMImporter(client, codec, ttl=600).run(rows[1:])
+
+    exported = io.StringIO()
+    assert export_entries(client, exported) == 2
+    client.flushdb()
+    TMImporter(client, codec, ttl=3600).run(read_jsonl(io.StringIO(exported.getvalue())))
+
+    assert client.pttl(translation_key('Hello', 'en', 'fr')) == -1
+    assert 0 < client.pttl(translation_key('Bye', 'en', 'fr')) <= 600000
+
+def test_tmx_keeps_region_and_script_tags():
+    tmx = b"""<tmx version="1.4"><header srclang="en"/><body>
+    <tu><tuv xml:lang="en-US"><seg>Colour</seg></tuv>
+        <tuv xml:lang="zh-Hans"><seg>\xe9\xa2\x9c\xe8\x89\xb2</seg></tuv>
+        <tuv xml:lang="zh-Hant"><seg>\xe9\xa1\x8f\xe8\x89\xb2</seg></tuv></tu>
+    </body></tmx>"""
+    rows = list(read_tmx(io.BytesIO(tmx)))
+
+    assert [(row['source_lang'], row['target_lang'], row['translated']) for row in rows] == [
+        ('en-US', 'zh-Hans', '颜色'),
+        ('en-US', 'zh-Hant', '顏色'),
+    ]
+    importer = TMImporter(None, ValueCodec())
+    assert len({importer.entry(row).key for row in rows}) == 2
@@ -0,0 +1,37 @@
+from scalability.cache import CacheService
+
+def test_corrupt_value_outside_app_context(redis_pool):
+    # Job workers use the cache without a Flask app context
+    cache = CacheService(redis_pool=redis_pool)
+    cache.redis_client.set('key', b'\xff\x00 not a codec value')
+
+    assert cache.cache_with_fallback('key', lambda: {'translated': 'fresh'}) == {'translated': 'fresh'}
+
+def test_async_service_shares_entries_and_coalesces_misses(redis_server, redis_pool):
+    import asyncio
+    import fakeredis
+    from scalability.aio.cache import AsyncCacheService
+    from scalability.aio.redis_pool import AsyncRedisPool
+
+    async_pool = AsyncRedisPool(connection_class=fakeredis.FakeAsyncRedisConnection, health_check_interval=0,
+                                server=redis_server)
+    cache = CacheService(redis_pool=redis_pool)
+    cache.cache_with_fallback('shared', lambda: 'from sync')
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'from async'
+
+    async def scenario():
+        aio_cache = AsyncCacheService(redis_pool=async_pool)
+        shared = await aio_cache.cache_with_fallback('shared', compute)
+        misses = await asyncio.gather(*[aio_cache.cache_with_fallback('miss', compute) for _ in range(5)])
+        return shared, misses
+
+    shared, misses = asyncio.run(scenario())
+    assert shared == 'from sync'
+    assert misses == ['from async'] * 5
+    assert len(calls) == 1
+    assert cache.cache_with_fallback('miss', lambda: 'recomputed') == 'from async'
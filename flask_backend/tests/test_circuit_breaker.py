@@ -0,0 +1,49 @@
+from threading import Event, Thread
+from scalability.circuit_breaker import CircuitBreaker, CircuitState
+
+def test_late_call_does_not_decide_half_open_circuit(redis_pool):
+    breaker = CircuitBreaker(name='late-call', minimum_calls=2, reset_timeout=0, redis_pool=redis_pool)
+    probe_started, release = Event(), Event()
+
+    def probe():
+        probe_started.set()
+        release.wait(5)
+
+    def slow_call():
+        # Admitted while closed; the circuit trips and a probe starts before it returns
+        breaker.record_failure()
+        breaker.record_failure()
+        thread = Thread(target=breaker.call, args=(probe,))
+        thread.start()
+        assert probe_started.wait(5)
+        return thread
+
+    thread = breaker.call(slow_call)
+    assert breaker.get_circuit_state() == CircuitState.HALF_OPEN
+
+    release.set()
+    thread.join(5)
+    assert breaker.get_circuit_state() == CircuitState.CLOSED
+
+def test_shed_load_does_not_trip_the_view_breaker(redis_pool):
+    from flask import Flask, jsonify
+    from scalability.circuit_breaker import CircuitOpenError
+    from translation.api import failure
+    from translation.dispatcher import BackpressureError
+
+    app = Flask(__name__)
+    breaker = CircuitBreaker(name='shed-load', minimum_calls=2, redis_pool=redis_pool)
+    errors = [CircuitOpenError('translation-backend', 7), BackpressureError()] * 5
+
+    @app.route('/')
+    @breaker.protect()
+    def index():
+        payload, status = failure(errors.pop(), 'Translation')
+        return jsonify(payload), status
+
+    client = app.test_client()
+    responses = [client.get('/') for _ in range(10)]
+
+    assert [response.status_code for response in responses] == [503] * 10
+    assert responses[-1].get_json() == {'error': 'Service temporarily unavailable', 'retry_after': 7}
+    assert breaker.get_circuit_state() == CircuitState.CLOSED
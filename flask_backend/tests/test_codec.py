@@ -0,0 +1,40 @@
+import json
+import pytest
+from scalability.codec import COMPRESSORS, MAGIC, ValueCodec, msgpack, zstandard
+
+VALUE = {'translated': 'Bonjour le monde, ça va ? ' * 100, 'source_lang': 'en'}
+
+def test_decodes_legacy_json_entries():
+    legacy = json.dumps(VALUE)
+    codec = ValueCodec()
+    assert codec.decode(legacy.encode('utf-8')) == VALUE
+    assert codec.decode(legacy) == VALUE
+
+@pytest.mark.parametrize('serializer', ['json', 'msgpack'])
+@pytest.mark.parametrize('compressor', ['none', 'zlib', 'zstd'])
+def test_round_trip(serializer, compressor):
+    if serializer == 'msgpack' and msgpack is None:
+        pytest.skip('msgpack is not installed')
+    if compressor == 'zstd' and zstandard is None:
+        pytest.skip('zstandard is not installed')
+
+    codec = ValueCodec(serializer, compressor)
+    for value in (VALUE, {'translated': 'Hi'}, ['a', 1, None], 'plain'):
+        encoded = codec.encode(value)
+        assert encoded[0] == MAGIC
+        assert codec.decode(encoded) == value
+    # Any codec reads what another one wrote
+    assert ValueCodec().decode(codec.encode(VALUE)) == VALUE
+
+def test_compress_threshold():
+    codec = ValueCodec('json', 'zlib', compress_threshold=1024)
+    small = codec.encode({'translated': 'x' * 100})
+    large = codec.encode({'translated': 'x' * 2000})
+
+    assert small[1] & 0x0F == COMPRESSORS['none']
+    assert large[1] & 0x0F == COMPRESSORS['zlib']
+    assert len(large) < 2000
+
+def test_corrupt_value_raises_value_error():
+    with pytest.raises(ValueError):
+        ValueCodec().decode(bytes((MAGIC, 0x11)) + b'not zlib')
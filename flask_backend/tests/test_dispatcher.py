@@ -0,0 +1,72 @@
+import asyncio
+from threading import Event
+from typing import List
+from translation.backend import EchoBackend
+from translation.dispatcher import MicroBatcher
+
+class GatedBackend(EchoBackend):
+    """Holds every batch until released, so callers can give up meanwhile"""
+
+    def __init__(self):
+        self.started = Event()
+        self.release = Event()
+        self.batches: List[List[str]] = []
+
+    def translate_batch(self, texts, source_lang, target_lang):
+        self.started.set()
+        self.release.wait(5)
+        self.batches.append(texts)
+        return super().translate_batch(texts, source_lang, target_lang)
+
+def test_cancelled_request_does_not_strand_its_batch():
+    backend = GatedBackend()
+    dispatcher = MicroBatcher(backend, max_batch_size=10, max_wait_ms=1000, workers=1)
+    try:
+        # Occupies the only worker, so the next three queue up as one batch
+        first = dispatcher.submit('first', 'en', 'fr')
+        assert backend.started.wait(5)
+        futures = [dispatcher.submit(text, 'en', 'fr') for text in ('a', 'b', 'c')]
+        assert futures[1].cancel()
+        backend.release.set()
+
+        assert first.result(timeout=5) == 'Translated: first'
+        assert [futures[0].result(timeout=5), futures[2].result(timeout=5)] == ['Translated: a', 'Translated: c']
+        assert backend.batches == [['first'], ['a', 'c']]
+    finally:
+        dispatcher.close()
+
+def test_abandoned_asyncio_wait_does_not_affect_others():
+    backend = GatedBackend()
+    dispatcher = MicroBatcher(backend, max_batch_size=10, max_wait_ms=1000, workers=1)
+
+    async def scenario():
+        blocker = asyncio.wrap_future(dispatcher.submit('first', 'en', 'fr'))
+        assert backend.started.wait(5)
+        waits = [asyncio.wrap_future(dispatcher.submit(text, 'en', 'fr')) for text in ('a', 'b', 'c')]
+        try:
+            await asyncio.wait_for(waits[1], 0.01)
+        except asyncio.TimeoutError:
+            pass
+        backend.release.set()
+        return await asyncio.wait_for(asyncio.gather(blocker, waits[0], waits[2]), 5)
+
+    try:
+        assert asyncio.run(scenario()) == ['Translated: first', 'Translated: a', 'Translated: c']
+    finally:
+        dispatcher.close()
+
+def test_cancelling_a_whole_batch_frees_the_worker():
+    backend = GatedBackend()
+    dispatcher = MicroBatcher(backend, max_batch_size=10, max_wait_ms=50, workers=1)
+    try:
+        blocker = dispatcher.submit('first', 'en', 'fr')
+        assert backend.started.wait(5)
+        cancelled = dispatcher.submit('gone', 'en', 'fr')
+        assert cancelled.cancel()
+        backend.release.set()
+
+        assert blocker.result(timeout=5) == 'Translated: first'
+        assert dispatcher.submit('next', 'en', 'fr').result(timeout=5) == 'Translated: next'
+        assert dispatcher.queue_size() == 0
+    finally:
+        dispatcher.close()
@@ -0,0 +1,92 @@
+import time
+import pytest
+from translation.jobs import DONE, FAILED, QUEUED, InMemoryJobQueue, JobWorker, RedisJobQueue, check_webhook
+
+@pytest.fixture(params=['memory', 'redis'])
+def make_queue(request, redis_pool):
+    def make(**options):
+        if request.param == 'memory':
+            return InMemoryJobQueue(**options)
+        return RedisJobQueue(redis_pool=redis_pool, **options)
+    return make
+
+def test_job_that_keeps_dying_is_failed(make_queue):
+    queue = make_queue(visibility_timeout=0, max_attempts=2)
+    job = queue.enqueue({'text': 'crashes its worker'})
+
+    # Each claim stands for a worker process killed mid-job
+    for attempt in (1, 2):
+        assert queue.claim()['attempts'] == attempt
+        time.sleep(0.002)
+        failed = queue.requeue_expired()
+
+    assert failed == [job['id']]
+    assert queue.get(job['id'])['status'] == FAILED
+    assert queue.claim() is None
+
+def test_expired_job_with_attempts_left_is_requeued(make_queue):
+    queue = make_queue(visibility_timeout=0, max_attempts=2)
+    job = queue.enqueue({'text': 'slow'})
+    queue.claim()
+    time.sleep(0.002)
+
+    assert queue.requeue_expired() == []
+    assert queue.get(job['id'])['status'] == QUEUED
+
+def test_heartbeat_keeps_long_job_claimed(make_queue):
+    queue = make_queue(visibility_timeout=1)
+    job = queue.enqueue({'text': 'long'})
+
+    def handler(payload):
+        time.sleep(1.5)
+        # Another worker polling meanwhile must not take the job over
+        assert queue.requeue_expired() == []
+        assert queue.claim() is None
+        return {'translated': payload['text']}
+
+    worker = JobWorker(queue, handler, heartbeat_interval=0.2)
+    assert worker.run_once()
+    assert queue.get(job['id'])['status'] == DONE
+    assert not queue.extend(job['id'])
+
+@pytest.mark.parametrize('url', [
+    'http://127.0.0.1:5000/hook',
+    'http://localhost/hook',
+    'http://10.1.2.3/hook',
+    'http://169.254.169.254/latest/meta-data/',
+    'http://[::ffff:192.168.0.1]/hook',
+    'file:///etc/passwd'
+])
+def test_internal_webhooks_are_refused(url):
+    with pytest.raises(ValueError):
+        check_webhook(url)
+
+def test_webhook_allowlist():
+    check_webhook('https://hooks.example.com/done', ['.example.com'])
+    check_webhook('http://10.1.2.3/hook', ['10.1.2.3'])
+    with pytest.raises(ValueError):
+        check_webhook('https://example.com.attacker.net/done', ['.example.com'])
+
+def test_webhook_session_checks_the_connected_address():
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from threading import Thread
+    from translation.jobs import webhook_session
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/hook'
+    try:
+        # As after a DNS rebind: the host passed check_webhook(), the peer is loopback
+        with pytest.raises(ValueError):
+            webhook_session().post(url, json={}, timeout=5)
+        assert webhook_session(['127.0.0.1']).post(url, json={}, timeout=5).status_code == 204
+    finally:
+        server.shutdown()
@@ -0,0 +1,58 @@
+import logging
+import uuid
+from flask import Flask
+from scalability.rate_limiter import RateLimiter
+
+def limited_app(redis_pool, limits):
+    app = Flask(__name__)
+    limiter = RateLimiter(redis_pool=redis_pool, api_key_limits=limits)
+
+    @app.route('/')
+    @limiter.limit(max_requests=100, window=60)
+    def index():
+        return 'ok'
+
+    return app, limiter
+
+def test_limit_that_does_not_divide_the_window(redis_pool, caplog):
+    # 60000 ms / 7 is not a whole number of milliseconds
+    app, limiter = limited_app(redis_pool, {'client': (7, 60)})
+    client = app.test_client()
+
+    with caplog.at_level(logging.ERROR):
+        statuses = [client.get('/', headers={'X-API-Key': 'client'}).status_code for _ in range(8)]
+
+    assert statuses == [200] * 7 + [429]
+    assert not caplog.records
+    # Enforced by the shared script, not the per-process fallback
+    assert len(limiter._local) == 0
+    client_redis = redis_pool.client(decode_responses=True)
+    key, = client_redis.keys('rate_limit:key:*')
+    assert client_redis.get(key).isdigit()
+    assert 0 < client_redis.pttl(key) <= 60000
+
+def test_sub_millisecond_emission(redis_pool):
+    app, limiter = limited_app(redis_pool, {'client': (3, 1)})
+    client = app.test_client()
+
+    statuses = [client.get('/', headers={'X-API-Key': 'client'}).status_code for _ in range(4)]
+
+    assert statuses == [200] * 3 + [429]
+    assert len(limiter._local) == 0
+    assert client.get('/', headers={'X-API-Key': 'client'}).headers['Retry-After'] == '1'
+
+def test_unknown_api_keys_share_the_address_limit(redis_pool):
+    app = Flask(__name__)
+    limiter = RateLimiter(redis_pool=redis_pool, api_key_limits={'known': (100, 60)})
+
+    @app.route('/')
+    @limiter.limit(max_requests=5, window=60)
+    def index():
+        return 'ok'
+
+    client = app.test_client()
+    statuses = [client.get('/', headers={'X-API-Key': uuid.uuid4().hex}).status_code for _ in range(7)]
+
+    assert statuses == [200] * 5 + [429] * 2
+    # A known key has its own budget
+    assert client.get('/', headers={'X-API-Key': 'known'}).status_code == 200
@@ -0,0 +1,25 @@
+import time
+import fakeredis
+from scalability.cache import CacheService
+from scalability.redis_pool import RedisPool
+
+def test_degraded_mode_and_recovery(redis_server):
+    pool = RedisPool(connection_class=fakeredis.FakeRedisConnection, health_check_interval=0,
+                     server=redis_server, backoff_base=0.05, backoff_max=0.05)
+    cache = CacheService(redis_pool=pool)
+    assert pool.client() is not None and pool.healthy
+
+    redis_server.connected = False
+    # Requests are still served, computing every value
+    assert cache.cache_with_fallback('key', lambda: 'computed') == 'computed'
+    assert not pool.healthy
+    # No reconnect attempts until the backoff has passed
+    assert pool.client() is None
+
+    redis_server.connected = True
+    assert pool.client() is None
+    time.sleep(0.06)
+    assert pool.client() is not None and pool.healthy
+
+    cache.cache_with_fallback('key', lambda: 'cached')
+    assert cache.cache_with_fallback('key', lambda: 'not used') == 'cached'
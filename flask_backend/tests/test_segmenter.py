@@ -0,0 +1,54 @@
+import random
+import pytest
+from translation.segmenter import SEGMENT_MODES, Segment, iter_segments, reassemble, segment
+
+def test_inline_markup_stays_in_its_sentence():
+    assert segment("Hello <b>world</b>. How are you?") == [
+        Segment('Hello <b>world</b>.', True),
+        Segment(' ', False),
+        Segment('How are you?', True),
+    ]
+
+def test_block_tags_and_punctuation_are_not_translated():
+    assert segment("<p>One.</p><p>Tom &amp; Jerry.</p> —") == [
+        Segment('<p>', False),
+        Segment('One.', True),
+        Segment('</p>', False),
+        Segment('<p>', False),
+        Segment('Tom &amp; Jerry.', True),
+        Segment('</p>', False),
+        Segment(' ', False),
+        Segment('—', False),
+    ]
+
+TEXTS = [
+    '',
+    'Hello world',
+    'Hello <b>world</b>. How are you?\n\n<p>Fine, thanks!</p> Bye... 再见。好的！',
+    '  Leading and trailing space.  \n\nSecond paragraph &amp; more.\n \n<ul><li>One</li><li>Two.</li></ul>\n',
+    '<a href="x. y">Link text.</a> Tail <i>x</i>. ' * 20,
+]
+
+@pytest.mark.parametrize('mode', SEGMENT_MODES)
+@pytest.mark.parametrize('text', TEXTS)
+def test_segment_and_reassemble_reproduce_the_input(text, mode):
+    segments = segment(text, mode)
+    assert ''.join(seg.text for seg in segments) == text
+
+    translatable = [seg.text for seg in segments if seg.translatable]
+    assert reassemble(segments, translatable) == text
+    assert reassemble(segments, [t.upper() for t in translatable]) == ''.join(
+        seg.text.upper() if seg.translatable else seg.text for seg in segments)
+
+@pytest.mark.parametrize('mode', SEGMENT_MODES)
+@pytest.mark.parametrize('text', TEXTS)
+def test_iter_segments_reproduces_the_input_for_any_chunking(text, mode):
+    rng = random.Random(text)
+    for size in (1, 2, 3, 7, 64, len(text) + 1):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert ''.join(seg.text for seg in iter_segments(chunks, mode, max_buffer=50)) == text
+
+    for _ in range(20):
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 5)))
+        chunks = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+        assert ''.join(seg.text for seg in iter_segments(chunks, mode, max_buffer=50)) == text
@@ -0,0 +1,33 @@
+import pytest
+from translation.validation import ValidationError, batch_size, parse_batch, parse_stream, parse_translate
+
+@pytest.mark.parametrize('body', [
+    ['hello'],
+    'hello',
+    {'text': 'hello', 'sourceLang': ['en']},
+    {'text': 'hello', 'targetLang': 'fr:x'},
+    {'text': 'hello', 'targetLang': ''},
+    {'text': 'hello', 'targetLang': 'x' * 100},
+])
+def test_parse_translate_rejects_malformed_bodies(body):
+    with pytest.raises(ValidationError) as error:
+        parse_translate(body)
+    assert error.value.status == 400
+
+@pytest.mark.parametrize('body', [
+    [{'text': 'a'}],
+    {'items': [{'text': 'a', 'sourceLang': {'en': 1}}]},
+])
+def test_parse_batch_rejects_malformed_bodies(body):
+    with pytest.raises(ValidationError) as error:
+        parse_batch(body, 10)
+    assert error.value.status == 400
+
+def test_batch_size_of_non_object_body():
+    assert batch_size([{'text': 'a'}]) == 0
+    assert batch_size({'items': [{'text': 'a'}, {'text': 'b'}]}) == 2
+
+def test_parse_stream_rejects_key_separator():
+    with pytest.raises(ValidationError):
+        parse_stream({'sourceLang': 'en', 'targetLang': 'fr:de'})
+    assert parse_stream({'sourceLang': 'en', 'targetLang': 'zh-Hans'}) == ('en', 'zh-Hans', 'sentence')
@@ -0,0 +1,173 @@
+# flask_backend/tm.py
+"""
+Bulk import and export of the translation memory in Redis
+
+    python tm.py import memory.tmx [--format tmx] [--source-lang en] [--target-lang fr]
+                                   [--ttl 0] [--overwrite] [--resume] [--top N]
+    python tm.py export backup.jsonl
+
+Imports stream JSONL, CSV or TMX translation units into the cache under
+the keys /api/translate looks up, a pipelined chunk at a time. Progress is
+checkpointed next to the input (<input>.progress) after every chunk, so an
+interrupted import continues where it stopped with --resume. Exports scan
+the cache without blocking Redis and write a JSONL dump that imports back
+as-is, e.g. into another region; --top N then loads only the N most
+requested entries.
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+from typing import Any, Dict, Optional
+from config import Config
+
+PROGRESS_INTERVAL = 5.0
+
+class Progress:
+    """Prints rows/s to stderr every PROGRESS_INTERVAL seconds"""
+
+    def __init__(self, label: str, start: int = 0):
+        self.label = label
+        self.start = start
+        self.started = time.perf_counter()
+        self.reported = self.started
+
+    def rate(self, rows: int) -> float:
+        elapsed = time.perf_counter() - self.started
+        return (rows - self.start) / elapsed if elapsed > 0 else 0.0
+
+    def __call__(self, rows: int) -> None:
+        now = time.perf_counter()
+        if now - self.reported >= PROGRESS_INTERVAL:
+            self.reported = now
+            print(f"{self.label} {rows} rows, {self.rate(rows):.0f} rows/s", file=sys.stderr)
+
+class Checkpoint:
+    """Rows of an input file already imported, kept in <input>.progress"""
+
+    def __init__(self, path: str):
+        self.path = f"{path}.progress"
+        stat = os.stat(path)
+        self.fingerprint = {'input': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load(self) -> Optional[int]:
+        """Rows done by an earlier run of the same file, None if there is none"""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return None
+        if any(saved.get(name) != value for name, value in self.fingerprint.items()):
+            raise ValueError(f"{self.path} was written for a different version of the input")
+        return saved['rows']
+
+    def save(self, rows: int) -> None:
+        # Replaced atomically, so a crash never leaves a truncated checkpoint
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(dict(self.fingerprint, rows=rows), f)
+        os.replace(temporary, self.path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def redis_client(parser: argparse.ArgumentParser):
+    from scalability.redis_pool import get_shared_pool
+    client = get_shared_pool().client(decode_responses=False)
+    if client is None:
+        parser.error(f"Redis is not available at {Config.REDIS_HOST}:{Config.REDIS_PORT}")
+    return client
+
+def import_memory(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from scalability.codec import ValueCodec
+    from translation.bulk import TMImporter, detect_format, open_rows
+
+    try:
+        file_format = args.format or detect_format(args.input)
+        checkpoint = Checkpoint(args.input)
+        skip = (checkpoint.load() or 0) if args.resume else 0
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    rows = open_rows(args.input, file_format, args.source_lang)
+    if args.top:
+        # Export dumps carry the popularity of each entry
+        rows = heapq.nlargest(args.top, (row for row in rows if row and row.get('hits')),
+                              key=lambda row: row['hits'])
+
+    importer = TMImporter(
+        redis_client(parser),
+        ValueCodec(Config.CACHE_SERIALIZER, Config.CACHE_COMPRESSOR, Config.CACHE_COMPRESS_THRESHOLD),
+        ttl=args.ttl,
+        overwrite=args.overwrite,
+        chunk_size=args.chunk_size,
+        source_lang=args.source_lang,
+        target_lang=args.target_lang
+    )
+    if skip:
+        print(f"Resuming after {skip} rows", file=sys.stderr)
+
+    progress = Progress('imported', skip)
+
+    def on_chunk(rows_done: int) -> None:
+        checkpoint.save(rows_done)
+        progress(rows_done)
+
+    stats: Dict[str, Any] = importer.run(rows, skip=skip, on_chunk=on_chunk)
+    checkpoint.clear()
+
+    elapsed = time.perf_counter() - progress.started
+    print(f"Read {stats['read']} rows in {elapsed:.1f}s ({stats['read'] / elapsed if elapsed else 0:.0f} rows/s): "
+          f"{stats['written']} written, {stats['existing']} already cached, {stats['invalid']} invalid",
+          file=sys.stderr)
+
+def export_memory(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    from translation.bulk import export_entries
+
+    client = redis_client(parser)
+    progress = Progress('exported')
+    if args.output == '-':
+        written = export_entries(client, sys.stdout, args.chunk_size, progress)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            written = export_entries(client, f, args.chunk_size, progress)
+
+    elapsed = time.perf_counter() - progress.started
+    print(f"Exported {written} entries in {elapsed:.1f}s ({progress.rate(written):.0f} rows/s)", file=sys.stderr)
+
+def main() -> None:
+    from translation.bulk import FORMATS
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importer = commands.add_parser('import', help='load a JSONL, CSV or TMX translation memory into the cache')
+    importer.add_argument('input')
+    importer.add_argument('--format', choices=FORMATS, help='default: from the file extension')
+    importer.add_argument('--source-lang', help='for rows without one; picks the TMX source without srclang')
+    importer.add_argument('--target-lang', help='for rows without one')
+    importer.add_argument('--ttl', type=int, default=Config.CACHE_TRANSLATION_TTL,
+                          help='seconds imported entries live, 0 for no expiry (dumps keep their own)')
+    importer.add_argument('--overwrite', action='store_true', help='replace entries already cached')
+    importer.add_argument('--chunk-size', type=int, default=1000, help='rows per pipelined round trip')
+    importer.add_argument('--resume', action='store_true', help='skip the rows an interrupted import wrote')
+    importer.add_argument('--top', type=int, help='only the N most requested entries of an export dump')
+    importer.set_defaults(handler=import_memory)
+
+    exporter = commands.add_parser('export', help='write every cached translation to a JSONL dump')
+    exporter.add_argument('output', help="file to write, or '-' for stdout")
+    exporter.add_argument('--chunk-size', type=int, default=1000, help='keys per SCAN and pipelined round trip')
+    exporter.set_defaults(handler=export_memory)
+
+    args = parser.parse_args()
+    if args.chunk_size <= 0:
+        parser.error('--chunk-size must be positive')
+    args.handler(args, parser)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import json
+import math
+import codecs
+import logging
+from typing import Any, Dict, Tuple
+from scalability.circuit_breaker import CircuitOpenError
+from .dispatcher import BackpressureError
+from .validation import ValidationError, batch_size
+
+logger = logging.getLogger(__name__)
+
+# Response building shared by the WSGI (app.py) and ASGI (asgi.py) views,
+# which only add their framework's request and response objects
+STREAM_MIMETYPES = ['application/x-ndjson', 'text/event-stream']
+# Flush every chunk through proxies instead of buffering the response
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def failure(error: Exception, context: str) -> Tuple[Dict[str, Any], int]:
+    """
+    JSON payload and status code for an error raised by a translation view
+
+    Shed load (a full queue, an open backend breaker) is answered with 503,
+    which the view-level breaker does not count as a failure.
+
+    Args:
+        error: The exception
+        context: What failed, for the log, e.g. 'Batch translation'
+    """
+    if isinstance(error, ValidationError):
+        return {"error": str(error)}, error.status
+
+    if isinstance(error, BackpressureError):
+        return {
+            "error": "Translation service overloaded",
+            "retry_after": 1
+        }, 503
+
+    if isinstance(error, CircuitOpenError):
+        # The backend's breaker is open: answer like the view's own breaker
+        return {
+            "error": "Service temporarily unavailable",
+            "retry_after": error.retry_after
+        }, 503
+
+    logger.error(f"{context} error: {str(error)}")
+    return {
+        "error": "Translation failed",
+        "details": str(error)
+    }, 500
+
+def batch_cost(data: Any, item_cost: float) -> int:
+    """Rate limiter weight of a batch request body"""
+    return math.ceil(batch_size(data) * item_cost)
+
+def body_decoder() -> codecs.IncrementalDecoder:
+    """Decoder for a UTF-8 request body read in blocks that may split characters"""
+    return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+class StreamFormat:
+    """
+    Framing of /api/translate/stream responses
+
+    One NDJSON line per translated chunk, or one Server-Sent Event when
+    the client accepts text/event-stream, then a final line with the
+    segment statistics or, since headers are already sent by then, the
+    error.
+    """
+
+    def __init__(self, accept_mimetypes: Any):
+        """
+        Args:
+            accept_mimetypes: The request's parsed Accept header (Flask or Quart)
+        """
+        self.sse = accept_mimetypes.best_match(STREAM_MIMETYPES) == 'text/event-stream'
+        self.mimetype = 'text/event-stream' if self.sse else 'application/x-ndjson'
+
+    def encode(self, payload: Dict[str, Any]) -> str:
+        line = json.dumps(payload, ensure_ascii=False)
+        return f"data: {line}\n\n" if self.sse else f"{line}\n"
+
+    def piece(self, translated: str) -> str:
+        return self.encode({"translated": translated})
+
+    def done(self, stats: Dict[str, Any]) -> str:
+        return self.encode({"done": True, "segments": stats})
+
+    def error(self, error: Exception) -> str:
+        return self.encode(failure(error, 'Streaming translation')[0])
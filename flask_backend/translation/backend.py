@@ -0,0 +1,52 @@
+import time
+from abc import ABC, abstractmethod
+from typing import List
+
+class TranslationBackend(ABC):
+    """
+    A machine translation engine
+
+    Backends receive texts already grouped by language pair, since real MT
+    engines are much cheaper per item when called with a batch.
+    """
+
+    @abstractmethod
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        """Translate texts, returning one translation per input in the same order"""
+
+class EchoBackend(TranslationBackend):
+    """Placeholder backend until a real engine is wired in"""
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        return [f"Translated: {text}" for text in texts]
+
+class FakeBackend(EchoBackend):
+    """
+    In-process stand-in that simulates an MT service's cost model
+
+    Every call pays a fixed overhead (network round trip, model warm-up)
+    plus a small cost per item, so batching gains can be measured without
+    a real engine.
+    """
+
+    def __init__(self, call_overhead_ms: float = 50.0, item_cost_ms: float = 0.5):
+        self.call_overhead = call_overhead_ms / 1000
+        self.item_cost = item_cost_ms / 1000
+        self.calls = 0
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        self.calls += 1
+        time.sleep(self.call_overhead + self.item_cost * len(texts))
+        return super().translate_batch(texts, source_lang, target_lang)
+
+BACKENDS = {
+    'echo': EchoBackend,
+    'fake': FakeBackend
+}
+
+def create_backend(name: str, **options) -> TranslationBackend:
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown translation backend: {name}") from None
+    return backend_class(**options)
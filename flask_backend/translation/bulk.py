@@ -0,0 +1,332 @@
+import os
+import re
+import csv
+import json
+import base64
+import logging
+from xml.etree import ElementTree
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import redis
+from scalability.cache import INVALIDATION_CHANNEL
+from scalability.cache_keys import KEY_VERSION, translation_key
+from scalability.codec import ValueCodec
+from scalability.hot_keys import HOT_KEYS_KEY
+from .service import TranslationService
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv', 'tmx')
+# Sender id of cache invalidations, never a CacheService instance id
+INVALIDATION_SENDER = 'tm-import'
+
+_EXTENSIONS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl', '.csv': 'csv', '.tmx': 'tmx'}
+_XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+# Translation entries only, not their ':lock' / ':delta' companions
+_ENTRY_KEY = re.compile(rf'^tr:{KEY_VERSION}:[^:]+:[^:]+:[0-9a-f]{{32}}$')
+
+# Accepted column / field names for each part of a translation unit
+_FIELDS = {
+    'text': ('text', 'source', 'source_text'),
+    'translated': ('translated', 'target', 'translation'),
+    'source_lang': ('source_lang', 'sourceLang'),
+    'target_lang': ('target_lang', 'targetLang')
+}
+
+class Entry(NamedTuple):
+    """One cache entry to write: key, codec-encoded value, TTL and popularity"""
+    key: str
+    value: bytes
+    ttl_ms: Optional[int] = None  # None: the importer's default, 0: no expiry
+    hits: Optional[float] = None
+
+def detect_format(path: str) -> str:
+    try:
+        return _EXTENSIONS[os.path.splitext(path)[1].lower()]
+    except KeyError:
+        raise ValueError(f"Cannot tell the format of {path}, pass one of {', '.join(FORMATS)}") from None
+
+def read_jsonl(fp: IO[str]) -> Iterator[Optional[Dict[str, Any]]]:
+    """One object per line: a translation unit, or an entry written by export_entries()"""
+    for line in fp:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+def read_csv(fp: IO[str]) -> Iterator[Optional[Dict[str, Any]]]:
+    """Translation units with a header row, e.g. text,translated,source_lang,target_lang"""
+    yield from csv.DictReader(fp)
+
+def read_tmx(fp: IO[bytes], source_lang: Optional[str] = None) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Translation units of a TMX file, one per target language of each <tu>
+
+    The source variant is the one in the <tu> or <header> srclang, else
+    source_lang, else the first. Language tags are kept as written
+    ('en-US', 'zh-Hant'), as the API keeps them, so imported units hit
+    requests that send the same tags. Elements are
+    dropped as soon as they are read, so memory does not grow with the
+    file.
+    """
+    header_lang = None
+    body = None
+    for event, element in ElementTree.iterparse(fp, events=('start', 'end')):
+        if event == 'start':
+            if element.tag == 'header':
+                header_lang = element.get('srclang')
+            elif element.tag == 'body':
+                body = element
+            continue
+
+        if element.tag == 'tu':
+            yield from _tu_rows(element, element.get('srclang') or header_lang or source_lang)
+            if body is not None:
+                body.clear()
+
+def _tu_rows(tu: ElementTree.Element, source_lang: Optional[str]) -> Iterator[Optional[Dict[str, Any]]]:
+    variants = []
+    for tuv in tu.iter('tuv'):
+        seg = tuv.find('seg')
+        lang = tuv.get(_XML_LANG) or tuv.get('lang')
+        if seg is None or not lang:
+            yield None
+            continue
+        variants.append((lang, _seg_text(seg)))
+
+    if len(variants) < 2:
+        return
+
+    source = _source_variant(variants, source_lang)
+    for variant in variants:
+        if variant is not source:
+            yield {'text': source[1], 'translated': variant[1], 'source_lang': source[0], 'target_lang': variant[0]}
+
+def _source_variant(variants: List[Tuple[str, str]], source_lang: Optional[str]) -> Tuple[str, str]:
+    """The (lang, text) variant in source_lang, else the first"""
+    if not source_lang or source_lang == '*all*':
+        return variants[0]
+
+    # Tags compare case-insensitively; srclang 'en' also finds an 'en-US' variant
+    for match in (lambda lang: lang.lower() == source_lang.lower(),
+                  lambda lang: _primary_lang(lang) == _primary_lang(source_lang)):
+        for variant in variants:
+            if match(variant[0]):
+                return variant
+    return variants[0]
+
+def _primary_lang(tag: str) -> str:
+    """Primary subtag of a language tag, only used to find the source variant"""
+    return re.split('[-_]', tag, 1)[0].lower()
+
+def _seg_text(element: ElementTree.Element) -> str:
+    """Text of a <seg>, keeping <hi> content but not native codes in <bpt>, <ph>, ..."""
+    parts = [element.text or '']
+    for child in element:
+        if child.tag in ('hi', 'sub'):
+            parts.append(_seg_text(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+def open_rows(path: str, file_format: str, source_lang: Optional[str] = None) -> Iterator[Optional[Dict[str, Any]]]:
+    """Stream the rows of a translation memory file"""
+    if file_format == 'tmx':
+        with open(path, 'rb') as fp:
+            yield from read_tmx(fp, source_lang)
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as fp:
+            yield from (read_csv(fp) if file_format == 'csv' else read_jsonl(fp))
+
+class TMImporter:
+    """
+    Writes translation memory rows into the translation cache
+
+    Keys and values are built exactly as TranslationService caches them, so
+    imported units are hits for /api/translate and the segment-level memory.
+    Rows are written in pipelined chunks; by default existing entries are
+    kept (SET NX), so an import never replaces a fresher translation and a
+    resumed import can safely write the same chunk twice. With overwrite,
+    every written key is also published on the cache invalidation channel
+    so workers drop stale L1 copies.
+    """
+
+    def __init__(self,
+                 client: redis.Redis,
+                 codec: ValueCodec,
+                 ttl: int = 3600,
+                 overwrite: bool = False,
+                 chunk_size: int = 1000,
+                 source_lang: Optional[str] = None,
+                 target_lang: Optional[str] = None):
+        """
+        Args:
+            client: Redis client (decode_responses=False)
+            codec: The codec the cache is configured with
+            ttl: Seconds imported entries live (0 = no expiry); entries from
+                 an export keep their remaining TTL
+            overwrite: Replace entries that already exist
+            chunk_size: Rows per pipelined round trip
+            source_lang: Language of rows that do not name one
+            target_lang: Language of rows that do not name one
+        """
+        self.client = client
+        self.codec = codec
+        self.ttl = ttl
+        self.overwrite = overwrite
+        self.chunk_size = chunk_size
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.stats = {'read': 0, 'written': 0, 'existing': 0, 'invalid': 0}
+
+    def entry(self, row: Optional[Dict[str, Any]]) -> Optional[Entry]:
+        """The cache entry for a row, or None if the row is unusable"""
+        if not row:
+            return None
+
+        if 'key' in row and 'value' in row:
+            # Written by export_entries(): restore as-is
+            try:
+                value = base64.b64decode(row['value'], validate=True)
+            except (TypeError, ValueError):
+                return None
+            if not _ENTRY_KEY.match(str(row['key'])):
+                return None
+            return Entry(row['key'], value, row.get('ttl_ms'), row.get('hits'))
+
+        unit = {name: next((row[alias] for alias in aliases if row.get(alias)), None)
+                for name, aliases in _FIELDS.items()}
+        text, translated = unit['text'], unit['translated']
+        source_lang = unit['source_lang'] or self.source_lang
+        target_lang = unit['target_lang'] or self.target_lang
+        if not (isinstance(text, str) and isinstance(translated, str) and source_lang and target_lang):
+            return None
+
+        cacheable = TranslationService._cacheable([translated])[0]
+        return Entry(translation_key(text, source_lang, target_lang), self.codec.encode(cacheable))
+
+    def run(self,
+            rows: Iterable[Optional[Dict[str, Any]]],
+            skip: int = 0,
+            on_chunk: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """
+        Import rows, calling on_chunk(rows done) after each chunk is written
+
+        Args:
+            rows: Rows from open_rows() or the read_* functions
+            skip: Rows already imported by an interrupted run
+
+        Returns:
+            Counts of rows read, written, already cached and invalid
+        """
+        done = 0
+        chunk: List[Entry] = []
+        for row in rows:
+            done += 1
+            if done <= skip:
+                continue
+
+            self.stats['read'] += 1
+            entry = self.entry(row)
+            if entry is None:
+                self.stats['invalid'] += 1
+            else:
+                chunk.append(entry)
+
+            if done % self.chunk_size == 0:
+                self._write(chunk)
+                chunk = []
+                if on_chunk is not None:
+                    on_chunk(done)
+
+        self._write(chunk)
+        if on_chunk is not None:
+            on_chunk(done)
+        return self.stats
+
+    def _write(self, chunk: List[Entry]) -> None:
+        if not chunk:
+            return
+
+        pipeline = self.client.pipeline(transaction=False)
+        for entry in chunk:
+            if entry.ttl_ms is None:
+                pipeline.set(entry.key, entry.value, ex=self.ttl or None, nx=not self.overwrite)
+            elif entry.ttl_ms > 0:
+                pipeline.set(entry.key, entry.value, px=entry.ttl_ms, nx=not self.overwrite)
+            else:
+                # Exported from an entry that never expires
+                pipeline.set(entry.key, entry.value, nx=not self.overwrite)
+            if self.overwrite:
+                # Workers drop their L1 copy of a replaced entry
+                pipeline.publish(INVALIDATION_CHANNEL, f"{INVALIDATION_SENDER}:{entry.key}")
+            if entry.hits:
+                pipeline.zincrby(HOT_KEYS_KEY, entry.hits, entry.key)
+
+        replies = iter(pipeline.execute())
+        for entry in chunk:
+            if next(replies):
+                self.stats['written'] += 1
+            else:
+                self.stats['existing'] += 1
+            if self.overwrite:
+                next(replies)
+            if entry.hits:
+                next(replies)
+
+def export_entries(client: redis.Redis,
+                   fp: IO[str],
+                   chunk_size: int = 1000,
+                   on_chunk: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Write every cached translation to fp as JSON lines, for TMImporter
+
+    Keys are found with SCAN, so Redis is never blocked, and values are
+    fetched a chunk at a time with their TTL (ttl_ms 0 for entries that never
+    expire) and popularity. Values stay
+    codec-encoded (base64): the cache does not keep source texts, so an
+    export restores a cache rather than rebuilding a TM file.
+
+    Returns:
+        Number of entries written
+    """
+    written = 0
+    keys: List[bytes] = []
+
+    def flush() -> int:
+        pipeline = client.pipeline(transaction=False)
+        for key in keys:
+            pipeline.get(key)
+            pipeline.pttl(key)
+            pipeline.zscore(HOT_KEYS_KEY, key)
+        replies = pipeline.execute()
+
+        count = 0
+        for index, key in enumerate(keys):
+            value, ttl_ms, hits = replies[index * 3:index * 3 + 3]
+            if value is None:
+                # Expired or deleted since the SCAN
+                continue
+            line = {'key': key.decode('utf-8'), 'value': base64.b64encode(value).decode('ascii'),
+                    'ttl_ms': max(ttl_ms, 0)}
+            if hits:
+                line['hits'] = hits
+            fp.write(json.dumps(line) + '\n')
+            count += 1
+        keys.clear()
+        return count
+
+    for key in client.scan_iter(match=f'tr:{KEY_VERSION}:*', count=chunk_size):
+        if _ENTRY_KEY.match(key.decode('utf-8')):
+            keys.append(key)
+        if len(keys) >= chunk_size:
+            written += flush()
+            if on_chunk is not None:
+                on_chunk(written)
+
+    if keys:
+        written += flush()
+    if on_chunk is not None:
+        on_chunk(written)
+    return written
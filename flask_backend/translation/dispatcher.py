@@ -0,0 +1,173 @@
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition, Thread
+from typing import Deque, Dict, List, Optional, Tuple
+from scalability.circuit_breaker import CircuitBreaker
+from .backend import TranslationBackend
+
+logger = logging.getLogger(__name__)
+
+LanguagePair = Tuple[str, str]
+
+class BackpressureError(Exception):
+    """Raised when the dispatcher queue stays full for longer than the submit timeout"""
+
+class _Pending:
+    __slots__ = ('text', 'future', 'enqueued_at')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+class MicroBatcher:
+    """
+    Coalesces concurrent translation requests into backend batch calls
+
+    Requests are queued per language pair. A pair's queue is flushed once it
+    holds max_batch_size items or its oldest item has waited max_wait_ms,
+    or right away while no batch is in flight, so an idle backend never
+    makes a lone request wait.
+    At most `workers` batches are in flight; while the backend is saturated
+    the queue fills up and submit() blocks, then fails with
+    BackpressureError after submit_timeout seconds.
+    """
+
+    def __init__(self,
+                 backend: TranslationBackend,
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 10,
+                 max_queue_size: int = 10000,
+                 workers: int = 4,
+                 submit_timeout: float = 5.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue_size = max_queue_size
+        self.workers = workers
+        self.submit_timeout = submit_timeout
+        self.breaker = breaker
+
+        self._queues: Dict[LanguagePair, Deque[_Pending]] = {}
+        self._size = 0
+        self._in_flight = 0
+        self._closed = False
+        self._cond = Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='translation-batch')
+        self._thread = Thread(target=self._run, name='translation-dispatcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str, source_lang: str, target_lang: str, timeout: Optional[float] = None) -> Future:
+        """
+        Queue one text, returning a future for its translation
+
+        Args:
+            timeout: Seconds to wait for queue space (submit_timeout by default)
+        """
+        deadline = time.monotonic() + (self.submit_timeout if timeout is None else timeout)
+
+        with self._cond:
+            while self._size >= self.max_queue_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise BackpressureError("Translation queue is full")
+                self._cond.wait(remaining)
+
+            if self._closed:
+                raise RuntimeError("Dispatcher is closed")
+
+            pending = _Pending(text)
+            self._queues.setdefault((source_lang, target_lang), deque()).append(pending)
+            self._size += 1
+            self._cond.notify_all()
+            return pending.future
+
+    def translate(self, items: List[Tuple[str, str, str]], timeout: Optional[float] = None) -> List[str]:
+        """Translate (text, source_lang, target_lang) tuples, blocking until all are done"""
+        futures = [self.submit(*item) for item in items]
+        return [future.result(timeout) for future in futures]
+
+    def queue_size(self) -> int:
+        return self._size
+
+    def close(self) -> None:
+        """Flush everything still queued, then stop the dispatcher"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                batches, wait = self._take_batches()
+                while not batches:
+                    if self._closed and self._size == 0:
+                        return
+                    self._cond.wait(wait)
+                    batches, wait = self._take_batches()
+
+            for pair, batch in batches:
+                self._executor.submit(self._dispatch, pair, batch)
+
+    def _take_batches(self):
+        """Pop the batches that are due; called with the condition held"""
+        now = time.monotonic()
+        batches: List[Tuple[LanguagePair, List[_Pending]]] = []
+        wait: Optional[float] = None
+        freed = False
+
+        for pair, queue in list(self._queues.items()):
+            while queue and self._in_flight < self.workers:
+                due = len(queue) >= self.max_batch_size or self._closed or \
+                    self._in_flight == 0 or now - queue[0].enqueued_at >= self.max_wait
+                if not due:
+                    remaining = queue[0].enqueued_at + self.max_wait - now
+                    wait = remaining if wait is None else min(wait, remaining)
+                    break
+
+                popped = [queue.popleft() for _ in range(min(len(queue), self.max_batch_size))]
+                self._size -= len(popped)
+                freed = True
+                # Callers may have given up on some (e.g. a cancelled asyncio.wrap_future);
+                # the rest can no longer be cancelled
+                batch = [pending for pending in popped if pending.future.set_running_or_notify_cancel()]
+                if batch:
+                    batches.append((pair, batch))
+                    self._in_flight += 1
+
+            if not queue:
+                del self._queues[pair]
+
+        if freed:
+            # Space was freed for submitters blocked on a full queue
+            self._cond.notify_all()
+        return batches, wait
+
+    def _dispatch(self, pair: LanguagePair, batch: List[_Pending]) -> None:
+        try:
+            texts = [pending.text for pending in batch]
+            if self.breaker is not None:
+                results = self.breaker.call(self.backend.translate_batch, texts, *pair)
+            else:
+                results = self.backend.translate_batch(texts, *pair)
+
+            if len(results) != len(batch):
+                raise ValueError(f"Backend returned {len(results)} results for {len(batch)} texts")
+
+            for pending, result in zip(batch, results):
+                if not pending.future.done():
+                    pending.future.set_result(result)
+        except Exception as e:
+            logger.error(f"Translation batch failed: {str(e)}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
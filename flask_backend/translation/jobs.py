@@ -0,0 +1,595 @@
+import json
+import time
+import uuid
+import heapq
+import socket
+import logging
+import ipaddress
+from abc import ABC, abstractmethod
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import redis
+import urllib3
+import requests
+import requests.adapters
+from scalability.redis_pool import RedisPool, get_shared_pool
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+MAX_PRIORITY = 9
+
+_EXPIRED_ERROR = 'Visibility timeout expired on the last attempt'
+
+def check_webhook(url: str, allowed_hosts: Iterable[str] = ()) -> None:
+    """
+    Raise ValueError unless url is a webhook workers may POST to
+
+    Workers send from inside the network, so a webhook must not reach
+    internal services. With allowed_hosts, the host must be one of them
+    ('.example.com' also allows its subdomains); without, every address
+    the host resolves to must be public (no loopback, private, link-local
+    or reserved ranges, e.g. cloud metadata endpoints).
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError("'webhook' must be an http(s) URL")
+
+    host = parsed.hostname.lower().rstrip('.')
+    allowed_hosts = list(allowed_hosts)
+    if allowed_hosts:
+        if not any(host == allowed or (allowed.startswith('.') and host.endswith(allowed))
+                   for allowed in (entry.lower() for entry in allowed_hosts)):
+            raise ValueError(f"'webhook' host {host} is not allowed")
+        return
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or None, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise ValueError(f"'webhook' host {host} cannot be resolved") from None
+
+    for address in addresses:
+        _check_address(address)
+
+def _check_address(address: str) -> None:
+    ip = ipaddress.ip_address(address.split('%', 1)[0])
+    if getattr(ip, 'ipv4_mapped', None):
+        ip = ip.ipv4_mapped
+    if not ip.is_global or ip.is_multicast:
+        raise ValueError(f"'webhook' must not target the internal address {ip}")
+
+class _PublicOnly:
+    """
+    Connection mixin refusing peers at internal addresses
+
+    check_webhook() resolves the host ahead of the request, and the host
+    could resolve elsewhere when requests connects (DNS rebinding), so the
+    address actually connected to is checked too, before anything is sent.
+    """
+
+    def _new_conn(self) -> socket.socket:
+        sock = super()._new_conn()
+        try:
+            _check_address(sock.getpeername()[0])
+        except ValueError:
+            sock.close()
+            raise
+        return sock
+
+class _PublicHTTPConnection(_PublicOnly, urllib3.connection.HTTPConnection):
+    pass
+
+class _PublicHTTPSConnection(_PublicOnly, urllib3.connection.HTTPSConnection):
+    pass
+
+class _PublicHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _PublicHTTPConnection
+
+class _PublicHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _PublicHTTPSConnection
+
+class _PublicAdapter(requests.adapters.HTTPAdapter):
+    """Transport adapter that only connects to public addresses"""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _PublicHTTPConnectionPool,
+            'https': _PublicHTTPSConnectionPool
+        }
+
+def webhook_session(allowed_hosts: Iterable[str] = ()) -> requests.Session:
+    """
+    Session to POST webhooks with, see check_webhook()
+
+    Without allowed_hosts, connections to internal addresses fail with
+    ValueError. Proxy settings from the environment are ignored, since
+    the proxy would be the peer that gets checked.
+    """
+    session = requests.Session()
+    session.trust_env = False
+    if not list(allowed_hosts):
+        adapter = _PublicAdapter()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+def _score(priority: int, enqueued_ms: int) -> float:
+    """Higher priority first, FIFO within a priority"""
+    return (MAX_PRIORITY - priority) * 10 ** 13 + enqueued_ms
+
+class JobQueue(ABC):
+    """
+    Priority queue of translation jobs with visibility timeouts
+
+    A claimed job is invisible to other workers until it is completed or
+    failed, or until its visibility timeout passes, after which
+    requeue_expired() hands it to another worker. Workers running a long
+    job push the timeout back with extend(). A job whose worker died
+    max_attempts times (e.g. killed by the OOM killer) is failed instead
+    of being requeued forever. Finished jobs are kept for result_ttl
+    seconds so clients can poll for them.
+    """
+
+    def __init__(self,
+                 visibility_timeout: int = 300,
+                 result_ttl: int = 3600,
+                 job_ttl: int = 86400,
+                 max_attempts: int = 3):
+        self.visibility_timeout = visibility_timeout
+        self.result_ttl = result_ttl
+        self.job_ttl = job_ttl
+        self.max_attempts = max_attempts
+
+    @staticmethod
+    def new_job(payload: Dict[str, Any], priority: int = 0, webhook: Optional[str] = None) -> Dict[str, Any]:
+        if not 0 <= priority <= MAX_PRIORITY:
+            raise ValueError(f"priority must be between 0 and {MAX_PRIORITY}")
+
+        now = _now_ms()
+        return {
+            'id': uuid.uuid4().hex,
+            'status': QUEUED,
+            'priority': priority,
+            'payload': payload,
+            'webhook': webhook,
+            'result': None,
+            'error': None,
+            'attempts': 0,
+            'created_at': now,
+            'updated_at': now
+        }
+
+    @abstractmethod
+    def enqueue(self, payload: Dict[str, Any], priority: int = 0, webhook: Optional[str] = None) -> Dict[str, Any]:
+        """Add a job, returning it"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job, or None if it is unknown or expired"""
+
+    @abstractmethod
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Take the highest-priority queued job, or return None if there is none"""
+
+    @abstractmethod
+    def complete(self, job_id: str, result: Any) -> None:
+        """Store the result of a claimed job"""
+
+    @abstractmethod
+    def fail(self, job_id: str, error: str, retry: bool) -> None:
+        """Put a claimed job back in the queue, or mark it as failed for good"""
+
+    @abstractmethod
+    def extend(self, job_id: str) -> bool:
+        """Restart the visibility timeout of a claimed job, returning False if it is no longer claimed"""
+
+    @abstractmethod
+    def requeue_expired(self) -> List[str]:
+        """
+        Return jobs whose visibility timeout passed to the queue, failing
+        those that already used max_attempts
+
+        Returns:
+            Ids of the jobs failed for good
+        """
+
+class InMemoryJobQueue(JobQueue):
+    """Process-local stand-in for RedisJobQueue, for tests and single-process setups"""
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._expires: Dict[str, float] = {}
+        self._pending: List[Tuple[float, str]] = []
+        self._processing: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def enqueue(self, payload, priority=0, webhook=None):
+        job = self.new_job(payload, priority, webhook)
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._expires[job['id']] = time.time() + self.job_ttl
+            heapq.heappush(self._pending, (_score(priority, job['created_at']), job['id']))
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self):
+        with self._lock:
+            while self._pending:
+                _, job_id = heapq.heappop(self._pending)
+                job = self._jobs.get(job_id)
+                if job is None or job['status'] != QUEUED:
+                    continue
+                job.update(status=RUNNING, attempts=job['attempts'] + 1, updated_at=_now_ms())
+                self._processing[job_id] = time.time() + self.visibility_timeout
+                return dict(job)
+            return None
+
+    def complete(self, job_id, result):
+        self._finish(job_id, status=DONE, result=result)
+
+    def fail(self, job_id, error, retry):
+        if not retry:
+            self._finish(job_id, status=FAILED, error=error)
+            return
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            self._processing.pop(job_id, None)
+            if job is not None:
+                job.update(status=QUEUED, error=error, updated_at=_now_ms())
+                heapq.heappush(self._pending, (_score(job['priority'], job['created_at']), job_id))
+
+    def extend(self, job_id):
+        with self._lock:
+            if job_id not in self._processing:
+                return False
+            self._processing[job_id] = time.time() + self.visibility_timeout
+            return True
+
+    def requeue_expired(self):
+        now = time.time()
+        failed = []
+        with self._lock:
+            expired = [job_id for job_id, deadline in self._processing.items() if deadline <= now]
+            for job_id in expired:
+                del self._processing[job_id]
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if job['attempts'] >= self.max_attempts:
+                    job.update(status=FAILED, error=_EXPIRED_ERROR, updated_at=_now_ms())
+                    self._expires[job_id] = now + self.result_ttl
+                    failed.append(job_id)
+                else:
+                    job.update(status=QUEUED, updated_at=_now_ms())
+                    heapq.heappush(self._pending, (_score(job['priority'], job['created_at']), job_id))
+        return failed
+
+    def _finish(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._processing.pop(job_id, None)
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(updated_at=_now_ms(), **fields)
+                self._expires[job_id] = time.time() + self.result_ttl
+
+    def _purge(self) -> None:
+        now = time.time()
+        for job_id in [job_id for job_id, at in self._expires.items() if at <= now]:
+            self._jobs.pop(job_id, None)
+            self._expires.pop(job_id, None)
+
+# KEYS[1] pending zset, KEYS[2] processing zset
+# ARGV[1] now (ms), ARGV[2] visibility timeout (ms), ARGV[3] job key prefix
+_CLAIM_SCRIPT = """
+local popped = redis.call('ZPOPMIN', KEYS[1])
+if #popped == 0 then
+    return false
+end
+local job_id = popped[1]
+local key = ARGV[3] .. job_id
+if redis.call('EXISTS', key) == 0 then
+    return false
+end
+redis.call('ZADD', KEYS[2], tonumber(ARGV[1]) + tonumber(ARGV[2]), job_id)
+redis.call('HSET', key, 'status', 'running', 'updated_at', ARGV[1])
+redis.call('HINCRBY', key, 'attempts', 1)
+return job_id
+"""
+
+# KEYS[1] pending zset, KEYS[2] processing zset
+# ARGV[1] now (ms), ARGV[2] job key prefix, ARGV[3] max attempts,
+# ARGV[4] result TTL (s), ARGV[5] error of jobs out of attempts
+# Returns the ids of the jobs failed for good
+_REQUEUE_SCRIPT = """
+local failed = {}
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, job_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], job_id)
+    local key = ARGV[2] .. job_id
+    local job = redis.call('HMGET', key, 'score', 'attempts')
+    if job[1] then
+        if tonumber(job[2]) >= tonumber(ARGV[3]) then
+            redis.call('HSET', key, 'status', 'failed', 'error', ARGV[5], 'updated_at', ARGV[1])
+            redis.call('EXPIRE', key, ARGV[4])
+            table.insert(failed, job_id)
+        else
+            redis.call('HSET', key, 'status', 'queued', 'updated_at', ARGV[1])
+            redis.call('ZADD', KEYS[1], job[1], job_id)
+        end
+    end
+end
+return failed
+"""
+
+class RedisJobQueue(JobQueue):
+    """
+    Job queue shared by API processes and workers through Redis
+
+    Each job is a hash under job:<id>. Queued ids live in a sorted set
+    ordered by priority then age; claimed ids move atomically to a second
+    sorted set scored by their visibility deadline.
+    """
+
+    def __init__(self, redis_pool: Optional[RedisPool] = None, prefix: str = 'jobs', **kwargs: Any):
+        super().__init__(**kwargs)
+        self.redis_pool = redis_pool or get_shared_pool()
+        self.pending_key = f'{prefix}:pending'
+        self.processing_key = f'{prefix}:processing'
+        self.job_prefix = f'{prefix}:job:'
+        self._claim: Optional[Any] = None
+        self._requeue: Optional[Any] = None
+
+    @property
+    def redis_client(self) -> redis.Redis:
+        client = self.redis_pool.client(decode_responses=True)
+        if client is None:
+            raise redis.ConnectionError("Redis not available - job queue is disabled")
+        return client
+
+    def enqueue(self, payload, priority=0, webhook=None):
+        job = self.new_job(payload, priority, webhook)
+        key = self.job_prefix + job['id']
+        score = _score(priority, job['created_at'])
+
+        pipeline = self.redis_client.pipeline()
+        pipeline.hset(key, mapping=self._to_hash(job, score=score))
+        pipeline.expire(key, self.job_ttl)
+        pipeline.zadd(self.pending_key, {job['id']: score})
+        pipeline.execute()
+        return job
+
+    def get(self, job_id):
+        fields = self.redis_client.hgetall(self.job_prefix + job_id)
+        return self._from_hash(fields) if fields else None
+
+    def claim(self):
+        client = self.redis_client
+        if self._claim is None:
+            self._claim = client.register_script(_CLAIM_SCRIPT)
+
+        job_id = self._claim(
+            keys=[self.pending_key, self.processing_key],
+            args=[_now_ms(), self.visibility_timeout * 1000, self.job_prefix],
+            client=client
+        )
+        return self.get(job_id) if job_id else None
+
+    def complete(self, job_id, result):
+        self._finish(job_id, status=DONE, result=json.dumps(result))
+
+    def fail(self, job_id, error, retry):
+        if not retry:
+            self._finish(job_id, status=FAILED, error=error)
+            return
+
+        key = self.job_prefix + job_id
+        client = self.redis_client
+        score = client.hget(key, 'score')
+        pipeline = client.pipeline()
+        pipeline.zrem(self.processing_key, job_id)
+        if score is not None:
+            pipeline.hset(key, mapping={'status': QUEUED, 'error': error, 'updated_at': _now_ms()})
+            pipeline.zadd(self.pending_key, {job_id: float(score)})
+        pipeline.execute()
+
+    def extend(self, job_id):
+        deadline = _now_ms() + self.visibility_timeout * 1000
+        pipeline = self.redis_client.pipeline()
+        # XX: a job already requeued or finished stays out of the processing set
+        pipeline.zadd(self.processing_key, {job_id: deadline}, xx=True)
+        pipeline.zscore(self.processing_key, job_id)
+        return pipeline.execute()[1] is not None
+
+    def requeue_expired(self):
+        client = self.redis_client
+        if self._requeue is None:
+            self._requeue = client.register_script(_REQUEUE_SCRIPT)
+
+        return self._requeue(
+            keys=[self.pending_key, self.processing_key],
+            args=[_now_ms(), self.job_prefix, self.max_attempts, self.result_ttl, _EXPIRED_ERROR],
+            client=client
+        )
+
+    def _finish(self, job_id: str, **fields: Any) -> None:
+        key = self.job_prefix + job_id
+        pipeline = self.redis_client.pipeline()
+        pipeline.zrem(self.processing_key, job_id)
+        pipeline.hset(key, mapping={'updated_at': _now_ms(), **fields})
+        pipeline.expire(key, self.result_ttl)
+        pipeline.execute()
+
+    @staticmethod
+    def _to_hash(job: Dict[str, Any], score: float) -> Dict[str, Any]:
+        return {
+            'id': job['id'],
+            'status': job['status'],
+            'priority': job['priority'],
+            'payload': json.dumps(job['payload']),
+            'webhook': job['webhook'] or '',
+            'attempts': job['attempts'],
+            'created_at': job['created_at'],
+            'updated_at': job['updated_at'],
+            'score': score
+        }
+
+    @staticmethod
+    def _from_hash(fields: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            'id': fields['id'],
+            'status': fields['status'],
+            'priority': int(fields['priority']),
+            'payload': json.loads(fields['payload']),
+            'webhook': fields.get('webhook') or None,
+            'result': json.loads(fields['result']) if fields.get('result') else None,
+            'error': fields.get('error') or None,
+            'attempts': int(fields['attempts']),
+            'created_at': int(fields['created_at']),
+            'updated_at': int(fields['updated_at'])
+        }
+
+def create_job_queue(config: Any) -> JobQueue:
+    """Build the job queue selected by Config.JOB_QUEUE_BACKEND ('redis' or 'memory')"""
+    options = dict(
+        visibility_timeout=config.JOB_VISIBILITY_TIMEOUT,
+        result_ttl=config.JOB_RESULT_TTL,
+        max_attempts=config.JOB_MAX_ATTEMPTS
+    )
+    if config.JOB_QUEUE_BACKEND == 'memory':
+        return InMemoryJobQueue(**options)
+    if config.JOB_QUEUE_BACKEND == 'redis':
+        return RedisJobQueue(**options)
+    raise ValueError(f"Unknown job queue backend: {config.JOB_QUEUE_BACKEND}")
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a job that is returned to API clients"""
+    view = {
+        'id': job['id'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at']
+    }
+    if job['status'] == DONE:
+        view['result'] = job['result']
+    if job['error']:
+        view['error'] = job['error']
+    return view
+
+class JobWorker:
+    """
+    Drains a JobQueue, running each job through a handler
+
+    Failed jobs are retried up to max_attempts times, then marked failed.
+    While a job runs, a heartbeat thread extends its visibility timeout
+    every heartbeat_interval seconds, so a job that legitimately outlives
+    the timeout is not handed to a second worker. When a job finishes and
+    has a webhook, the public job view is POSTed to it, if the webhook
+    still passes check_webhook() (DNS may have changed since the job was
+    queued), and the address actually connected to is checked again;
+    redirects are not followed.
+    """
+
+    def __init__(self,
+                 queue: JobQueue,
+                 handler: Callable[[Dict[str, Any]], Any],
+                 max_attempts: Optional[int] = None,
+                 poll_interval: float = 0.5,
+                 webhook_timeout: float = 5.0,
+                 heartbeat_interval: Optional[float] = None,
+                 webhook_allowed_hosts: Iterable[str] = ()):
+        """
+        Args:
+            max_attempts: Defaults to the queue's max_attempts
+            heartbeat_interval: Defaults to a third of the visibility timeout
+            webhook_allowed_hosts: See check_webhook()
+        """
+        self.queue = queue
+        self.handler = handler
+        self.max_attempts = queue.max_attempts if max_attempts is None else max_attempts
+        self.poll_interval = poll_interval
+        self.webhook_timeout = webhook_timeout
+        self.heartbeat_interval = heartbeat_interval or queue.visibility_timeout / 3
+        self.webhook_allowed_hosts = list(webhook_allowed_hosts)
+        self._webhooks = webhook_session(self.webhook_allowed_hosts)
+
+    def run(self, stop: Optional[Event] = None) -> None:
+        stop = stop or Event()
+        while not stop.is_set():
+            try:
+                worked = self.run_once()
+            except redis.RedisError as e:
+                logger.error(f"Job queue error: {str(e)}")
+                worked = False
+
+            if not worked:
+                stop.wait(self.poll_interval)
+
+    def run_once(self) -> bool:
+        """Process at most one job, returning whether there was one"""
+        for job_id in self.queue.requeue_expired():
+            logger.error(f"Job {job_id} failed: visibility timeout expired on its last attempt")
+            self._notify(job_id)
+
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        done = Event()
+        heartbeat = Thread(target=self._heartbeat, args=(job['id'], done), name='job-heartbeat', daemon=True)
+        heartbeat.start()
+        try:
+            result = self.handler(job['payload'])
+        except Exception as e:
+            retry = job['attempts'] < self.max_attempts
+            logger.error(f"Job {job['id']} failed (attempt {job['attempts']}): {str(e)}")
+            self.queue.fail(job['id'], str(e), retry=retry)
+            if not retry:
+                self._notify(job['id'])
+            return True
+        finally:
+            done.set()
+            heartbeat.join()
+
+        self.queue.complete(job['id'], result)
+        self._notify(job['id'])
+        return True
+
+    def _heartbeat(self, job_id: str, done: Event) -> None:
+        while not done.wait(self.heartbeat_interval):
+            try:
+                if not self.queue.extend(job_id):
+                    logger.warning(f"Job {job_id} is no longer claimed by this worker")
+                    return
+            except redis.RedisError as e:
+                logger.error(f"Failed to extend job {job_id}: {str(e)}")
+
+    def _notify(self, job_id: str) -> None:
+        job = self.queue.get(job_id)
+        if not job or not job['webhook']:
+            return
+
+        try:
+            check_webhook(job['webhook'], self.webhook_allowed_hosts)
+            self._webhooks.post(job['webhook'], json=public_job(job), timeout=self.webhook_timeout,
+                                allow_redirects=False)
+        except ValueError as e:
+            logger.error(f"Webhook for job {job_id} refused: {str(e)}")
+        except requests.RequestException as e:
+            logger.error(f"Webhook for job {job_id} failed: {str(e)}")
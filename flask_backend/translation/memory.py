@@ -0,0 +1,260 @@
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+)
+from scalability.cache import CacheService
+from scalability.cache_keys import translation_key
+from .segmenter import Segment, segment, reassemble
+
+# (text, source_lang, target_lang) tuples -> cacheable results, one per item
+BatchTranslator = Callable[[List[Tuple[str, str, str]]], List[Dict[str, Any]]]
+AsyncBatchTranslator = Callable[[List[Tuple[str, str, str]]], Awaitable[List[Dict[str, Any]]]]
+
+class TranslationMemory:
+    """
+    Segment-level translation memory backed by CacheService
+
+    Documents are split into sentences or paragraphs, each looked up under
+    the same key scheme as whole-text translations, so an edit to one
+    sentence only retranslates that sentence.
+    """
+
+    def __init__(self, cache_service: CacheService, expires: int = 3600):
+        self.cache_service = cache_service
+        self.expires = expires
+
+    def translate(self,
+                  text: str,
+                  source_lang: str,
+                  target_lang: str,
+                  translate_batch: BatchTranslator,
+                  mode: str = 'sentence') -> Tuple[str, Dict[str, Any]]:
+        """
+        Translate text segment by segment
+
+        Args:
+            text: Document to translate
+            source_lang: Source language code
+            target_lang: Target language code
+            translate_batch: Backend call used once for all missing segments
+            mode: 'sentence' or 'paragraph'
+
+        Returns:
+            The reassembled translation and per-request segment statistics
+        """
+        segments = segment(text, mode)
+        keys, unique = self._plan(segments, source_lang, target_lang)
+
+        # Each distinct segment is looked up and translated once
+        found = self.cache_service.get_many(list(unique), expires=self.expires)
+        missing = [key for key in unique if key not in found]
+        found.update(self._translate_missing(unique, missing, source_lang, target_lang, translate_batch))
+
+        return self._render(segments, keys, found), self._stats(mode, unique, missing)
+
+    def stream(self,
+               segments: Iterable[Segment],
+               source_lang: str,
+               target_lang: str,
+               translate_batch: BatchTranslator,
+               window: int = 16,
+               stats: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Translate a stream of segments, yielding output as soon as it is ready
+
+        Segments are processed in windows of up to `window` translatable
+        segments: one MGET per window, and one backend call for its misses.
+        Cached segments before the first miss of a window are yielded
+        without waiting for the backend.
+
+        Args:
+            stats: Optional dict filled with segment statistics as the stream
+                   is consumed
+        """
+        stats = self._start_stats(stats)
+
+        pending: List[Segment] = []
+        translatable = 0
+        for seg in segments:
+            pending.append(seg)
+            translatable += seg.translatable
+            if translatable >= window:
+                yield from self._stream_window(pending, source_lang, target_lang, translate_batch, stats)
+                pending = []
+                translatable = 0
+
+        if pending:
+            yield from self._stream_window(pending, source_lang, target_lang, translate_batch, stats)
+
+        self._finish_stats(stats)
+
+    def _stream_window(self,
+                       segments: List[Segment],
+                       source_lang: str,
+                       target_lang: str,
+                       translate_batch: BatchTranslator,
+                       stats: Dict[str, Any]) -> Iterator[str]:
+        keys, unique = self._plan(segments, source_lang, target_lang)
+        found = self.cache_service.get_many(list(unique), expires=self.expires)
+        missing = [key for key in unique if key not in found]
+        self._count_window(stats, unique, missing)
+
+        # Flush what is ready before waiting on the backend
+        ready = self._first_miss(keys, found)
+        if ready:
+            yield self._render(segments[:ready], keys[:ready], found)
+
+        if ready < len(segments):
+            found.update(self._translate_missing(
+                unique, missing, source_lang, target_lang, translate_batch
+            ))
+            yield self._render(segments[ready:], keys[ready:], found)
+
+    def _translate_missing(self,
+                           unique: Dict[str, str],
+                           missing: List[str],
+                           source_lang: str,
+                           target_lang: str,
+                           translate_batch: BatchTranslator) -> Dict[str, Any]:
+        """Translate the missing segments in one backend call and store them"""
+        if not missing:
+            return {}
+
+        translated = translate_batch([(unique[key], source_lang, target_lang) for key in missing])
+        fresh = dict(zip(missing, translated))
+        self.cache_service.set_many(fresh, expires=self.expires)
+        return fresh
+
+    @staticmethod
+    def _plan(segments: List[Segment],
+              source_lang: str,
+              target_lang: str) -> Tuple[List[Optional[str]], Dict[str, str]]:
+        """Cache key of each segment (None when not translatable) and the distinct keys to look up"""
+        keys = [
+            translation_key(seg.text, source_lang, target_lang) if seg.translatable else None
+            for seg in segments
+        ]
+        unique = {key: seg.text for key, seg in zip(keys, segments) if key is not None}
+        return keys, unique
+
+    @staticmethod
+    def _render(segments: List[Segment], keys: List[Optional[str]], found: Dict[str, Any]) -> str:
+        return reassemble(segments, [found[key]['translated'] for key in keys if key is not None])
+
+    @staticmethod
+    def _first_miss(keys: List[Optional[str]], found: Dict[str, Any]) -> int:
+        """Number of leading segments that can be output without the backend"""
+        for index, key in enumerate(keys):
+            if key is not None and key not in found:
+                return index
+        return len(keys)
+
+    @staticmethod
+    def _stats(mode: str, unique: Dict[str, str], missing: List[str]) -> Dict[str, Any]:
+        hits = len(unique) - len(missing)
+        return {
+            'mode': mode,
+            'total': len(unique),
+            'hits': hits,
+            'misses': len(missing),
+            'hit_ratio': round(hits / len(unique), 4) if unique else 1.0
+        }
+
+    @staticmethod
+    def _start_stats(stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        stats = stats if stats is not None else {}
+        stats.update({'total': 0, 'hits': 0, 'misses': 0})
+        return stats
+
+    @staticmethod
+    def _count_window(stats: Dict[str, Any], unique: Dict[str, str], missing: List[str]) -> None:
+        stats['total'] += len(unique)
+        stats['hits'] += len(unique) - len(missing)
+        stats['misses'] += len(missing)
+
+    @staticmethod
+    def _finish_stats(stats: Dict[str, Any]) -> None:
+        stats['hit_ratio'] = round(stats['hits'] / stats['total'], 4) if stats['total'] else 1.0
+
+class AsyncTranslationMemory(TranslationMemory):
+    """
+    TranslationMemory for coroutines, on AsyncCacheService
+
+    Planning, rendering and statistics are TranslationMemory's; only the
+    cache and backend round trips are awaited.
+    """
+
+    async def translate(self,
+                        text: str,
+                        source_lang: str,
+                        target_lang: str,
+                        translate_batch: AsyncBatchTranslator,
+                        mode: str = 'sentence') -> Tuple[str, Dict[str, Any]]:
+        segments = segment(text, mode)
+        keys, unique = self._plan(segments, source_lang, target_lang)
+
+        found = await self.cache_service.get_many(list(unique), expires=self.expires)
+        missing = [key for key in unique if key not in found]
+        found.update(await self._translate_missing(unique, missing, source_lang, target_lang, translate_batch))
+
+        return self._render(segments, keys, found), self._stats(mode, unique, missing)
+
+    async def stream(self,
+                     segments: AsyncIterable[Segment],
+                     source_lang: str,
+                     target_lang: str,
+                     translate_batch: AsyncBatchTranslator,
+                     window: int = 16,
+                     stats: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        stats = self._start_stats(stats)
+
+        pending: List[Segment] = []
+        translatable = 0
+        async for seg in segments:
+            pending.append(seg)
+            translatable += seg.translatable
+            if translatable >= window:
+                async for piece in self._stream_window(pending, source_lang, target_lang, translate_batch, stats):
+                    yield piece
+                pending = []
+                translatable = 0
+
+        if pending:
+            async for piece in self._stream_window(pending, source_lang, target_lang, translate_batch, stats):
+                yield piece
+
+        self._finish_stats(stats)
+
+    async def _stream_window(self,
+                             segments: List[Segment],
+                             source_lang: str,
+                             target_lang: str,
+                             translate_batch: AsyncBatchTranslator,
+                             stats: Dict[str, Any]) -> AsyncIterator[str]:
+        keys, unique = self._plan(segments, source_lang, target_lang)
+        found = await self.cache_service.get_many(list(unique), expires=self.expires)
+        missing = [key for key in unique if key not in found]
+        self._count_window(stats, unique, missing)
+
+        ready = self._first_miss(keys, found)
+        if ready:
+            yield self._render(segments[:ready], keys[:ready], found)
+
+        if ready < len(segments):
+            found.update(await self._translate_missing(
+                unique, missing, source_lang, target_lang, translate_batch
+            ))
+            yield self._render(segments[ready:], keys[ready:], found)
+
+    async def _translate_missing(self,
+                                 unique: Dict[str, str],
+                                 missing: List[str],
+                                 source_lang: str,
+                                 target_lang: str,
+                                 translate_batch: AsyncBatchTranslator) -> Dict[str, Any]:
+        if not missing:
+            return {}
+
+        translated = await translate_batch([(unique[key], source_lang, target_lang) for key in missing])
+        fresh = dict(zip(missing, translated))
+        await self.cache_service.set_many(fresh, expires=self.expires)
+        return fresh
@@ -0,0 +1,152 @@
+import re
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, NamedTuple, Tuple
+
+SEGMENT_MODES = ('sentence', 'paragraph')
+
+# Inline markup (<b>, <a href=...>, &amp;) stays inside the sentence it is
+# part of, so the backend sees whole sentences; block-level tags separate
+# segments and, like whitespace between segments, are never translated
+_MARKUP = re.compile(r'(<[^>]+>|&[a-zA-Z0-9#]+;)')
+_TAG_NAME = re.compile(r'</?\s*([a-zA-Z][a-zA-Z0-9]*)')
+_BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'body', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header', 'hr', 'html', 'li',
+    'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'title',
+    'tr', 'ul'
+))
+# Matched against the text with markup masked out (see _breaks), so a tag
+# between the punctuation and the whitespace does not hide the break
+_SENTENCE_BREAK = re.compile(r'[.!?。！？]\x00*(\s+)')
+_PARAGRAPH_BREAK = re.compile(r'(\n[ \t]*\n\s*)')
+_EDGE_WHITESPACE = re.compile(r'^(\s*)(.*?)(\s*)$', re.S)
+
+class Segment(NamedTuple):
+    text: str
+    translatable: bool
+
+def segment(text: str, mode: str = 'sentence') -> List[Segment]:
+    """
+    Split text into translatable segments and the whitespace/markup between them
+
+    Joining the text of every segment gives back the original input exactly,
+    so translated segments can be reassembled without losing formatting.
+    Pieces without a letter or digit (punctuation, inline tags alone) are
+    carried through instead of being translated.
+    """
+    if mode not in SEGMENT_MODES:
+        raise ValueError(f"Unknown segmentation mode: {mode}")
+
+    segments: List[Segment] = []
+    position = 0
+    for start, end in _breaks(text, _breaker(mode)):
+        _add_piece(segments, text[position:start])
+        segments.append(Segment(text[start:end], False))
+        position = end
+    _add_piece(segments, text[position:])
+    return segments
+
+def _breaker(mode: str) -> 're.Pattern[str]':
+    return _SENTENCE_BREAK if mode == 'sentence' else _PARAGRAPH_BREAK
+
+def _breaks(text: str, breaker: 're.Pattern[str]') -> List[Tuple[int, int]]:
+    """Sorted (start, end) spans that separate segments: break whitespace and block-level tags"""
+    masked = []
+    spans = []
+    position = 0
+    for match in _MARKUP.finditer(text):
+        markup = match.group()
+        name = _TAG_NAME.match(markup)
+        if name and name.group(1).lower() in _BLOCK_TAGS:
+            spans.append(match.span())
+        masked.append(text[position:match.start()])
+        masked.append('\x00' * len(markup))
+        position = match.end()
+    masked.append(text[position:])
+
+    spans.extend(match.span(1) for match in breaker.finditer(''.join(masked)))
+    return sorted(spans)
+
+def _add_piece(segments: List[Segment], piece: str) -> None:
+    if not piece:
+        return
+
+    leading, body, trailing = _EDGE_WHITESPACE.match(piece).groups()
+    if leading:
+        segments.append(Segment(leading, False))
+    if body:
+        words = _MARKUP.sub('', body)
+        segments.append(Segment(body, any(char.isalnum() for char in words)))
+    if trailing:
+        segments.append(Segment(trailing, False))
+
+def reassemble(segments: List[Segment], translations: List[str]) -> str:
+    """Join segments back together, substituting translatable ones in order"""
+    replacements = iter(translations)
+    return ''.join(next(replacements) if seg.translatable else seg.text for seg in segments)
+
+class StreamSegmenter:
+    """
+    Incremental segmenter for text that arrives in chunks
+
+    feed() returns the segments completed by each chunk and finish() the
+    rest. Only the text after the last safe break point is held back, and
+    never more than max_buffer characters, so memory stays bounded for any
+    input.
+    """
+
+    def __init__(self, mode: str = 'sentence', max_buffer: int = 65536):
+        if mode not in SEGMENT_MODES:
+            raise ValueError(f"Unknown segmentation mode: {mode}")
+
+        self.mode = mode
+        self.max_buffer = max_buffer
+        self._breaker = _breaker(mode)
+        self._buffer = ''
+
+    def feed(self, chunk: str) -> List[Segment]:
+        self._buffer += chunk
+        cut = _last_break(self._buffer, self._breaker)
+        if cut == 0 and len(self._buffer) > self.max_buffer:
+            # No sentence boundary in sight - fall back to the last whitespace
+            cut = self._buffer.rfind(' ', 0, self.max_buffer) + 1 or self.max_buffer
+        if not cut:
+            return []
+
+        ready, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return segment(ready, self.mode)
+
+    def finish(self) -> List[Segment]:
+        rest, self._buffer = self._buffer, ''
+        return segment(rest, self.mode) if rest else []
+
+def iter_segments(chunks: Iterable[str],
+                  mode: str = 'sentence',
+                  max_buffer: int = 65536) -> Iterator[Segment]:
+    """Segment text that arrives in chunks, yielding segments as soon as they are complete"""
+    segmenter = StreamSegmenter(mode, max_buffer)
+    for chunk in chunks:
+        yield from segmenter.feed(chunk)
+    yield from segmenter.finish()
+
+async def aiter_segments(chunks: AsyncIterable[str],
+                         mode: str = 'sentence',
+                         max_buffer: int = 65536) -> AsyncIterator[Segment]:
+    """iter_segments() for an async stream of chunks"""
+    segmenter = StreamSegmenter(mode, max_buffer)
+    async for chunk in chunks:
+        for seg in segmenter.feed(chunk):
+            yield seg
+    for seg in segmenter.finish():
+        yield seg
+
+def _last_break(buffer: str, breaker: 're.Pattern[str]') -> int:
+    """Offset just past the last break that cannot be extended by more input"""
+    for start, end in reversed(_breaks(buffer, breaker)):
+        # Trailing whitespace may continue in the next chunk, and a break
+        # inside an unfinished tag is not a break at all
+        if end == len(buffer):
+            continue
+        if buffer.rfind('<', 0, start) > buffer.rfind('>', 0, start):
+            continue
+        return end
+    return 0
@@ -0,0 +1,270 @@
+import asyncio
+from concurrent.futures import Future
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+from scalability.cache import CacheService
+from scalability.cache_keys import translation_key
+from scalability.codec import ValueCodec
+from scalability.hot_keys import HotKeyTracker
+from scalability.local_cache import LocalCache
+from scalability.circuit_breaker import CircuitBreaker
+from .backend import create_backend
+from .dispatcher import BackpressureError, MicroBatcher
+from .memory import AsyncTranslationMemory, TranslationMemory
+from .segmenter import aiter_segments, iter_segments
+
+Query = Tuple[str, str, str]
+
+class TranslationService:
+    """
+    Translation business logic shared by the HTTP endpoints and job workers
+
+    Everything here is independent of Flask: callers validate input and
+    turn results and exceptions into responses.
+    """
+
+    memory_class = TranslationMemory
+
+    def __init__(self,
+                 cache_service: CacheService,
+                 dispatcher: MicroBatcher,
+                 expires: int = 3600,
+                 result_timeout: Optional[float] = None):
+        self.cache_service = cache_service
+        self.dispatcher = dispatcher
+        self.expires = expires
+        self.result_timeout = result_timeout
+        self.memory = self.memory_class(cache_service, expires=expires)
+
+    def translate_batch(self, items: List[Query]) -> List[Dict[str, Any]]:
+        """
+        Translate (text, source_lang, target_lang) tuples in one backend call
+
+        Returns the cacheable part of each result. The source text and the
+        language pair are already known from the request (and encoded in the
+        cache key), so they are not stored again.
+        """
+        # Concurrent requests are coalesced into backend batches per language pair
+        translations = self.dispatcher.translate(items, timeout=self.result_timeout)
+        return self._cacheable(translations)
+
+    @staticmethod
+    def _cacheable(translations: List[str]) -> List[Dict[str, Any]]:
+        return [{"translated": translated} for translated in translations]
+
+    @staticmethod
+    def build_result(text: str, source_lang: str, target_lang: str, cached: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "text": text,
+            "translated": cached["translated"],
+            "source_lang": source_lang,
+            "target_lang": target_lang
+        }
+
+    def translate(self,
+                  text: str,
+                  source_lang: str,
+                  target_lang: str,
+                  segmentation: Optional[str] = None) -> Dict[str, Any]:
+        """Translate one text, optionally segment by segment through the translation memory"""
+        if segmentation:
+            # Look up each sentence/paragraph on its own so partial edits hit the cache
+            translated, segment_stats = self.memory.translate(
+                text, source_lang, target_lang, self.translate_batch, mode=segmentation
+            )
+            return self._segmented_result(text, source_lang, target_lang, translated, segment_stats)
+
+        # Create cache key
+        cache_key = translation_key(text, source_lang, target_lang)
+
+        def translate_text():
+            return self.translate_batch([(text, source_lang, target_lang)])[0]
+
+        # Use cache with fallback
+        result = self.cache_service.cache_with_fallback(
+            cache_key,
+            translate_text,
+            expires=self.expires
+        )
+        return self.build_result(text, source_lang, target_lang, result)
+
+    def _segmented_result(self, text: str, source_lang: str, target_lang: str,
+                          translated: str, segment_stats: Dict[str, Any]) -> Dict[str, Any]:
+        result = self.build_result(text, source_lang, target_lang, {"translated": translated})
+        result["segments"] = segment_stats
+        return result
+
+    def translate_many(self, queries: List[Query]) -> List[Dict[str, Any]]:
+        """Translate several texts with one cache round trip and one backend batch"""
+        keys, unique = self._plan_many(queries)
+
+        # One MGET for every distinct key in the batch
+        results = self.cache_service.get_many(list(unique), expires=self.expires)
+
+        # Only the misses go to the backend, as a single batch
+        missing = [key for key in unique if key not in results]
+        if missing:
+            translated = self.translate_batch([unique[key] for key in missing])
+            fresh = dict(zip(missing, translated))
+            self.cache_service.set_many(fresh, expires=self.expires)
+            results.update(fresh)
+
+        return self._assemble_many(queries, keys, results)
+
+    @staticmethod
+    def _plan_many(queries: List[Query]) -> Tuple[List[str], Dict[str, Query]]:
+        keys = [translation_key(*query) for query in queries]
+        return keys, dict(zip(keys, queries))
+
+    def _assemble_many(self, queries: List[Query], keys: List[str], results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [self.build_result(*query, results[key]) for query, key in zip(queries, keys)]
+
+    def stream(self,
+               chunks: Iterable[str],
+               source_lang: str,
+               target_lang: str,
+               segmentation: str = 'sentence',
+               window: int = 16,
+               max_buffer: int = 65536,
+               stats: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Translate text arriving in chunks, yielding translated pieces as they are ready"""
+        segments = iter_segments(chunks, segmentation, max_buffer=max_buffer)
+        return self.memory.stream(
+            segments, source_lang, target_lang, self.translate_batch,
+            window=window, stats=stats
+        )
+
+class AsyncTranslationService(TranslationService):
+    """
+    TranslationService for the ASGI app, on AsyncCacheService
+
+    Shares key planning, result building and the translation memory logic
+    with TranslationService, and the same thread-based MicroBatcher: its
+    futures are awaited instead of blocked on, so backend latency never
+    holds the event loop.
+    """
+
+    memory_class = AsyncTranslationMemory
+
+    async def translate_batch(self, items: List[Query]) -> List[Dict[str, Any]]:
+        futures = [asyncio.wrap_future(await self._submit(*item)) for item in items]
+        translations = await asyncio.wait_for(asyncio.gather(*futures), self.result_timeout)
+        return self._cacheable(translations)
+
+    async def _submit(self, text: str, source_lang: str, target_lang: str) -> Future:
+        try:
+            return self.dispatcher.submit(text, source_lang, target_lang, timeout=0)
+        except BackpressureError:
+            # The queue is full: wait for space on a thread, not on the event loop
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.dispatcher.submit, text, source_lang, target_lang
+            )
+
+    async def translate(self,
+                        text: str,
+                        source_lang: str,
+                        target_lang: str,
+                        segmentation: Optional[str] = None) -> Dict[str, Any]:
+        if segmentation:
+            translated, segment_stats = await self.memory.translate(
+                text, source_lang, target_lang, self.translate_batch, mode=segmentation
+            )
+            return self._segmented_result(text, source_lang, target_lang, translated, segment_stats)
+
+        cache_key = translation_key(text, source_lang, target_lang)
+
+        async def translate_text():
+            return (await self.translate_batch([(text, source_lang, target_lang)]))[0]
+
+        result = await self.cache_service.cache_with_fallback(
+            cache_key,
+            translate_text,
+            expires=self.expires
+        )
+        return self.build_result(text, source_lang, target_lang, result)
+
+    async def translate_many(self, queries: List[Query]) -> List[Dict[str, Any]]:
+        keys, unique = self._plan_many(queries)
+        results = await self.cache_service.get_many(list(unique), expires=self.expires)
+
+        missing = [key for key in unique if key not in results]
+        if missing:
+            translated = await self.translate_batch([unique[key] for key in missing])
+            fresh = dict(zip(missing, translated))
+            await self.cache_service.set_many(fresh, expires=self.expires)
+            results.update(fresh)
+
+        return self._assemble_many(queries, keys, results)
+
+    def stream(self,
+               chunks: AsyncIterable[str],
+               source_lang: str,
+               target_lang: str,
+               segmentation: str = 'sentence',
+               window: int = 16,
+               max_buffer: int = 65536,
+               stats: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        segments = aiter_segments(chunks, segmentation, max_buffer=max_buffer)
+        return self.memory.stream(
+            segments, source_lang, target_lang, self.translate_batch,
+            window=window, stats=stats
+        )
+
+def _cache_options(config: Any) -> Dict[str, Any]:
+    """CacheService/AsyncCacheService arguments from a Config class"""
+    return dict(
+        local_cache=LocalCache(
+            max_entries=config.CACHE_LOCAL_MAX_ENTRIES,
+            max_bytes=config.CACHE_LOCAL_MAX_BYTES
+        ) if config.CACHE_LOCAL_MAX_ENTRIES else None,
+        codec=ValueCodec(
+            serializer=config.CACHE_SERIALIZER,
+            compressor=config.CACHE_COMPRESSOR,
+            compress_threshold=config.CACHE_COMPRESS_THRESHOLD
+        ),
+        lock_ttl_ms=config.CACHE_LOCK_TTL_MS,
+        lock_wait_timeout=config.CACHE_LOCK_WAIT_TIMEOUT,
+        early_refresh_beta=config.CACHE_EARLY_REFRESH_BETA,
+        hot_keys=HotKeyTracker(
+            sample_rate=config.CACHE_HOT_KEYS_SAMPLE_RATE
+        ) if config.CACHE_HOT_KEYS_SAMPLE_RATE else None
+    )
+
+def _create_dispatcher(config: Any) -> MicroBatcher:
+    return MicroBatcher(
+        create_backend(config.TRANSLATION_BACKEND, **config.TRANSLATION_BACKEND_OPTIONS),
+        max_batch_size=config.DISPATCH_MAX_BATCH_SIZE,
+        max_wait_ms=config.DISPATCH_MAX_WAIT_MS,
+        max_queue_size=config.DISPATCH_MAX_QUEUE_SIZE,
+        workers=config.DISPATCH_WORKERS,
+        submit_timeout=config.DISPATCH_SUBMIT_TIMEOUT,
+        breaker=CircuitBreaker.get('translation-backend')
+    )
+
+def create_translation_service(config: Any) -> TranslationService:
+    """Build the service and everything behind it from a Config class"""
+    return TranslationService(
+        CacheService(**_cache_options(config)),
+        _create_dispatcher(config),
+        expires=config.CACHE_TRANSLATION_TTL,
+        result_timeout=config.DISPATCH_RESULT_TIMEOUT
+    )
+
+def create_async_translation_service(config: Any) -> AsyncTranslationService:
+    """Build the async service from a Config class; call it from the event loop's thread"""
+    from scalability.aio.cache import AsyncCacheService
+
+    return AsyncTranslationService(
+        AsyncCacheService(**_cache_options(config)),
+        _create_dispatcher(config),
+        expires=config.CACHE_TRANSLATION_TTL,
+        result_timeout=config.DISPATCH_RESULT_TIMEOUT
+    )
+
+def run_job(service: TranslationService, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: run a queued /api/translate/jobs payload"""
+    return service.translate(
+        payload['text'],
+        payload['sourceLang'],
+        payload['targetLang'],
+        payload.get('segmentation')
+    )
@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from .segmenter import SEGMENT_MODES
+
+class ValidationError(ValueError):
+    """A request the API rejects, with the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+# Longest language tag accepted; real BCP 47 tags are far shorter
+MAX_LANG_LENGTH = 35
+
+def _check_body(data: Any) -> Dict[str, Any]:
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValidationError("Request body must be a JSON object")
+    return data
+
+def _check_lang(data: Mapping[str, Any], field: str, default: str) -> str:
+    """A language from the request, safe to build cache keys from"""
+    lang = data.get(field, default)
+    if not isinstance(lang, str) or not 0 < len(lang) <= MAX_LANG_LENGTH or ':' in lang:
+        raise ValidationError(f"'{field}' must be a language code of at most {MAX_LANG_LENGTH} characters")
+    return lang
+
+def _check_segmentation(segmentation: Optional[str]) -> None:
+    if segmentation and segmentation not in SEGMENT_MODES:
+        raise ValidationError(f"'segmentation' must be one of: {', '.join(SEGMENT_MODES)}")
+
+def parse_translate(data: Any,
+                    default_segmentation: Optional[str] = None) -> Tuple[str, str, str, Optional[str]]:
+    """(text, source_lang, target_lang, segmentation) from an /api/translate body"""
+    data = _check_body(data)
+    text = data.get('text')
+    segmentation = data.get('segmentation', default_segmentation)
+
+    if not isinstance(text, str):
+        raise ValidationError("'text' must be a string")
+    _check_segmentation(segmentation)
+
+    return text, _check_lang(data, 'sourceLang', 'auto'), _check_lang(data, 'targetLang', 'en'), segmentation
+
+def parse_batch(data: Any, max_items: int) -> List[Tuple[str, str, str]]:
+    """(text, source_lang, target_lang) queries from an /api/translate/batch body"""
+    items = _check_body(data).get('items')
+
+    if not isinstance(items, list) or not all(
+            isinstance(item, dict) and isinstance(item.get('text'), str) for item in items):
+        raise ValidationError("'items' must be a list of objects with a 'text' field")
+
+    if len(items) > max_items:
+        raise ValidationError(f"Batch too large (max {max_items} items)", 413)
+
+    return [
+        (item['text'], _check_lang(item, 'sourceLang', 'auto'), _check_lang(item, 'targetLang', 'en'))
+        for item in items
+    ]
+
+def batch_size(data: Any) -> int:
+    """Number of items in a batch body, 0 when it is malformed"""
+    items = data.get('items') if isinstance(data, dict) else None
+    return len(items) if isinstance(items, list) else 0
+
+def parse_stream(args: Mapping[str, str]) -> Tuple[str, str, str]:
+    """(source_lang, target_lang, segmentation) from /api/translate/stream query parameters"""
+    segmentation = args.get('segmentation', 'sentence')
+    if segmentation not in SEGMENT_MODES:
+        raise ValidationError(f"'segmentation' must be one of: {', '.join(SEGMENT_MODES)}")
+
+    return _check_lang(args, 'sourceLang', 'auto'), _check_lang(args, 'targetLang', 'en'), segmentation
@@ -0,0 +1,75 @@
+# flask_backend/worker.py
+"""
+Pool of processes draining the Redis job queue
+
+    python worker.py [--processes N]
+
+Each process builds its own translation service and queue (connection
+pools must not be shared across a fork) and runs jobs one at a time.
+Processes that die are restarted; SIGTERM or SIGINT lets every process
+finish its current job and exit.
+"""
+import signal
+import logging
+import argparse
+import multiprocessing
+from threading import Event
+from config import Config
+
+logger = logging.getLogger('translation-worker')
+
+def work(stop: Event) -> None:
+    from scalability.metrics import REGISTRY, configure_metrics
+    from translation.jobs import JobWorker, create_job_queue
+    from translation.service import create_translation_service, run_job
+
+    # The parent decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    configure_metrics(Config)
+    service = create_translation_service(Config)
+    worker = JobWorker(
+        create_job_queue(Config),
+        lambda payload: run_job(service, payload),
+        max_attempts=Config.JOB_MAX_ATTEMPTS,
+        webhook_allowed_hosts=Config.JOB_WEBHOOK_ALLOWED_HOSTS
+    )
+    worker.run(stop)
+    # Push the last counts before the process exits
+    REGISTRY.stop()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=Config.JOB_WORKER_PROCESSES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(processName)s %(message)s')
+    if Config.JOB_QUEUE_BACKEND != 'redis':
+        parser.error("JOB_QUEUE_BACKEND must be 'redis' for standalone workers")
+
+    stop = multiprocessing.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    def spawn(index: int) -> multiprocessing.Process:
+        process = multiprocessing.Process(target=work, args=(stop,), name=f'worker-{index}')
+        process.start()
+        return process
+
+    processes = [spawn(index) for index in range(args.processes)]
+    logger.info(f"Started {len(processes)} worker processes")
+
+    while not stop.is_set():
+        for index, process in enumerate(processes):
+            if not process.is_alive():
+                logger.warning(f"{process.name} exited with {process.exitcode}, restarting")
+                processes[index] = spawn(index)
+        stop.wait(1)
+
+    logger.info("Stopping workers")
+    for process in processes:
+        process.join()
+
+if __name__ == '__main__':
+    main()